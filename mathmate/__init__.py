@@ -0,0 +1,16 @@
+# mathmate/__init__.py
+# Streamlit-free math helpers shared by the MathMate pages and batch tools
+#
+# The pages only draw what these return:
+#   expressions.py  calculator (mathmate_app.py)
+#   multistep.py    tens-and-ones methods and word problems (mathmate_v2.py)
+#   teacher.py      problem generator, hints and explanations (mathmate_v3_ultra.py)
+#   equations.py    equation solver and hints (mathmate_v3.5_ultra.py, mathmate_v4_ultra.py)
+#   live.py         solving as the student types (mathmate_v3.5_ultra.py)
+#   cost.py         problem size estimate: fast path, SymPy or too big (python -m mathmate.cost)
+#   helper.py       student helper, word-problem tips and Q&A (mathmate_v4_ultra.py)
+#   explain.py      AI explanations (mathmate_v5.py)
+#   gateway.py      shared request queue, limits and retries for the AI backend
+#   grading.py      answer checking (mathmate_v5.py) and class grading (python -m mathmate.grading)
+#   worksheet.py    bulk worksheets and answer keys (python -m mathmate.worksheet)
+#   pagebench.py    server cost per click, full page vs fragment reruns (python -m mathmate.pagebench)
@@ -0,0 +1,267 @@
+# mathmate/bank.py
+# A problem bank of any size (100k+ word problems) tagged by grade, skill and
+# difficulty, stored in one file that every Streamlit worker memory-maps: the
+# OS keeps a single copy in its page cache however many processes read it.
+#
+#   python -m mathmate.bank build problems.jsonl -o problems.bank
+#   python -m mathmate.bank info problems.bank
+#   python -m mathmate.bank pick problems.bank --grade 3 --skill fractions
+#
+#   bank = Bank.open("problems.bank")          # or Bank.from_problems(WORD_PROBLEMS)
+#   problem = bank.pick(rng, grades={3}, skills={"fractions"},
+#                       weights=weak_area_weights(history, bank.skills),
+#                       exclude={h.qid for h in history.last(20)})
+#
+# Input records (JSONL or CSV) have question, answer, grade, skill and an
+# optional difficulty (1-255, default 1).
+#
+# File layout (all little-endian):
+#   b"MMBANK1\0", u32 header length, JSON header, padding to 4 bytes
+#   records   fixed 12 bytes each: grade u8, skill u8, difficulty u8, pad,
+#             text offset u32, question length u16, answer length u16
+#   text      every question followed by its answer, UTF-8
+# Records are sorted by (grade, skill, difficulty), so each (grade, skill)
+# pair is one contiguous run of records ("bucket", listed in the header) and a
+# difficulty range inside it is found by binary search. Picking a problem is
+# then a weighted choice between the few matching buckets plus one random
+# index: O(log n), with nothing loaded up front.
+
+import argparse
+import csv
+import hashlib
+import json
+import mmap
+import os
+import random
+import struct
+import sys
+from bisect import bisect_right
+from itertools import accumulate
+
+MAGIC = b"MMBANK1\0"
+RECORD = struct.Struct("<BBBxIHH")
+BANK_PATH = os.getenv("MATHMATE_BANK") or None
+WEAK_BOOST = 3.0   # a skill a student always gets wrong comes up this much more often (+1)
+PICK_TRIES = 8     # random draws before a recently seen problem is allowed again
+
+# ==========================
+# READING
+# ==========================
+class Bank:
+    def __init__(self, buffer):
+        # buffer: the file contents, as bytes or an mmap
+        if bytes(buffer[:8]) != MAGIC:
+            raise ValueError("Not a MathMate problem bank")
+        (size,) = struct.unpack_from("<I", buffer, 8)
+        header = json.loads(bytes(buffer[12:12 + size]))
+        self.buffer = buffer
+        self.version = header["version"]
+        self.count = header["count"]
+        self.skills = header["skills"]
+        self.grades = header["grades"]
+        self.buckets = [tuple(b) for b in header["buckets"]]  # (grade, skill index, start, end)
+        self.records_at = 12 + size + (-(12 + size) % 4)
+        self.text_at = self.records_at + self.count * RECORD.size
+
+    @classmethod
+    def open(cls, path):
+        with open(path, "rb") as f:
+            return cls(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    @classmethod
+    def from_problems(cls, problems):
+        return cls(to_bytes(problems))
+
+    def __len__(self):
+        return self.count
+
+    def _record(self, i):
+        return RECORD.unpack_from(self.buffer, self.records_at + i * RECORD.size)
+
+    def problem(self, i):
+        grade, skill, difficulty, offset, q_len, a_len = self._record(i)
+        start = self.text_at + offset
+        text = bytes(self.buffer[start:start + q_len + a_len])
+        return {"id": self.qid(i), "question": text[:q_len].decode("utf-8"),
+                "answer": text[q_len:].decode("utf-8"), "grade": grade,
+                "skill": self.skills[skill], "difficulty": difficulty}
+
+    def qid(self, i):
+        # ids carry the bank version, so a rebuilt bank never shows the wrong question
+        return f"{self.version}:{i}"
+
+    def lookup(self, qid):
+        version, _, i = str(qid).partition(":")
+        if version != self.version or not i.isdigit() or int(i) >= self.count:
+            return None
+        return self.problem(int(i))
+
+    def _difficulty(self, i):
+        return self.buffer[self.records_at + i * RECORD.size + 2]
+
+    def _narrow(self, start, end, difficulty):
+        # records of [start, end) with lo <= difficulty <= hi, by binary search
+        lo, hi = difficulty
+        def first(value):
+            a, b = start, end
+            while a < b:
+                mid = (a + b) // 2
+                if self._difficulty(mid) < value:
+                    a = mid + 1
+                else:
+                    b = mid
+            return a
+        return first(lo), first(hi + 1)
+
+    def ranges(self, grades=None, skills=None, difficulty=None):
+        # [(skill name, start, end)] of the buckets that match, non-empty only
+        out = []
+        for grade, skill, start, end in self.buckets:
+            if grades and grade not in grades:
+                continue
+            if skills and self.skills[skill] not in skills:
+                continue
+            if difficulty:
+                start, end = self._narrow(start, end, difficulty)
+            if end > start:
+                out.append((self.skills[skill], start, end))
+        return out
+
+    def pick(self, rng=random, grades=None, skills=None, difficulty=None, weights=None, exclude=()):
+        # a random matching problem; skills are weighted by `weights` (skill -> weight,
+        # default 1) and grade buckets within a skill by their size. None if nothing matches.
+        found = self.ranges(grades, skills, difficulty)
+        if not found:
+            return None
+        per_skill = {}
+        for skill, start, end in found:
+            per_skill[skill] = per_skill.get(skill, 0) + end - start
+        weights = weights or {}
+        cumulative = list(accumulate(weights.get(skill, 1.0) * (end - start) / per_skill[skill]
+                                     for skill, start, end in found))
+        for _ in range(PICK_TRIES):
+            _, start, end = found[bisect_right(cumulative, rng.random() * cumulative[-1])
+                                  if cumulative[-1] > 0 else rng.randrange(len(found))]
+            i = rng.randrange(start, end)
+            if self.qid(i) not in exclude:
+                break
+        return self.problem(i)
+
+def weak_area_weights(history, skills):
+    # skill -> weight for Bank.pick: the lower a student's accuracy, the higher;
+    # skills they have not tried yet sit in the middle
+    weights = {}
+    for skill in skills:
+        accuracy = history.accuracy(skill)
+        weights[skill] = 1 + WEAK_BOOST * (0.5 if accuracy is None else 1 - accuracy)
+    return weights
+
+_default = None
+
+def default_bank():
+    # MATHMATE_BANK if set, else the built-in word problems
+    global _default
+    if _default is None:
+        if BANK_PATH:
+            _default = Bank.open(BANK_PATH)
+        else:
+            from mathmate.word_problems import WORD_PROBLEMS
+            _default = Bank.from_problems(WORD_PROBLEMS)
+    return _default
+
+# ==========================
+# BUILDING
+# ==========================
+def _rows(problems):
+    skills = sorted({str(p["skill"]) for p in problems})
+    index = {s: k for k, s in enumerate(skills)}
+    rows = []
+    for p in problems:
+        grade, difficulty = int(p["grade"]), int(p.get("difficulty") or 1)
+        if not 0 <= grade <= 255 or not 0 <= difficulty <= 255:
+            raise ValueError(f"grade and difficulty must be 0-255: {p['question'][:40]!r}")
+        rows.append((grade, index[str(p["skill"])], difficulty,
+                     str(p["question"]).encode("utf-8"), str(p["answer"]).encode("utf-8")))
+    rows.sort(key=lambda r: r[:3])
+    return skills, rows
+
+def write_bank(problems, stream):
+    if len(set(p["skill"] for p in problems)) > 256:
+        raise ValueError("At most 256 skills")
+    skills, rows = _rows(problems)
+    buckets = []
+    for i, (grade, skill, *_ignored) in enumerate(rows):
+        if buckets and buckets[-1][:2] == [grade, skill]:
+            buckets[-1][3] = i + 1
+        else:
+            buckets.append([grade, skill, i, i + 1])
+    digest = hashlib.sha1()
+    records = bytearray()
+    offset = 0
+    for grade, skill, difficulty, question, answer in rows:
+        if len(question) > 0xFFFF or len(answer) > 0xFFFF:
+            raise ValueError(f"Question or answer too long: {question[:40]!r}")
+        records += RECORD.pack(grade, skill, difficulty, offset, len(question), len(answer))
+        digest.update(question + b"\0" + answer + b"\0")
+        offset += len(question) + len(answer)
+    if offset > 0xFFFFFFFF:
+        raise ValueError("Bank text is over 4 GB")
+    header = json.dumps({"version": digest.hexdigest()[:8], "count": len(rows), "skills": skills,
+                         "grades": sorted({r[0] for r in rows}), "buckets": buckets}).encode()
+    stream.write(MAGIC + struct.pack("<I", len(header)) + header + b"\0" * (-(12 + len(header)) % 4))
+    stream.write(records)
+    for *_ignored, question, answer in rows:
+        stream.write(question + answer)
+
+def to_bytes(problems):
+    from io import BytesIO
+    out = BytesIO()
+    write_bank(problems, out)
+    return out.getvalue()
+
+def build(problems, path):
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        write_bank(problems, f)
+    os.replace(tmp, path)  # workers that have the old file mapped keep reading it
+
+def read_problems(path):
+    with open(path, encoding="utf-8", newline="") as f:
+        if path.lower().endswith(".csv"):
+            return list(csv.DictReader(f))
+        return [json.loads(line) for line in f if line.strip()]
+
+# ==========================
+# CLI
+# ==========================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build and inspect MathMate problem banks.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    b = sub.add_parser("build", help="build a bank file from JSONL or CSV")
+    b.add_argument("input")
+    b.add_argument("-o", "--output", required=True)
+    i = sub.add_parser("info", help="grades, skills and bucket sizes of a bank")
+    i.add_argument("bank")
+    p = sub.add_parser("pick", help="pick a few problems, like the app would")
+    p.add_argument("bank")
+    p.add_argument("--grade", type=int, action="append")
+    p.add_argument("--skill", action="append")
+    p.add_argument("-n", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        problems = read_problems(args.input)
+        build(problems, args.output)
+        print(f"Wrote {len(problems)} problems to {args.output}.", file=sys.stderr)
+    elif args.command == "info":
+        bank = Bank.open(args.bank)
+        print(f"{len(bank)} problems, version {bank.version}")
+        for grade, skill, start, end in bank.buckets:
+            print(f"  grade {grade}  {bank.skills[skill]:<20} {end - start}")
+    else:
+        bank = Bank.open(args.bank)
+        for _ in range(args.n):
+            print(json.dumps(bank.pick(random, set(args.grade or ()), set(args.skill or ())), ensure_ascii=False))
+
+if __name__ == "__main__":
+    main()
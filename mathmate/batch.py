@@ -0,0 +1,179 @@
+# mathmate/batch.py
+# Headless batch solving for worksheets and answer keys (no Streamlit needed)
+#
+#   python -m mathmate.batch problems.jsonl -o answers.jsonl --workers 8
+#   python -m mathmate.batch problems.csv -o answers.csv
+#
+# Each input record has an "expression" (worked out like mathmate_app.py) or an
+# "equation" (solved like mathmate_v3.5_ultra.py). A "problem" field counts as
+# an equation when it contains "=". An optional "id" is copied to the output.
+# JSONL lines may also be plain strings, e.g. "3+4*2".
+#
+# Records are read lazily, solved in chunks on a process pool and written in
+# input order as soon as each chunk is done. Only a few chunks are in flight at
+# once, so memory stays flat however long the input is.
+#
+# Every record is routed like the pages route a student's problem
+# (mathmate/cost.py): too big gets the "too big" message as its error, the
+# fast path is worked out in the batch process, and the rest goes to a solver
+# pool (mathmate/sandbox.py) with the same time and memory limits as the app
+# (MATHMATE_SOLVER_TIMEOUT, MATHMATE_SOLVER_MEMORY_MB). One pathological row
+# gets an error; it does not hang or crash the batch.
+
+import argparse
+import csv
+import json
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from mathmate.cost import route
+from mathmate.equations import quick_solver, step_by_step_solver
+from mathmate.expressions import clean_input, is_safe, solve_texts
+from mathmate.sandbox import SolverPool
+
+FIELDS = ["id", "kind", "input", "answer", "steps", "error"]
+
+# ==========================
+# SOLVING
+# ==========================
+_pool = None  # this process's solver pool, started by the first row that needs it
+
+def solver_pool():
+    global _pool
+    if _pool is None:
+        _pool = SolverPool(workers=1)
+    return _pool
+
+def solve_record(record):
+    if record.get("expression"):
+        kind, text = "expression", record["expression"]
+    elif record.get("equation"):
+        kind, text = "equation", record["equation"]
+    else:
+        text = record.get("problem") or ""
+        kind = "equation" if "=" in text else "expression"
+    result = {"id": record.get("id"), "kind": kind, "input": text,
+              "answer": None, "steps": [], "error": None}
+    try:
+        if kind == "expression":
+            cleaned = clean_input(text.strip())
+            if not is_safe(cleaned):
+                raise ValueError("Please use only numbers and standard math symbols (+ - * / ^ ( )).")
+            r = route(cleaned, left_powers=True)  # read like evaluate_tokens works it out
+            if r.path == "reject":
+                raise ValueError(r.reason)
+            if r.path == "fast":
+                answer, steps = solve_texts(cleaned)
+            else:
+                answer, steps = solver_pool().run(solve_texts, cleaned)
+            result["answer"], result["steps"] = answer, steps
+        else:
+            r = route(text)
+            if r.path == "reject":
+                raise ValueError(r.reason)
+            solved = quick_solver(text) if r.path == "fast" else None
+            if solved is None:
+                solved = solver_pool().run(step_by_step_solver, text)
+            solution, steps = solved
+            result["steps"] = steps
+            if solution is None:
+                result["error"] = steps[-1]
+            else:
+                result["answer"] = str(solution)
+    except Exception as e:
+        result["error"] = str(e)
+    return result
+
+def solve_chunk(records):
+    return [solve_record(r) for r in records]
+
+def chunked(records, size):
+    it = iter(records)
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+def solve_stream(records, workers=None, chunk_size=256):
+    # yields one result per record, in input order
+    workers = workers or os.cpu_count() or 1
+    chunks = chunked(records, chunk_size)
+    if workers == 1:
+        for chunk in chunks:
+            yield from solve_chunk(chunk)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(solve_chunk, chunk))
+            # keep every worker busy, but never read far ahead of the writer
+            if len(pending) >= workers * 2:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+# ==========================
+# READING & WRITING
+# ==========================
+def guess_format(path, default="jsonl"):
+    if path and path != "-" and path.lower().endswith(".csv"):
+        return "csv"
+    return default
+
+def read_records(stream, fmt="jsonl"):
+    if fmt == "csv":
+        yield from csv.DictReader(stream)
+        return
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+        record = json.loads(line)
+        if isinstance(record, str):
+            record = {"problem": record}
+        yield record
+
+def write_results(results, stream, fmt="jsonl"):
+    count = 0
+    if fmt == "csv":
+        writer = csv.DictWriter(stream, fieldnames=FIELDS)
+        writer.writeheader()
+        for r in results:
+            writer.writerow(dict(r, steps=" | ".join(r["steps"])))
+            count += 1
+    else:
+        for r in results:
+            stream.write(json.dumps(r, ensure_ascii=False) + "\n")
+            count += 1
+    return count
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Solve a JSONL/CSV file of MathMate expressions and equations.")
+    parser.add_argument("input", help="JSONL or CSV file, or - for stdin")
+    parser.add_argument("-o", "--output", default="-", help="where to write results (default: stdout)")
+    parser.add_argument("--input-format", choices=["jsonl", "csv"], help="default: from the file extension")
+    parser.add_argument("--output-format", choices=["jsonl", "csv"], help="default: from the file extension")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per CPU, 1 = no pool)")
+    parser.add_argument("--chunk-size", type=int, default=256, help="records sent to a worker at a time")
+    args = parser.parse_args(argv)
+
+    in_fmt = args.input_format or guess_format(args.input)
+    out_fmt = args.output_format or guess_format(args.output)
+    src = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8", newline="")
+    dst = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8", newline="")
+    try:
+        results = solve_stream(read_records(src, in_fmt), args.workers, args.chunk_size)
+        count = write_results(results, dst, out_fmt)
+    finally:
+        if src is not sys.stdin:
+            src.close()
+        if dst is not sys.stdout:
+            dst.close()
+    print(f"Solved {count} problems.", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
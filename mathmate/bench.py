@@ -0,0 +1,252 @@
+# mathmate/bench.py
+# Benchmarks for every solver path, run from the command line (no server).
+#
+#   python -m mathmate.bench                         # everything, as a table
+#   python -m mathmate.bench -k evaluate --sizes 1000
+#   python -m mathmate.bench --json after.json --compare before.json
+#
+# Each benchmark runs over a generated corpus (seeded, so every commit sees the
+# same inputs) at increasing sizes: 10 / 100 / 1000 operators for expressions
+# and equations, with deeper bracket nesting as they grow, and 2 / 20 / 200 /
+# 2000 digit numbers for the v2 column methods (every step is made and read).
+# Every call is timed on its own, so we can report ops/sec plus p50 / p99
+# latency; peak memory (tracemalloc) is measured on a separate pass so it does
+# not slow the timed one.
+#
+# The v3 teacher_explain and v2 multi_step_* benchmarks call the engine modules
+# the pages render (mathmate/teacher.py, mathmate/multistep.py); Streamlit is
+# never imported.
+
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+from collections import deque
+from datetime import datetime, timezone
+
+from mathmate.equations import solve_equation, step_by_step_solver
+from mathmate.expressions import compute_with_sympy, evaluate_tokens, tokenize
+from mathmate.multistep import MULTI_STEP
+from mathmate.problem_table import ARITHMETIC_ITEMS, STEP_TABLE
+from mathmate.teacher import WORD_ITEMS, teacher_explain, word_problem
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SEED = 2024
+CORPUS_SIZE = 50  # distinct inputs per benchmark and size
+
+# ==========================
+# CORPORA
+# ==========================
+OPERATOR_SIZES = {10: 2, 100: 4, 1000: 8}  # operators -> max bracket depth
+DIGIT_SIZES = [2, 20, 200, 2000]
+
+def make_expression(rng, ops, depth):
+    # `ops` binary operators, brackets nested at most `depth` deep
+    if depth == 0 or ops < 2:
+        parts = [str(rng.randint(1, 99))]
+        for _ in range(ops):
+            parts += [rng.choice("+-*/"), str(rng.randint(1, 99))]
+        return " ".join(parts)
+    left = rng.randint(0, ops - 1)
+    return (f"({make_expression(rng, left, depth - 1)}) {rng.choice('+-*/')} "
+            f"({make_expression(rng, ops - 1 - left, depth - 1)})")
+
+def make_equation(rng, ops, powers=(0, 1, 2)):
+    # `ops` operators spread over both sides; terms like 3, 4*x, 2*x**2
+    terms = []
+    for _ in range(ops // 2 + 1):
+        power = rng.choice(powers)
+        k = rng.randint(1, 9)
+        terms.append(str(k) if power == 0 else f"{k}*x" if power == 1 else f"{k}*x**{power}")
+    if not any("x" in t for t in terms):
+        terms[0] = f"{rng.randint(1, 9)}*x"
+    split = max(1, len(terms) // 2)
+    side = lambda ts: " ".join([ts[0]] + [f"{rng.choice('+-')} {t}" for t in ts[1:]])
+    return f"{side(terms[:split])} = {side(terms[split:] or ['0'])}"
+
+def expression_corpus(size):
+    rng = random.Random(SEED + size)
+    return [make_expression(rng, size, OPERATOR_SIZES[size]) for _ in range(CORPUS_SIZE)]
+
+def compute_corpus(size):
+    # compute_with_sympy(left, op, right): split the operators between both sides
+    rng = random.Random(SEED + size)
+    depth = OPERATOR_SIZES[size]
+    half = (size - 1) // 2
+    return [(make_expression(rng, half, depth), rng.choice("+-*/"), make_expression(rng, size - 1 - half, depth))
+            for _ in range(CORPUS_SIZE)]
+
+def equation_corpus(size, powers=(0, 1, 2)):
+    rng = random.Random(SEED + size)
+    return [make_equation(rng, size, powers) for _ in range(CORPUS_SIZE)]
+
+def digit_pairs(digits):
+    rng = random.Random(SEED + digits)
+    low, high = 10 ** (digits - 1), 10 ** digits - 1
+    pairs = []
+    for _ in range(CORPUS_SIZE):
+        a, b = rng.randint(low, high), rng.randint(low, high)
+        pairs.append((max(a, b), min(a, b)))  # a >= b, like a worksheet
+    return pairs
+
+def teacher_corpus():
+    # arithmetic and word problems exactly as the v3 ultra generator builds them
+    rng = random.Random(SEED)
+    problems = [STEP_TABLE.problem(rng.randrange(ARITHMETIC_ITEMS)) for _ in range(CORPUS_SIZE // 2)]
+    problems += [word_problem(rng.randrange(WORD_ITEMS)) for _ in range(CORPUS_SIZE - len(problems))]
+    rng.shuffle(problems)
+    return problems
+
+# ==========================
+# BENCHMARKS
+# ==========================
+# name -> (sizes, setup(size) -> (function taking one corpus item, corpus))
+def _tokenize(size):
+    return tokenize, expression_corpus(size)
+
+def _evaluate_tokens(size):
+    return evaluate_tokens, [tokenize(e) for e in expression_corpus(size)]
+
+def _compute_with_sympy(size):
+    return (lambda args: compute_with_sympy(*args)), compute_corpus(size)
+
+def _step_by_step_solver(size):
+    return step_by_step_solver, equation_corpus(size)
+
+def _step_by_step_solver_sympy(size):
+    # cubic terms: always past the closed-form engine, into SymPy
+    return step_by_step_solver, equation_corpus(size, powers=(0, 1, 3))
+
+def _solve_equation(size):
+    return solve_equation, equation_corpus(size)
+
+def _teacher_explain(size):
+    return teacher_explain, teacher_corpus()
+
+def _multi_step(name):
+    def setup(digits):
+        func = MULTI_STEP[name]
+        return (lambda ab: deque(func(*ab).steps, 0)), digit_pairs(digits)
+    return setup
+
+BENCHMARKS = {
+    "tokenize": (list(OPERATOR_SIZES), _tokenize),
+    "evaluate_tokens": (list(OPERATOR_SIZES), _evaluate_tokens),
+    "compute_with_sympy": (list(OPERATOR_SIZES), _compute_with_sympy),
+    "step_by_step_solver": (list(OPERATOR_SIZES), _step_by_step_solver),
+    "step_by_step_solver[sympy]": ([10, 100], _step_by_step_solver_sympy),
+    "solve_equation": (list(OPERATOR_SIZES), _solve_equation),
+    "teacher_explain": ([None], _teacher_explain),
+    "multi_step_addition": (DIGIT_SIZES, _multi_step("Addition")),
+    "multi_step_subtraction": (DIGIT_SIZES, _multi_step("Subtraction")),
+    "multi_step_multiplication": (DIGIT_SIZES, _multi_step("Multiplication")),
+    "multi_step_division": (DIGIT_SIZES, _multi_step("Division")),
+}
+
+# ==========================
+# RUNNER
+# ==========================
+def percentile(sorted_values, q):
+    # nearest-rank percentile of an already sorted list
+    index = max(0, min(len(sorted_values) - 1, round(q / 100 * len(sorted_values) + 0.5) - 1))
+    return sorted_values[index]
+
+def run_case(func, corpus, seconds=0.5, min_calls=5):
+    func(corpus[0])  # warm-up: first-call imports and caches are not counted
+    latencies = []
+    clock = time.perf_counter_ns
+    stop = clock() + int(seconds * 1e9)
+    i = 0
+    while i < min_calls or clock() < stop:
+        item = corpus[i % len(corpus)]
+        start = clock()
+        func(item)
+        latencies.append(clock() - start)
+        i += 1
+    latencies.sort()
+
+    tracemalloc.start()
+    for item in corpus[:min(len(corpus), max(1, i))]:
+        func(item)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {"calls": len(latencies),
+            "ops_per_sec": round(len(latencies) / (sum(latencies) / 1e9), 1),
+            "p50_us": round(percentile(latencies, 50) / 1000, 2),
+            "p99_us": round(percentile(latencies, 99) / 1000, 2),
+            "peak_kib": round(peak / 1024, 1)}
+
+def run(names=None, sizes=None, seconds=0.5, report=None):
+    results = []
+    for name, (bench_sizes, setup) in BENCHMARKS.items():
+        if names and not any(n in name for n in names):
+            continue
+        for size in bench_sizes:
+            if sizes and size is not None and size not in sizes:
+                continue
+            func, corpus = setup(size)
+            result = {"benchmark": name, "size": size}
+            try:
+                result.update(run_case(func, corpus, seconds))
+            except Exception as e:
+                result["error"] = f"{type(e).__name__}: {e}"
+            results.append(result)
+            if report:
+                report(result)
+    return results
+
+def metadata():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                                capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {"commit": commit, "time": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()}
+
+def format_result(result, baseline=None):
+    size = "-" if result["size"] is None else result["size"]
+    line = f"{result['benchmark']:<28} {size:>5}"
+    if "error" in result:
+        return f"{line}  ERROR {result['error']}"
+    line += (f" {result['ops_per_sec']:>12,.1f} ops/s  p50 {result['p50_us']:>11,.1f} us"
+             f"  p99 {result['p99_us']:>11,.1f} us  peak {result['peak_kib']:>9,.1f} KiB")
+    old = (baseline or {}).get((result["benchmark"], result["size"]))
+    if old and old.get("ops_per_sec"):
+        line += f"  {result['ops_per_sec'] / old['ops_per_sec']:>6.2f}x"
+    return line
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark MathMate's solvers (no Streamlit server needed).")
+    parser.add_argument("-k", dest="names", action="append", help="only benchmarks whose name contains this (repeatable)")
+    parser.add_argument("--sizes", help="comma-separated sizes to run, e.g. 10,100")
+    parser.add_argument("--seconds", type=float, default=0.5, help="time spent on each benchmark/size (default 0.5)")
+    parser.add_argument("--json", metavar="FILE", help="also write the results to FILE as JSON")
+    parser.add_argument("--compare", metavar="FILE", help="show speed relative to an earlier --json file")
+    parser.add_argument("--list", action="store_true", help="list benchmarks and their sizes")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for name, (sizes, _) in BENCHMARKS.items():
+            print(f"{name:<28} sizes: {', '.join('-' if s is None else str(s) for s in sizes)}")
+        return
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = {(r["benchmark"], r["size"]): r for r in json.load(f)["results"]}
+    sizes = {int(s) for s in args.sizes.split(",")} if args.sizes else None
+
+    results = run(args.names, sizes, args.seconds, report=lambda r: print(format_result(r, baseline), flush=True))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"meta": metadata(), "results": results}, f, indent=2)
+        print(f"Wrote {len(results)} results to {args.json}", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
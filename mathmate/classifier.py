@@ -0,0 +1,100 @@
+# mathmate/classifier.py
+# Keyword classifier for word problems, shared by the v2, v3 and v4 pages.
+#
+#   found = V3_CLASSIFIER.classify("Ali has 3 bags with 4 apples each.")
+#   found.operation, found.operands, found.hint    # "multiplication", (3, 4), "Hint: ..."
+#   V3_CLASSIFIER.classify_many(bank_questions)    # worksheets: one result per text
+#
+# Each page keeps its own cue words and precedence (a table of Rules, first
+# match wins), but the text is scanned only once: numbers and every cue are
+# found by one compiled regex. Cues match anywhere in the text, like the
+# `"left" in text` checks they replace.
+
+import re
+from collections import namedtuple
+
+# cues: alternatives; each one is a cue word or a tuple of cue words that must all appear
+Rule = namedtuple("Rule", "operation cues hint label")
+WordProblem = namedtuple("WordProblem", "operation operands hint label")
+
+class Classifier:
+    def __init__(self, rules, fallback_hint, ignore_case=False):
+        self.rules = rules
+        self.fallback_hint = fallback_hint
+        self.ignore_case = ignore_case
+        self._checks = []
+        cues = set()
+        for rule in rules:
+            alternatives = [frozenset([c]) if isinstance(c, str) else frozenset(c) for c in rule.cues]
+            cues.update(*alternatives)
+            self._checks.append((alternatives, rule))
+        # digits are consumed; cues sit in a lookahead so overlapping cues are all seen
+        alternation = "|".join(re.escape(c) for c in sorted(cues, key=len, reverse=True))
+        self.pattern = re.compile(rf"(\d+)|(?=({alternation}))", re.IGNORECASE if ignore_case else 0)
+        self._fallback = WordProblem(None, (), fallback_hint, None)
+
+    def classify(self, text):
+        operands = []
+        found = set()
+        for number, cue in self.pattern.findall(text):
+            if number:
+                operands.append(int(number))
+            else:
+                found.add(cue)
+        if found:
+            if self.ignore_case:
+                found = {c.lower() for c in found}
+            for alternatives, rule in self._checks:
+                for cues in alternatives:
+                    if cues <= found:
+                        return WordProblem(rule.operation, tuple(operands), rule.hint, rule.label)
+        if not operands:
+            return self._fallback
+        return WordProblem(None, tuple(operands), self.fallback_hint, None)
+
+    def classify_many(self, texts):
+        classify = self.classify
+        return [classify(t) for t in texts]
+
+# ==========================
+# PAGE RULE TABLES (first rule that matches wins)
+# ==========================
+# mathmate_v2.py: solve_word_problem
+V2_CLASSIFIER = Classifier([
+    Rule("addition", ("add", "sum"), "Adding puts numbers together.", "Addition"),
+    Rule("subtraction", ("subtract", "left"), "Subtracting takes a number away.", "Subtraction"),
+    Rule("multiplication", ("multiply", "times"), "Multiplying is repeated adding.", "Multiplication"),
+    Rule("division", ("divide", "each"), "Dividing splits into equal groups.", "Division"),
+], "Look for words like add, left, times or each.")
+
+# mathmate_v3_ultra.py: give_hint and word_problem_solver
+V3_CLASSIFIER = Classifier([
+    Rule("multiplication", ("each", "every"), "Hint: 'each' usually means multiplication.", "'each'"),
+    Rule("subtraction", ("left",), "Hint: 'left' usually means subtraction.", "'left'"),
+    Rule("addition", ("total", "altogether"), "Hint: 'total/altogether' usually means addition.", "'total/altogether'"),
+    Rule("division", ("share", "equally"), "Hint: 'share/equally' usually means division.", "'share/equally'"),
+], "Hint: Look for keywords like total, each, left, share.")
+
+# mathmate_v4_ultra.py: word_problem_solver (case-insensitive)
+V4_CLASSIFIER = Classifier([
+    Rule("addition", ("total", "sum"), "This looks like an addition problem.", "total/sum"),
+    Rule("subtraction", ("left", "remain"), "This looks like a subtraction problem.", "left/remain"),
+    Rule("multiplication", (("each", "groups"),), "This looks like a multiplication problem.", "each + groups"),
+    Rule("division", ("share", "divide"), "This looks like a division problem.", "share/divide"),
+], "Let's carefully read and translate it into math first.", ignore_case=True)
+
+# mathmate_v4_ultra.py: generate_hint, for typed expressions like "25+37"
+V4_SYMBOL_CLASSIFIER = Classifier([
+    Rule("addition", ("+",), "Think about combining two numbers together.", "+"),
+    Rule("subtraction", ("-",), "Think about taking away from a number.", "-"),
+    Rule("multiplication", ("*",), "Multiplication is repeated addition.", "*"),
+    Rule("division", ("/",), "Division is splitting into equal groups.", "/"),
+], "Break the problem into smaller steps.")
+
+DEFAULT_CLASSIFIER = V3_CLASSIFIER  # the wording used by the generated problem bank
+
+def classify(text, classifier=DEFAULT_CLASSIFIER):
+    return classifier.classify(text)
+
+def classify_many(texts, classifier=DEFAULT_CLASSIFIER):
+    return classifier.classify_many(texts)
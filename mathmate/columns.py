@@ -0,0 +1,246 @@
+# mathmate/columns.py
+# Column arithmetic for any number of digits: addition with carries,
+# subtraction with borrows, long multiplication with partial products and long
+# division into repeating decimals, the way it is done on paper. Used by the v2 multi-step methods (mathmate/multistep.py).
+#
+#   worked = column_addition(4738, 2595)
+#   for step in worked.steps:     # a generator: one place-value column per step
+#       print(step.title, *step.lines)
+#   worked.answer_text            # "7333", known before any step is made
+#
+# Steps are made one at a time, with work proportional to the digits of the
+# column (or partial product) they describe, so a page can show the first few
+# steps of a 10,000-digit sum straight away and never build the rest. The
+# answer itself is worked out separately in exact decimal arithmetic.
+# Numbers can be ints or strings of digits; use strings for numbers longer
+# than Python's int/str conversion limit (4300 digits).
+
+import decimal
+from collections import namedtuple
+
+Step = namedtuple("Step", "title lines")              # a heading and the lines under it
+Worked = namedtuple("Worked", "steps answer answer_text")
+
+PLACES = ["ones", "tens", "hundreds", "thousands", "ten thousands", "hundred thousands",
+          "millions", "ten millions", "hundred millions", "billions"]
+
+# exact integer arithmetic of any size, no int/str conversion limit
+EXACT = decimal.Context(prec=decimal.MAX_PREC, Emax=decimal.MAX_EMAX, Emin=decimal.MIN_EMIN)
+
+def place_name(k):
+    return PLACES[k] if k < len(PLACES) else f"10^{k}"
+
+def digits_of(n):
+    # "0042" -> "42"; ints and digit strings only
+    text = str(n).strip()
+    if not text.isdigit() or not text.isascii():
+        raise ValueError(f"Not a whole number: {str(n)[:20]!r}")
+    return text.lstrip("0") or "0"
+
+def exact(op, a, b):
+    # op is EXACT.add / .subtract / .multiply / .divide_int; the answer as digit text
+    return str(op(decimal.Decimal(a), decimal.Decimal(b)))
+
+# ==========================
+# ADDITION
+# ==========================
+def addition_steps(a, b):
+    width = max(len(a), len(b))
+    yield Step("Step 1: Line up the numbers by place value", (a, f"+ {b}"))
+    carry = 0
+    for k in range(width):
+        da = int(a[-1 - k]) if k < len(a) else 0
+        db = int(b[-1 - k]) if k < len(b) else 0
+        total = da + db + carry
+        work = f"{da} + {db} + {carry} (carried) = {total}" if carry else f"{da} + {db} = {total}"
+        if k == width - 1:
+            write = f"Write {total}"
+        elif total >= 10:
+            write = f"Write {total % 10}, carry 1 to the {place_name(k + 1)}"
+        else:
+            write = f"Write {total}"
+        yield Step(f"Step {k + 2}: Add the {place_name(k)}", (work, write))
+        carry = total // 10
+    yield Step(f"Step {width + 2}: Read the answer", ())
+
+def column_addition(a, b):
+    da, db = digits_of(a), digits_of(b)
+    text = exact(EXACT.add, da, db)
+    answer = a + b if isinstance(a, int) and isinstance(b, int) else text
+    return Worked(addition_steps(da, db), answer, text)
+
+# ==========================
+# SUBTRACTION
+# ==========================
+def subtraction_steps(a, b, swapped=False):
+    n = 1
+    if swapped:
+        yield Step(f"Step {n}: {a} is bigger than {b}",
+                   (f"Work out {a} - {b} and put a minus sign in front of the answer",))
+        n += 1
+    yield Step(f"Step {n}: Line up the numbers by place value", (a, f"- {b}"))
+    borrow = 0
+    for k in range(len(a)):
+        da = int(a[-1 - k])
+        db = int(b[-1 - k]) if k < len(b) else 0
+        lines = []
+        top = da - borrow
+        if top < db:
+            if borrow:
+                lines.append(f"{da} lent 1 to the {place_name(k - 1)} and is too small, "
+                             f"so borrow 1 from the {place_name(k + 1)}: {da} - 1 + 10 = {top + 10}")
+            else:
+                lines.append(f"{da} < {db}: borrow 1 from the {place_name(k + 1)}, so {da} becomes {da + 10}")
+            top += 10
+            borrow = 1
+        else:
+            if borrow:
+                lines.append(f"{da} lent 1 to the {place_name(k - 1)}, so it is now {top}")
+            borrow = 0
+        lines.append(f"{top} - {db} = {top - db}")
+        if k and k == len(a) - 1 and top == db:
+            lines.append("Nothing left here, so no digit to write")
+        else:
+            lines.append(f"Write {top - db}")
+        n += 1
+        yield Step(f"Step {n}: Subtract the {place_name(k)}", tuple(lines))
+    yield Step(f"Step {n + 1}: Read the answer", ())
+
+def column_subtraction(a, b):
+    da, db = digits_of(a), digits_of(b)
+    text = exact(EXACT.subtract, da, db)
+    answer = a - b if isinstance(a, int) and isinstance(b, int) else text
+    if text.startswith("-"):
+        return Worked(subtraction_steps(db, da, swapped=True), answer, text)
+    return Worked(subtraction_steps(da, db), answer, text)
+
+# ==========================
+# MULTIPLICATION
+# ==========================
+SUM_TERMS = 6  # partial products written out in the final sum; more are counted
+
+def multiplication_steps(a, b):
+    yield Step("Step 1: Line up the numbers by place value", (a, f"× {b}"))
+    rows = []
+    for k in range(len(b)):
+        d = b[-1 - k]
+        partial = exact(EXACT.multiply, a, d)
+        lines = [f"{a} × {d} = {partial}"]
+        if k and partial != "0":
+            partial += "0" * k
+            lines.append(f"Shift {k} place{'s' if k > 1 else ''} left: {partial}")
+        if len(rows) < SUM_TERMS:
+            rows.append(partial)
+        yield Step(f"Step {k + 2}: Multiply by the {place_name(k)} digit {d}", tuple(lines))
+    if len(b) > 1:
+        terms = " + ".join(rows) + (f" + {len(b) - len(rows)} more" if len(b) > len(rows) else "")
+        yield Step(f"Step {len(b) + 2}: Add the partial products", (terms,))
+    yield Step(f"Step {len(b) + 2 + (len(b) > 1)}: Read the answer", ())
+
+def column_multiplication(a, b):
+    da, db = digits_of(a), digits_of(b)
+    text = exact(EXACT.multiply, da, db)
+    answer = a * b if isinstance(a, int) and isinstance(b, int) else text
+    return Worked(multiplication_steps(da, db), answer, text)
+
+# ==========================
+# DIVISION
+# ==========================
+# Long division brings down one digit of the dividend at a time, so all it
+# ever keeps is a remainder smaller than the divisor; a dividend of any length
+# streams through. After the last digit it carries on into decimals until the
+# remainder is 0, a remainder comes back (the digits from there on repeat
+# forever) or DECIMAL_PLACES digits have been written.
+DECIMAL_PLACES = 20
+
+def to_int(digits):
+    # via Decimal past Python's int/str conversion limit
+    return int(decimal.Decimal(digits)) if len(digits) > 4000 else int(digits)
+
+def to_text(n):
+    # via Decimal past Python's int/str conversion limit
+    return str(n) if n.bit_length() < 13000 else str(decimal.Decimal(n))
+
+def expand(r, b, places=DECIMAL_PLACES):
+    # digits of r/b after the point (0 <= r < b): [(brought down, digit, remainder)],
+    # and the index where the repeating part starts (None if it ends or is cut off)
+    seen = {}
+    out = []
+    while r and len(out) < places:
+        if r in seen:
+            return out, seen[r]
+        seen[r] = len(out)
+        brought = r * 10
+        digit, r = divmod(brought, b)
+        out.append((brought, digit, r))
+    return out, None
+
+def decimal_text(q, digits, repeat, r):
+    # "2.5", "0.(3)", "0.1(6)", or "0.14285714…" when it was cut off
+    after = "".join(str(d) for _, d, _ in digits)
+    if repeat is not None:
+        return f"{q}.{after[:repeat]}({after[repeat:]})"
+    return f"{q}.{after}" + ("…" if r else "")
+
+def division_steps(a, b, places=DECIMAL_PLACES):
+    divisor = to_int(b)
+    yield Step("Step 1: Set up the long division", (f"{a} ÷ {b}", "Work from the left, one digit at a time"))
+    n = 1
+    r = 0
+    started = False
+    for i, d in enumerate(a):
+        r = r * 10 + int(d)
+        q, rest = divmod(r, divisor)
+        n += 1
+        if not started and q == 0 and i < len(a) - 1:
+            yield Step(f"Step {n}: Bring down the {d}",
+                       (f"{b} does not go into {to_text(r)}, so bring down the next digit too",))
+            continue
+        started = True
+        yield Step(f"Step {n}: Bring down the {d}",
+                   (f"{b} goes into {to_text(r)} {q} time{'' if q == 1 else 's'}",
+                    f"{q} × {b} = {to_text(q * divisor)}, {to_text(r)} - {to_text(q * divisor)} = {to_text(rest)}",
+                    f"Write {q} in the answer"))
+        r = rest
+    quotient = exact(EXACT.divide_int, a, b)
+    n += 1
+    yield Step(f"Step {n}: Whole-number answer", (f"{a} ÷ {b} = {quotient} remainder {to_text(r)}",))
+    if not r or not places:
+        return
+    digits, repeat = expand(r, divisor, places)
+    n += 1
+    yield Step(f"Step {n}: Keep going after the decimal point",
+               (f"Put a decimal point after {quotient} and bring down zeros",))
+    for brought, digit, rest in digits:
+        n += 1
+        yield Step(f"Step {n}: Bring down a 0",
+                   (f"{b} goes into {to_text(brought)} {digit} time{'' if digit == 1 else 's'}, "
+                    f"remainder {to_text(rest)}", f"Write {digit}"))
+    n += 1
+    if repeat is not None:
+        cycle = "".join(str(d) for _, d, _ in digits[repeat:])
+        yield Step(f"Step {n}: The remainder {to_text(digits[-1][2])} came back",
+                   (f"From here the digits {cycle} repeat forever (shown in brackets)",
+                    decimal_text(quotient, digits, repeat, r)))
+    elif digits[-1][2]:
+        yield Step(f"Step {n}: Stop after {places} decimal places", (decimal_text(quotient, digits, None, 1),))
+    else:
+        yield Step(f"Step {n}: Remainder 0, the division ends", (decimal_text(quotient, digits, None, 0),))
+
+def column_division(a, b, places=DECIMAL_PLACES):
+    da, db = digits_of(a), digits_of(b)
+    if db == "0":
+        return Worked((Step("Step 1: Dividing by 0",
+                            ("You can't share something into 0 groups, so dividing by 0 has no answer.",)),),
+                      None, "undefined — you can't divide by 0")
+    q, r = EXACT.divmod(decimal.Decimal(da), decimal.Decimal(db))
+    quotient, remainder = str(q), str(r)
+    text = f"{quotient} remainder {remainder}"
+    if r and places:
+        digits, repeat = expand(to_int(remainder), to_int(db), places)
+        text += f" = {decimal_text(quotient, digits, repeat, digits[-1][2])}"
+    if isinstance(a, int) and isinstance(b, int):
+        answer = (a // b, a % b)
+    else:
+        answer = (quotient, remainder)
+    return Worked(division_steps(da, db, places), answer, text)
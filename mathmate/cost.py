@@ -0,0 +1,401 @@
+# mathmate/cost.py
+# A look at a typed problem before anything solves it. "9^9^9" is five
+# characters like "2+2", but its answer has 370 million digits; working it out
+# would pin a CPU for minutes. The estimate reads the problem once, without
+# SymPy, and the router sends it down one of three paths:
+#
+#   fast    whole numbers and fractions, or an equation of degree 2 or less
+#           in x: the exact int/Fraction code (mathmate/expressions.py,
+#           mathmate/polynomial.py), in the page's own process
+#   sympy   everything else that looks small enough: SymPy, in the solver
+#           pool where the page has one (mathmate/sandbox.py)
+#   reject  too long, too deeply nested or an answer too big to write down:
+#           a friendly message instead of a solve
+#
+#   r = route("9^9^9")      # Route(path='reject', reason='That problem is too big ...', cost=Cost(...))
+#   route("9^9^9", left_powers=True)   # fast: mathmate_app.py works out (9^9)^9
+#   with routed("app", r):  # times the solve and records the estimate with it
+#       ...
+#
+#   python -m mathmate.cost "9^9^9" "2x + 3 = 7"   # the estimates and routes
+#   python -m mathmate.cost --summary costs.jsonl  # what happened in production
+#   python -m mathmate.cost --check                # fast path vs SymPy on tricky inputs
+#
+# Estimated sizes are in decimal digits. Numbers are worked out exactly while
+# they stay under EXACT_DIGITS digits (so 9^9 is known to be 387420489, and
+# 9^387420489 to have hundreds of millions of digits); past that, the digits
+# are bounded from the digits of the parts (a × b: da + db, a^n: n × da, ...).
+#
+# Thresholds (environment):
+#   MATHMATE_COST_MAX_LENGTH=10000     characters
+#   MATHMATE_COST_MAX_DEPTH=100        brackets inside brackets
+#   MATHMATE_COST_MAX_OPERATORS=2000
+#   MATHMATE_COST_MAX_DIGITS=10000     digits in any number or the answer
+#   MATHMATE_COST_FAST_DIGITS=1000     the fast path's limit for the answer
+#   MATHMATE_COST_LOG=costs.jsonl      log every routed problem: estimate,
+#                                      route and the time it really took
+
+import argparse
+import json
+import math
+import os
+import re
+import statistics
+import sys
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from fractions import Fraction
+
+from mathmate.metrics import count, observe
+from mathmate.sandbox import TOO_BIG_MESSAGE
+
+MAX_LENGTH = int(os.getenv("MATHMATE_COST_MAX_LENGTH", "10000"))
+MAX_DEPTH = int(os.getenv("MATHMATE_COST_MAX_DEPTH", "100"))
+MAX_OPERATORS = int(os.getenv("MATHMATE_COST_MAX_OPERATORS", "2000"))
+MAX_DIGITS = int(os.getenv("MATHMATE_COST_MAX_DIGITS", "10000"))
+FAST_DIGITS = int(os.getenv("MATHMATE_COST_FAST_DIGITS", "1000"))
+COST_LOG = os.getenv("MATHMATE_COST_LOG") or None
+
+EXACT_DIGITS = 60  # numbers are kept exactly up to this size
+LOG10_2 = math.log10(2)
+
+# numbers, names, operators and brackets; group 4 is anything else
+TOKEN = re.compile(r"\s*(?:(\d+\.?\d*|\.\d+)|([A-Za-z_]\w*)|(\*\*|[-+*/^=(),!%])|(\S))")
+
+Cost = namedtuple("Cost", "parsed length numbers max_digits operators depth tower "
+                          "result_digits degree exact symbols equation")
+Route = namedtuple("Route", "path reason cost text")
+
+# ==========================
+# ESTIMATE
+# ==========================
+# What is known about a part of the problem: `digits` bounds log10 of its size
+# (numerator or denominator, whichever is bigger), `degree` is its degree in x
+# (None: not a polynomial), `value` its exact value while it is a small enough
+# number, `exact` whether int/Fraction arithmetic can work it out, `tower` the
+# longest run of powers in it.
+Part = namedtuple("Part", "digits degree value exact tower")
+
+def _digits(value):
+    # decimal digits of the bigger of numerator and denominator
+    value = Fraction(value)
+    return max(abs(value.numerator), value.denominator).bit_length() * LOG10_2
+
+def _known(value, tower=0):
+    return Part(_digits(value), 0, value, True, tower)
+
+def _pow10(d):
+    return math.inf if d > 300 else 10.0 ** d
+
+class _Reader:
+    def __init__(self, tokens, left_powers=False):
+        self.tokens = tokens
+        self.left_powers = left_powers
+        self.i = 0
+        self.operators = 0
+        self.symbols = 0
+
+    def peek(self):
+        return self.tokens[self.i] if self.i < len(self.tokens) else None
+
+    def take(self):
+        t = self.peek()
+        self.i += 1
+        return t
+
+    def expect(self, t):
+        if self.take() != t:
+            raise ValueError(f"expected {t!r}")
+
+    def side(self):
+        p = self.term()
+        while self.peek() in ("+", "-"):
+            self.take()
+            self.operators += 1
+            q = self.term()
+            if p.value is not None and q.value is not None:
+                p = _known(p.value + q.value)
+            else:
+                p = Part(max(p.digits, q.digits) + LOG10_2, _max_degree(p, q), None,
+                         p.exact and q.exact, max(p.tower, q.tower))
+        return p
+
+    def term(self):
+        p = self.unary()
+        while True:
+            t = self.peek()
+            if t in ("*", "/", "%"):
+                self.take()
+                q = self.unary()
+            elif t is not None and (t == "(" or t[0].isalpha() or t[0] == "_"):
+                t = "*"  # implicit multiplication: 2x, 3(x + 1)
+                q = self.power()
+            else:
+                return p
+            self.operators += 1
+            p = _times(p, q) if t == "*" else _divide(p, q) if t == "/" else _modulo(p, q)
+
+    def unary(self):
+        if self.peek() in ("+", "-"):
+            if self.left_powers:
+                return self.power(self.signed())
+            negate = self.take() == "-"
+            p = self.unary()
+            return p._replace(value=-p.value) if negate and p.value is not None else p
+        return self.power()
+
+    def signed(self):
+        # a sign as the calculator reads it (mathmate/expressions.py tokenize):
+        # "-2" is one number, so -2^2 is (-2)^2, and "-(" is "-1 * ("
+        negate = self.take() == "-"
+        t = self.peek()
+        if t is not None and (t[0].isdigit() or t[0] == "."):
+            p = self.atom()
+            return p._replace(value=-p.value) if negate and p.value is not None else p
+        if t == "(":
+            return _known(Fraction(-1 if negate else 1))  # term() multiplies it by the bracket
+        return self.unary()
+
+    def power(self, base=None):
+        base = self.postfix() if base is None else base
+        if self.left_powers:
+            # the calculator works powers out left to right: 2^3^2 is (2^3)^2
+            while self.peek() in ("^", "**"):
+                self.take()
+                self.operators += 1
+                base = _power(base, self.signed() if self.peek() in ("+", "-") else self.postfix())
+            return base
+        if self.peek() in ("^", "**"):
+            self.take()
+            self.operators += 1
+            return _power(base, self.unary())  # right-associative: 9^9^9 is 9^(9^9)
+        return base
+
+    def postfix(self):
+        p = self.atom()
+        while self.peek() == "!":
+            self.take()
+            self.operators += 1
+            p = _factorial(p)
+        return p
+
+    def atom(self):
+        t = self.take()
+        if t is None:
+            raise ValueError("missing a number")
+        if t[0].isdigit() or t[0] == ".":
+            if "." in t:
+                return Part(len(t.split(".")[0]), 0, None, False, 0)
+            return _known(Fraction(int(t)))
+        if t == "(":
+            p = self.side()
+            self.expect(")")
+            return p
+        if t[0].isalpha() or t[0] == "_":
+            if self.peek() == "(":  # a function: sqrt(2), sin(x), ...
+                self.take()
+                args = [self.side()]
+                while self.peek() == ",":
+                    self.take()
+                    args.append(self.side())
+                self.expect(")")
+                self.symbols += 1
+                return Part(max(a.digits for a in args), 0 if all(a.degree == 0 for a in args) else None,
+                            None, False, max(a.tower for a in args))
+            if t == "x":
+                return Part(0, 1, None, True, 0)
+            self.symbols += 1
+            return Part(0, None, None, False, 0)
+        raise ValueError(f"unexpected {t!r}")
+
+def _max_degree(p, q):
+    return None if p.degree is None or q.degree is None else max(p.degree, q.degree)
+
+def _times(p, q):
+    if p.value is not None and q.value is not None:
+        return _known(p.value * q.value)
+    degree = None if p.degree is None or q.degree is None else p.degree + q.degree
+    return Part(p.digits + q.digits, degree, None, p.exact and q.exact, max(p.tower, q.tower))
+
+def _divide(p, q):
+    if p.value is not None and q.value:
+        return _known(p.value / q.value)
+    degree = p.degree if q.degree == 0 else None  # x in a denominator: not a polynomial
+    return Part(p.digits + q.digits, degree, None, p.exact and q.exact and q.value != 0,
+                max(p.tower, q.tower))
+
+def _modulo(p, q):
+    if p.value is not None and q.value:
+        return _known(p.value % q.value)
+    return Part(q.digits, 0 if p.degree == q.degree == 0 else None, None, False, max(p.tower, q.tower))
+
+def _power(base, exponent):
+    tower = max(base.tower, exponent.tower + 1)
+    e = exponent.value
+    if e is None:
+        if exponent.degree == 0:
+            # a number too big to keep: it has up to 10^digits units
+            digits = _pow10(exponent.digits) * base.digits if base.digits else 0
+            return Part(digits, 0, None, False, tower)
+        return Part(base.digits, None, None, False, tower)  # x in the exponent
+    digits = abs(e) * base.digits
+    whole = e.denominator == 1
+    if base.value is not None and whole and digits <= EXACT_DIGITS and (base.value or e >= 0):
+        return _known(base.value ** int(e), tower)
+    if base.degree == 0:
+        degree = 0
+    elif base.degree is not None and whole and e >= 0:
+        degree = base.degree * int(e)
+    else:
+        degree = None
+    return Part(float(digits), degree, None, base.exact and whole, tower)
+
+def _factorial(p):
+    n = p.value
+    if n is None or n.denominator != 1 or n < 0:
+        # n! has at most n × (digits of n) digits
+        digits = _pow10(p.digits) * p.digits if p.degree == 0 else p.digits
+        return Part(digits, 0 if p.degree == 0 else None, None, False, p.tower)
+    digits = math.lgamma(int(n) + 1) / math.log(10)
+    if digits <= EXACT_DIGITS:
+        return _known(Fraction(math.factorial(int(n))), p.tower)
+    return Part(digits, 0, None, True, p.tower)
+
+def estimate(text, left_powers=False):
+    # the Cost of solving `text`, read once and without SymPy; left_powers
+    # reads it the way mathmate_app.py's evaluator does (see _Reader.signed)
+    tokens = []
+    depth = deepest = numbers = longest = 0
+    for m in TOKEN.finditer(text):
+        t = m.group(m.lastindex)
+        tokens.append(t)
+        if t == "(":
+            depth += 1
+            deepest = max(deepest, depth)
+        elif t == ")":
+            depth -= 1
+        elif t[0].isdigit() or t[0] == ".":
+            numbers += 1
+            longest = max(longest, len(t.split(".")[0]))
+    cost = Cost(False, len(text), numbers, longest, sum(t in "+-*/^**!%" for t in tokens), deepest,
+                0, 0.0, None, False, 0, "=" in tokens)
+    if deepest > MAX_DEPTH or len(text) > MAX_LENGTH:
+        return cost  # not worth reading: it will be turned away anyway
+    reader = _Reader(tokens, left_powers)
+    try:
+        sides = [reader.side()]
+        while reader.peek() == "=":
+            reader.take()
+            sides.append(reader.side())
+        if reader.peek() is not None:
+            raise ValueError(f"unexpected {reader.peek()!r}")
+    except (ValueError, ZeroDivisionError, OverflowError, RecursionError):
+        return cost
+    degree = None if any(s.degree is None for s in sides) else max(s.degree for s in sides)
+    return cost._replace(parsed=True, operators=reader.operators, tower=max(s.tower for s in sides),
+                         result_digits=max(s.digits for s in sides), degree=degree,
+                         exact=all(s.exact for s in sides), symbols=reader.symbols)
+
+# ==========================
+# ROUTER
+# ==========================
+def route(text, left_powers=False):
+    cost = estimate(text, left_powers)
+    if cost.length > MAX_LENGTH:
+        return Route("reject", "That's a very long problem! Try splitting it into smaller ones. 😊", cost, text)
+    if cost.depth > MAX_DEPTH:
+        return Route("reject", "That's a lot of brackets inside brackets! Try fewer. 😊", cost, text)
+    if cost.operators > MAX_OPERATORS:
+        return Route("reject", "That problem has too many steps for me. Try a shorter one! 😊", cost, text)
+    if cost.max_digits > MAX_DIGITS or cost.result_digits > MAX_DIGITS:
+        return Route("reject", TOO_BIG_MESSAGE, cost, text)
+    if not cost.parsed:
+        # the solver gives its own error message (or reads something we don't)
+        return Route("sympy", "not read by the estimate", cost, text)
+    if cost.exact and not cost.symbols and cost.degree is not None and cost.degree <= 2 \
+            and cost.result_digits <= FAST_DIGITS:
+        return Route("fast", "whole numbers, fractions or degree 2 or less in x", cost, text)
+    return Route("sympy", "needs SymPy", cost, text)
+
+_log_lock = threading.Lock()
+
+def record_route(page, r, seconds):
+    # count the route and log the estimate with the time it really took
+    count("mathmate_route_total", (("page", page), ("route", r.path)))
+    observe("mathmate_route_seconds", (("page", page), ("route", r.path)), seconds)
+    if COST_LOG:
+        entry = {
+            "time": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "page": page,
+            "input": r.text[:200],
+            "route": r.path,
+            "ms": round(seconds * 1000, 3),
+            **{k: (None if v == math.inf else round(v, 1) if isinstance(v, float) else v)
+               for k, v in r.cost._asdict().items()},
+        }
+        with _log_lock:
+            with open(COST_LOG, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+@contextmanager
+def routed(page, r):
+    # times whatever solves `r` (nothing, for a rejection)
+    start = time.perf_counter()
+    try:
+        yield r
+    finally:
+        record_route(page, r, time.perf_counter() - start)
+
+# ==========================
+# CLI
+# ==========================
+def _summary(path, slowest):
+    entries = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                entries.append(json.loads(line))
+    print(f"{'route':<7} {'count':>7} {'p50 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for path_name in ("fast", "sympy", "reject"):
+        times = sorted(e["ms"] for e in entries if e["route"] == path_name)
+        if times:
+            p99 = times[min(len(times) - 1, int(len(times) * 0.99))]
+            print(f"{path_name:<7} {len(times):>7} {statistics.median(times):9.2f} {p99:9.2f} {times[-1]:9.2f}")
+    print(f"\nslowest {slowest}:")
+    for e in sorted(entries, key=lambda e: -e["ms"])[:slowest]:
+        print(f"  {e['ms']:9.2f} ms  {e['page']:<5} {e['route']:<6}  digits {e['result_digits']}  ops {e['operators']}  "
+              f"depth {e['depth']}  tower {e['tower']}  {e['input'][:50]!r}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Estimate what problems cost before solving them.")
+    parser.add_argument("problems", nargs="*")
+    parser.add_argument("--summary", metavar="LOG", help="summarize a MATHMATE_COST_LOG file instead")
+    parser.add_argument("--slowest", type=int, default=10)
+    parser.add_argument("--check", action="store_true",
+                        help="check the fast path gives SymPy's answers (on the problems given, or a built-in list)")
+    args = parser.parse_args(argv)
+    if args.summary:
+        _summary(args.summary, args.slowest)
+        return
+    if args.check:
+        from mathmate.equations import FAST_PATH_CHECKS, check_fast_path
+        wrong = check_fast_path(args.problems or FAST_PATH_CHECKS)
+        for problem, fast, expected in wrong:
+            print(f"{problem!r}: fast path {fast}, SymPy {expected}")
+        print(f"{len(wrong)} of {len(args.problems or FAST_PATH_CHECKS)} problems disagree")
+        sys.exit(1 if wrong else 0)
+    if not args.problems:
+        parser.error("give some problems or --summary LOG")
+    for text in args.problems:
+        started = time.perf_counter()
+        r = route(text)
+        took = (time.perf_counter() - started) * 1000
+        c = r.cost
+        print(f"{text[:40]!r:<42} {r.path:<6} {took:6.3f} ms  digits {c.result_digits:.0f}  ops {c.operators}  "
+              f"depth {c.depth}  tower {c.tower}  degree {c.degree}  {'exact' if c.exact else 'inexact'}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+# mathmate/equations.py
+# Equation and expression solvers used by mathmate_v3.5_ultra.py and
+# mathmate_v4_ultra.py. Linear and quadratic equations in x are solved in
+# closed form by mathmate/polynomial.py; everything else goes to SymPy.
+
+from mathmate.lazy import lazy_import
+from mathmate.polynomial import NotPolynomial, parse_polynomial, solve_polynomial_equation, to_sympy
+from mathmate.sandbox import TooBig
+
+sp = lazy_import("sympy")
+
+def step_by_step_solver(expr_str):
+    steps = []
+
+    try:
+        # Try to detect equations like "2x + 3 = 7"
+        if "=" in expr_str:
+            quick = solve_polynomial_equation(expr_str)
+            if quick is not None:
+                return quick
+
+            x = sp.symbols('x')
+            left, right = expr_str.split("=")
+            equation = sp.Eq(sp.simplify(left), sp.simplify(right))
+            steps.append(f"Equation detected: {equation}")
+
+            solution = sp.solve(equation, x)
+
+            steps.append("Step 1: Rearrange terms to isolate variable.")
+            steps.append("Step 2: Simplify both sides.")
+            steps.append("Step 3: Solve for the unknown.")
+
+            return solution, steps
+        else:
+            # Just a normal expression
+            simplified = sp.simplify(expr_str)
+            steps.append(f"Simplifying expression: {expr_str}")
+            steps.append(f"Result: {simplified}")
+            return simplified, steps
+    except Exception as e:
+        return None, [f"❌ Error: {e}"]
+
+def solve_equation(equation_str):
+    try:
+        quick = solve_polynomial_equation(equation_str)
+        if quick is not None:
+            return quick[0]
+        x = sp.symbols('x')
+        lhs, rhs = equation_str.split('=')
+        eq = sp.Eq(sp.simplify(lhs), sp.simplify(rhs))
+        sol = sp.solve(eq, x)
+        return sol
+    except Exception:
+        return ["Invalid equation"]
+
+def give_hint(expr_str):
+    if "=" in expr_str:
+        return "👉 Try moving terms with 'x' to one side and numbers to the other."
+    elif "+" in expr_str:
+        return "👉 Add similar terms together."
+    elif "*" in expr_str:
+        return "👉 Multiply step by step."
+    else:
+        return "👉 Break it into smaller steps."
+
+# ==========================
+# FAST PATH (for problems mathmate/cost.py routes "fast")
+# ==========================
+def quick_solver(expr_str):
+    # (solution, steps) like step_by_step_solver, worked out exactly without
+    # SymPy; None if this problem needs SymPy after all. Numbers are read by
+    # the same parser as equations, which follows SymPy's rules: 2^3^2 is
+    # 2^(3^2) and -2^2 is -(2^2).
+    if "=" in expr_str:
+        return solve_polynomial_equation(expr_str)
+    if "." in expr_str:
+        return None  # decimals print the way SymPy prints them
+    try:
+        p = parse_polynomial(expr_str)
+    except (NotPolynomial, ZeroDivisionError, ValueError):
+        return None
+    if len(p) > 1:
+        return None  # has x in it: SymPy simplifies those
+    value = to_sympy(p[0])
+    return value, [f"Simplifying expression: {expr_str}", f"Result: {value}"]
+
+# inputs whose fast-path answers must match SymPy's (python -m mathmate.cost --check)
+FAST_PATH_CHECKS = ["2^3^2", "2**3**2", "-2^2", "-3^2+1", "2^-3", "-(2+3)^2", "2^-1^2",
+                    "(5+3)^2*7-12/4+2^5", "7/2*2", "2x + 3 = 7", "x^2 - 5x + 6 = 0", "-x^2 = -4"]
+
+def check_fast_path(problems=FAST_PATH_CHECKS):
+    # [(problem, fast answer, SymPy answer)] for every problem they disagree on
+    wrong = []
+    for problem in problems:
+        quick = quick_solver(problem)
+        if quick is None:
+            continue
+        expected = step_by_step_solver(problem)[0]
+        if quick[0] != expected:
+            wrong.append((problem, quick[0], expected))
+    return wrong
+
+# ==========================
+# SANDBOXED VERSIONS (run in a SolverPool, see mathmate/sandbox.py)
+# ==========================
+def step_by_step_solver_sandboxed(pool, expr_str):
+    try:
+        return pool.run(step_by_step_solver, expr_str)
+    except TooBig as e:
+        return None, [f"❌ {e}"]
+
+def solve_equation_sandboxed(pool, equation_str):
+    try:
+        return pool.run(solve_equation, equation_str)
+    except TooBig as e:
+        return [str(e)]
+
+def solve_equation_routed(pool, equation_str, route):
+    # the fast path in this process when it applies, else the pool
+    if route.path == "fast":
+        quick = solve_polynomial_equation(equation_str)
+        if quick is not None:
+            return quick[0]
+    return solve_equation_sandboxed(pool, equation_str)
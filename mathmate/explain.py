@@ -0,0 +1,162 @@
+# mathmate/explain.py
+# AI explanations for mathmate_v5.py, streamed token by token with a hard
+# deadline, so the page can show the verdict first and let the explanation
+# arrive as it is written.
+#
+#   for text in stream_explanation(question, user_answer):   # plain generator,
+#       ...                                                   # fits st.write_stream
+#
+# The network calls run on one background asyncio loop shared by every session.
+# If the backend is slow or fails, the generator ends with a friendly line
+# instead of hanging the page.
+#
+# Backends are pluggable: anything with an "async def stream(prompt)" that
+# yields text. The default talks to the OpenAI completions API; point
+# MATHMATE_AI_BASE_URL at "python -m mathmate.stub_llm" to work offline, or set
+# MATHMATE_AI_BACKEND=package.module:factory to use your own. get_backend()
+# puts the process-wide gateway in front of it (mathmate/gateway.py), so
+# identical questions share one request and the account's limits are kept.
+
+import asyncio
+import importlib
+import os
+import queue
+import threading
+import time
+
+from mathmate import gateway
+from mathmate.lazy import lazy_import
+from mathmate.metrics import record
+
+openai = lazy_import("openai")
+
+BACKEND = os.getenv("MATHMATE_AI_BACKEND", "openai")
+BASE_URL = os.getenv("MATHMATE_AI_BASE_URL") or None
+MODEL = os.getenv("MATHMATE_AI_MODEL", "text-davinci-003")
+DEADLINE = float(os.getenv("MATHMATE_AI_DEADLINE", "10"))
+MAX_TOKENS = 250
+
+TIMEOUT_MESSAGE = "⏰ The AI tutor is taking too long, so let's keep going!"
+
+def build_prompt(question, user_answer=None):
+    return f"""
+You are a super fun, friendly math tutor for kids.
+Explain the answer to this problem step by step in a funny, happy, emoji-filled way.
+Problem: {question}
+User answer: {user_answer if user_answer is not None else "None"}
+Make it clear and educational like a story, and guide the kid to understand.
+"""
+
+# ==========================
+# BACKENDS
+# ==========================
+class OpenAIBackend:
+    # streams from an OpenAI-compatible /completions endpoint (or the local stub)
+    def __init__(self, api_key=None, base_url=BASE_URL, model=MODEL, timeout=DEADLINE, max_tokens=MAX_TOKENS):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.model = model
+        self.timeout = timeout
+        self.max_tokens = max_tokens
+        self._client = None
+
+    async def stream(self, prompt):
+        if self._client is None:
+            self._client = openai.AsyncOpenAI(api_key=self.api_key, base_url=self.base_url,
+                                              timeout=self.timeout, max_retries=0)
+        response = await self._client.completions.create(
+            model=self.model,
+            prompt=prompt,
+            temperature=0.9,
+            max_tokens=self.max_tokens,
+            stream=True,
+        )
+        async for chunk in response:
+            if chunk.choices:
+                yield chunk.choices[0].text
+
+_backends = {}
+_override = None
+
+def set_backend(backend):
+    # use this backend for every explanation (None: back to MATHMATE_AI_BACKEND)
+    global _override
+    _override = backend
+
+def get_backend(api_key=None):
+    if _override is not None:
+        return _override
+    backend = _backends.get(api_key)
+    if backend is None:
+        if BACKEND == "openai":
+            backend = OpenAIBackend(api_key)
+        else:
+            module, _, name = BACKEND.partition(":")
+            backend = getattr(importlib.import_module(module), name)(api_key)
+        if gateway.ENABLED:
+            backend = gateway.Gateway(backend)
+        _backends[api_key] = backend
+    return backend
+
+# ==========================
+# STREAMING
+# ==========================
+_loop = None
+_loop_lock = threading.Lock()
+
+def _event_loop():
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="mathmate-ai", daemon=True).start()
+    return _loop
+
+def stream_explanation(question, user_answer=None, backend=None, deadline=DEADLINE, status=None):
+    # yields pieces of the explanation; never takes longer than `deadline` seconds.
+    # status (a dict), if given, gets status["complete"] = True when the whole
+    # explanation arrived (no timeout, no error)
+    backend = backend or get_backend()
+    chunks = queue.Queue()
+
+    async def pump():
+        try:
+            async for text in backend.stream(build_prompt(question, user_answer)):
+                chunks.put(("text", text))
+        except Exception as e:
+            chunks.put(("error", e))
+        finally:
+            chunks.put(("end", None))
+
+    future = asyncio.run_coroutine_threadsafe(pump(), _event_loop())
+    asked = time.perf_counter()
+    end = time.monotonic() + deadline
+    started = False
+    try:
+        while True:
+            try:
+                kind, value = chunks.get(timeout=max(end - time.monotonic(), 0))
+            except queue.Empty:
+                yield ("\n\n" if started else "") + TIMEOUT_MESSAGE
+                return
+            if kind == "end":
+                if status is not None:
+                    status["complete"] = started
+                return
+            if kind == "error":
+                yield ("\n\n" if started else "") + f"Oops! AI explanation failed 😢. Error: {value}"
+                return
+            if not started:
+                value = value.lstrip()
+                if not value:
+                    continue
+                started = True
+                record("ai_first_token", time.perf_counter() - asked)
+            yield value
+    finally:
+        future.cancel()  # deadline hit or the page moved on: stop the request
+        record("ai_stream", time.perf_counter() - asked)
+
+def get_ai_explanation(question, user_answer=None, backend=None, deadline=DEADLINE):
+    # the whole explanation as one string
+    return "".join(stream_explanation(question, user_answer, backend, deadline)).strip()
@@ -0,0 +1,236 @@
+# mathmate/explain_cache.py
+# Disk cache of AI explanations, shared by every Streamlit worker on the box.
+#
+# Students' answers to a bank problem fall into a few classes (correct, blank,
+# a handful of common wrong numbers), so an explanation is stored under
+# question id + answer class and reused. Each key keeps up to VARIANTS
+# different explanations so students don't always see the same story. Old rows
+# expire after TTL seconds, and the least recently used rows go once the table
+# holds more than MAX_ROWS.
+#
+#   st.write_stream(cached_explanation(question, user_answer, correct, answer))
+#   python -m mathmate.explain_cache --warm     # prefill the whole v5 bank
+#
+# SQLite in WAL mode handles the locking between processes; every call opens
+# its own short-lived connection, so threads never share one.
+
+import argparse
+import hashlib
+import os
+import random
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from fractions import Fraction
+
+from mathmate.explain import DEADLINE, get_backend, stream_explanation
+from mathmate.metrics import span
+
+PATH = os.getenv("MATHMATE_EXPLAIN_CACHE",
+                 os.path.join(os.path.expanduser("~"), ".cache", "mathmate", "explanations.sqlite3"))
+TTL = float(os.getenv("MATHMATE_EXPLAIN_TTL", str(30 * 24 * 3600)))
+MAX_ROWS = int(os.getenv("MATHMATE_EXPLAIN_MAX_ROWS", "5000"))
+VARIANTS = int(os.getenv("MATHMATE_EXPLAIN_VARIANTS", "3"))
+WARM = os.getenv("MATHMATE_EXPLAIN_WARM", "1") != "0"
+
+# ==========================
+# KEYS
+# ==========================
+def question_id(question):
+    return hashlib.sha1(question.encode("utf-8")).hexdigest()[:12]
+
+def normalize_answer(answer):
+    # numbers in exact form ("  07 " -> "7", "3.50" -> "7/2"), other text lowercased
+    text = " ".join(str(answer or "").lower().split())
+    try:
+        value = Fraction(text.replace(",", ""))
+    except (ValueError, ZeroDivisionError):
+        return text
+    return str(value)
+
+def answer_class(user_answer, correct):
+    # "correct", "blank" or "wrong:<normalized answer>"
+    if correct:
+        return "correct"
+    text = normalize_answer(user_answer)
+    return f"wrong:{text}" if text else "blank"
+
+def class_answer(cls, correct_answer):
+    # the answer to put in the prompt for a whole class
+    if cls == "correct":
+        return correct_answer
+    if cls == "blank":
+        return None
+    return cls[len("wrong:"):]
+
+def cache_key(question, cls):
+    return f"{question_id(question)}|{cls}"
+
+def common_classes(correct_answer):
+    # classes worth prefilling: correct, blank and off-by-one numbers
+    classes = ["correct", "blank"]
+    try:
+        value = Fraction(normalize_answer(correct_answer))
+    except (ValueError, ZeroDivisionError):  # e.g. "1/0"
+        return classes
+    return classes + [f"wrong:{value - 1}", f"wrong:{value + 1}"]
+
+# ==========================
+# STORE
+# ==========================
+class ExplanationCache:
+    def __init__(self, path=PATH, ttl=TTL, max_rows=MAX_ROWS, variants=VARIANTS):
+        self.path = path
+        self.ttl = ttl
+        self.max_rows = max_rows
+        self.variants = variants
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("""CREATE TABLE IF NOT EXISTS explanations (
+                key TEXT NOT NULL, variant INTEGER NOT NULL, text TEXT NOT NULL,
+                created REAL NOT NULL, used REAL NOT NULL, PRIMARY KEY (key, variant))""")
+            db.execute("CREATE INDEX IF NOT EXISTS explanations_used ON explanations (used)")
+            db.execute("CREATE TABLE IF NOT EXISTS leases (name TEXT PRIMARY KEY, until REAL NOT NULL)")
+
+    @contextmanager
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            yield db
+        finally:
+            db.close()
+
+    def count(self, key):
+        with self._connect() as db:
+            return db.execute("SELECT COUNT(*) FROM explanations WHERE key = ? AND created > ?",
+                              (key, time.time() - self.ttl)).fetchone()[0]
+
+    def get(self, key):
+        # a random stored variant, once the key has all of its variants
+        now = time.time()
+        with self._connect() as db:
+            rows = db.execute("SELECT variant, text FROM explanations WHERE key = ? AND created > ?",
+                              (key, now - self.ttl)).fetchall()
+            if len(rows) < self.variants:
+                return None
+            variant, text = random.choice(rows)
+            db.execute("UPDATE explanations SET used = ? WHERE key = ? AND variant = ?", (now, key, variant))
+        return text
+
+    def put(self, key, text):
+        now = time.time()
+        with self._connect() as db:
+            db.execute("BEGIN IMMEDIATE")
+            rows = db.execute("SELECT variant, created FROM explanations WHERE key = ? ORDER BY created",
+                              (key,)).fetchall()
+            taken = {v for v, _ in rows}
+            free = [v for v in range(self.variants) if v not in taken]
+            # a free slot, else overwrite the oldest variant
+            variant = free[0] if free else rows[0][0]
+            db.execute("INSERT OR REPLACE INTO explanations VALUES (?, ?, ?, ?, ?)",
+                       (key, variant, text, now, now))
+            db.execute("DELETE FROM explanations WHERE created <= ?", (now - self.ttl,))
+            extra = db.execute("SELECT COUNT(*) FROM explanations").fetchone()[0] - self.max_rows
+            if extra > 0:
+                db.execute("DELETE FROM explanations WHERE rowid IN "
+                           "(SELECT rowid FROM explanations ORDER BY used LIMIT ?)", (extra,))
+            db.execute("COMMIT")
+
+    def clear(self):
+        with self._connect() as db:
+            db.execute("DELETE FROM explanations")
+
+    def claim(self, name, seconds):
+        # cross-process lease: True for the one process that may run job `name` now
+        now = time.time()
+        with self._connect() as db:
+            db.execute("BEGIN IMMEDIATE")
+            row = db.execute("SELECT until FROM leases WHERE name = ?", (name,)).fetchone()
+            ok = row is None or row[0] < now
+            if ok:
+                db.execute("INSERT OR REPLACE INTO leases VALUES (?, ?)", (name, now + seconds))
+            db.execute("COMMIT")
+        return ok
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ExplanationCache()
+    return _cache
+
+# ==========================
+# EXPLAINING
+# ==========================
+def cached_explanation(question, user_answer, correct, correct_answer,
+                       backend=None, cache=None, deadline=DEADLINE):
+    # generator for st.write_stream: the cached text at once, or a fresh
+    # explanation streamed from the backend and stored if it arrived complete
+    cache = cache or get_cache()
+    cls = answer_class(user_answer, correct)
+    key = cache_key(question, cls)
+    with span("explanation_cache"):
+        text = cache.get(key)
+    if text is not None:
+        yield text
+        return
+    parts = []
+    status = {}
+    for piece in stream_explanation(question, class_answer(cls, correct_answer), backend, deadline, status):
+        parts.append(piece)
+        yield piece
+    if status.get("complete"):
+        cache.put(key, "".join(parts).strip())
+
+def warm_up(problems, backend=None, cache=None, deadline=DEADLINE):
+    # fill every common class of every problem up to its number of variants;
+    # stops at the first failed call (no key, no network) rather than retrying
+    cache = cache or get_cache()
+    made = 0
+    for problem in problems:
+        for cls in common_classes(problem["answer"]):
+            key = cache_key(problem["question"], cls)
+            while cache.count(key) < cache.variants:
+                status = {}
+                text = "".join(stream_explanation(problem["question"], class_answer(cls, problem["answer"]),
+                                                  backend, deadline, status)).strip()
+                if not status.get("complete"):
+                    return made
+                cache.put(key, text)
+                made += 1
+    return made
+
+def start_warm_up(problems, backend=None, cache=None):
+    # warm_up in a daemon thread, in at most one process at a time
+    cache = cache or get_cache()
+    if not WARM or not cache.claim("warm_up", 3600):
+        return None
+    thread = threading.Thread(target=warm_up, args=(problems, backend, cache),
+                              name="mathmate-explain-warm-up", daemon=True)
+    thread.start()
+    return thread
+
+def main(argv=None):
+    from mathmate.word_problems import WORD_PROBLEMS
+
+    parser = argparse.ArgumentParser(description="Manage the AI explanation cache used by MathMate V5.")
+    parser.add_argument("--warm", action="store_true", help="prefill explanations for the whole problem bank")
+    parser.add_argument("--clear", action="store_true", help="delete every cached explanation")
+    args = parser.parse_args(argv)
+
+    cache = get_cache()
+    if args.clear:
+        cache.clear()
+    if args.warm:
+        made = warm_up(WORD_PROBLEMS, get_backend(os.getenv("OPENAI_API_KEY")), cache)
+        print(f"Added {made} explanations.")
+    keys = sum(cache.count(cache_key(p["question"], c)) for p in WORD_PROBLEMS for c in common_classes(p["answer"]))
+    print(f"{cache.path}: {keys} explanations for the problem bank's common answers.")
+
+if __name__ == "__main__":
+    main()
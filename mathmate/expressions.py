@@ -0,0 +1,394 @@
+# mathmate/expressions.py
+# Step-by-step arithmetic for mathmate_app.py (no Streamlit here, so it can
+# also be used from scripts, batch jobs and worker processes)
+
+import os
+import re
+import threading
+from collections import OrderedDict, namedtuple
+from fractions import Fraction
+from functools import lru_cache
+
+from mathmate.cost import route
+from mathmate.lazy import lazy_import
+from mathmate.metrics import span
+
+sp = lazy_import("sympy")  # only needed for decimals, roots and pretty display
+
+# ---------- Helper functions for safe step-by-step calculation ----------
+ALLOWED = re.compile(r'^[0-9\s+\-*/().\^xX×÷]+$')  # allowed characters (we'll convert x/÷/^)
+def clean_input(s: str) -> str:
+    s = s.replace("×", "*").replace("x", "*").replace("X", "*").replace("÷", "/")
+    s = s.replace("^", "**")
+    s = s.replace(",", ".")  # allow comma decimals if typed
+    return s
+
+def is_safe(s: str) -> bool:
+    return bool(ALLOWED.match(s))
+
+def tokenize(expr: str):
+    tokens = []
+    i = 0
+    L = len(expr)
+    while i < L:
+        c = expr[i]
+        if c.isspace():
+            i += 1
+            continue
+        # number (int or decimal)
+        if c.isdigit() or c == '.':
+            j = i
+            while j < L and (expr[j].isdigit() or expr[j] == '.'):
+                j += 1
+            tokens.append(expr[i:j])
+            i = j
+            continue
+        # exponent operator **
+        if c == '*' and i+1 < L and expr[i+1] == '*':
+            tokens.append('**'); i += 2; continue
+        # single-char operators / parentheses
+        if c in '+-*/()':
+            tokens.append(c); i += 1; continue
+        # anything else (shouldn't happen after cleaning)
+        raise ValueError(f"Invalid character: {c}")
+    # handle unary minus (like -3 or -(...))
+    j = 0
+    while j < len(tokens):
+        if tokens[j] == '-' and (j == 0 or tokens[j-1] in ('(', '+', '-', '*', '/', '**')):
+            # if next is number -> make negative number
+            if j+1 < len(tokens) and re.match(r'^\d+(\.\d+)?$', tokens[j+1]):
+                tokens[j+1] = '-' + tokens[j+1]
+                tokens.pop(j)
+                continue
+            # if next is '(' -> convert "- (" to "-1 * ("
+            if j+1 < len(tokens) and tokens[j+1] == '(':
+                tokens[j] = '-1'
+                tokens.insert(j+1, '*')
+                j += 2
+                continue
+        j += 1
+    return tokens
+
+def compute_with_sympy(left: str, op: str, right: str):
+    # Use SymPy to compute exactly (rationals) when possible
+    expr_str = f"({left}){op}({right})"
+    val = sp.simplify(sp.sympify(expr_str))
+    return val
+
+# ---------- Single-pass evaluator ----------
+# The expression is parsed once into groups (one per pair of parentheses) and
+# each group is reduced in one linear pass per precedence level. Groups are
+# reduced innermost/rightmost first and operators left to right, so the steps
+# come out in the same order as when we used to splice the token list.
+OP_WORDS = {'+':'add', '-':'subtract', '*':'multiply', '/':'divide', '**':'power'}
+PRECEDENCE = [('**',), ('*', '/'), ('+', '-')]
+
+def number_value(token: str, fast: bool = True):
+    # int for whole numbers, SymPy Float for decimals like '2.5'
+    if '.' in token:
+        return sp.Float(token)
+    if fast:
+        return int(token)
+    return sp.Integer(token)
+
+def apply_sympy_op(left, op: str, right):
+    # same result as compute_with_sympy, but on SymPy values (no string round trip)
+    if op == '+':
+        val = left + right
+    elif op == '-':
+        val = left - right
+    elif op == '*':
+        val = left * right
+    elif op == '/':
+        val = left / right
+    else:
+        val = left ** right
+    if not val.is_Number:
+        val = sp.simplify(val)
+    return val
+
+# ---------- Exact fast arithmetic ----------
+# Whole numbers and fractions are worked out with int/Fraction, which is all
+# that questions like 3+4*2 need. Decimals, roots and anything else go to
+# SymPy, so answers and step text look exactly as SymPy prints them.
+EXACT = (int, Fraction)
+
+def fast_op(left, op: str, right):
+    # None means "not a whole number or fraction" -> ask SymPy
+    if op == '+':
+        val = left + right
+    elif op == '-':
+        val = left - right
+    elif op == '*':
+        val = left * right
+    elif op == '/':
+        if right == 0:
+            return None
+        val = Fraction(left, right)
+    else:
+        if isinstance(right, Fraction):
+            return None  # roots, e.g. 2^(1/2)
+        if right < 0:
+            if left == 0:
+                return None
+            val = Fraction(left) ** right
+        else:
+            val = left ** right
+    if isinstance(val, Fraction) and val.denominator == 1:
+        return val.numerator
+    return val
+
+def to_sympy(val):
+    if isinstance(val, int):
+        return sp.Integer(val)
+    if isinstance(val, Fraction):
+        return sp.Rational(val.numerator, val.denominator)
+    return val
+
+def from_sympy(val):
+    if val.is_Integer:
+        return int(val)
+    if val.is_Rational:
+        return Fraction(int(val.p), int(val.q))
+    return val
+
+def apply_op(left, op: str, right, fast: bool = True):
+    if fast and isinstance(left, EXACT) and isinstance(right, EXACT):
+        val = fast_op(left, op, right)
+        if val is not None:
+            return val
+    return from_sympy(apply_sympy_op(to_sympy(left), op, to_sympy(right)))
+
+def value_text(val) -> str:
+    # same text as str() of the SymPy number
+    if isinstance(val, Fraction):
+        return f"{val.numerator}/{val.denominator}"
+    return str(val)
+
+def pretty_value(val) -> str:
+    # same text as sp.pretty(); SymPy stacks big fractions and wraps long
+    # numbers at the terminal width, so leave those to SymPy
+    if isinstance(val, EXACT):
+        text = value_text(val)
+        stacked = isinstance(val, Fraction) and abs(val.numerator) >= 10 and val.denominator >= 10
+        if len(text) < 20 and not stacked:
+            return text
+    return sp.pretty(to_sympy(val))
+
+def settle_value(val, text: str):
+    # floats used to be rounded to their printed digits by str() -> sympify
+    if isinstance(val, EXACT):
+        return val
+    if val.is_Float:
+        return sp.Float(text)
+    if not val.is_Rational and val.has(sp.Float):
+        return sp.sympify(text)
+    return val
+
+# ---------- Step records ----------
+# Working out an answer only records what each step did. The kid-friendly
+# text (with sp.pretty for results that need it) is made the first time a
+# step is shown, and kept, so a long expression whose steps nobody pages
+# through never pays for them.
+class ExprStep:
+    __slots__ = ("op", "left", "right", "result", "_text")
+
+    def __init__(self, op, left, right, result):
+        # op None: "Simplify (...)", `left` is then the bracket's items
+        self.op = op
+        self.left = left
+        self.right = right
+        self.result = result
+        self._text = None
+
+    def text(self) -> str:
+        if self._text is None:
+            if self.op is None:
+                inner = ' '.join(t if isinstance(t, str) else t[1] for t in self.left)
+                self._text = f"Simplify ({inner}) → {pretty_value(self.result)}"
+            else:
+                self._text = (f"Compute {self.left} {self.op} {self.right} → "
+                              f"{pretty_value(self.result)}  ({OP_WORDS[self.op]})")
+        return self._text
+
+    __str__ = text
+
+    def __repr__(self):
+        return f"ExprStep({self.text()!r})"
+
+def step_texts(steps):
+    return [step.text() for step in steps]
+
+def parse_tokens(tokens):
+    # groups[0] is the whole expression; every '(' opens a new group in order.
+    # A group alternates operands and operators; an int operand points at a
+    # nested group.
+    groups = [[]]
+    open_groups = [0]
+    want_operand = True
+    for t in tokens:
+        group = groups[open_groups[-1]]
+        if t == '(':
+            if not want_operand:
+                raise ValueError("Missing operator before '('")
+            group.append(len(groups))
+            open_groups.append(len(groups))
+            groups.append([])
+        elif t == ')':
+            if len(open_groups) == 1:
+                raise ValueError("Mismatched parentheses")
+            if not group:
+                raise ValueError("Empty parentheses")
+            if want_operand:
+                raise ValueError("Missing number before ')'")
+            open_groups.pop()
+        elif t in OP_WORDS:
+            if want_operand:
+                raise ValueError(f"Missing number before '{t}'")
+            group.append(t)
+            want_operand = True
+        else:
+            if not want_operand:
+                raise ValueError(f"Missing operator before '{t}'")
+            group.append(t)
+            want_operand = False
+    if len(open_groups) > 1:
+        raise ValueError("Mismatched parentheses")
+    if want_operand:
+        raise ValueError("Incomplete expression")
+    return groups
+
+def reduce_group(items, steps, fast: bool = True):
+    # items: [(value, text), op, (value, text), op, ...] without parentheses
+    for ops in PRECEDENCE:
+        if len(items) == 1:
+            break
+        out = [items[0]]
+        for k in range(1, len(items), 2):
+            op, right = items[k], items[k+1]
+            if op in ops:
+                left = out[-1]
+                result = apply_op(left[0], op, right[0], fast)
+                text = value_text(result)
+                # text for kid-friendly explanation, made when it is shown
+                steps.append(ExprStep(op, left[1], right[1], result))
+                out[-1] = (settle_value(result, text), text)
+            else:
+                out.append(op)
+                out.append(right)
+        items = out
+    return items[0]
+
+def group_items(group, results, fast: bool = True):
+    items = []
+    for t in group:
+        if isinstance(t, int):
+            items.append(results[t])
+        elif t in OP_WORDS:
+            items.append(t)
+        else:
+            items.append((number_value(t, fast), t))
+    return items
+
+def evaluate_no_paren(tokens, fast: bool = True):
+    steps = []
+    result = reduce_group(group_items(parse_tokens(tokens)[0], [], fast), steps, fast)
+    return [result[1]], steps
+
+def evaluate_tokens(tokens, fast: bool = True):
+    # fast=False does every operation in SymPy (slower, same answers)
+    steps = []
+    groups = parse_tokens(tokens)
+    results = [None] * len(groups)
+    # a group only contains groups opened after it, so walking backwards
+    # always finds the inner results ready
+    for g in range(len(groups) - 1, -1, -1):
+        items = group_items(groups[g], results, fast)
+        result = reduce_group(items, steps, fast)
+        if g:
+            steps.append(ExprStep(None, items, None, result[0]))
+        results[g] = result
+        groups[g] = None
+    return results[0][1], steps
+
+# ---------- Shared solution cache ----------
+# Classes send the same few questions again and again, so finished solutions
+# are kept in one LRU cache for the whole server process. The key is the token
+# list, so "3 x 4" and "3*4" share an entry.
+CACHE_SIZE = int(os.getenv("MATHMATE_CACHE_SIZE", "1024"))
+
+# question is the token text, e.g. "( 5 + 3 ) ** 2"; see question_pretty()
+Solution = namedtuple("Solution", ["answer", "steps", "question"])
+
+class SolutionCache:
+    def __init__(self, capacity: int = CACHE_SIZE):
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()  # Streamlit runs each session in its own thread
+
+    def get(self, key):
+        with self._lock:
+            solution = self._entries.get(key)
+            if solution is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._entries.move_to_end(key)
+            return solution
+
+    def put(self, key, solution):
+        if self.capacity <= 0:
+            return
+        with self._lock:
+            self._entries[key] = solution
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            return {"size": len(self._entries), "capacity": self.capacity,
+                    "hits": self.hits, "misses": self.misses}
+
+def solve_tokens(tokens) -> Solution:
+    with span("evaluate_tokens"):
+        answer, steps = evaluate_tokens(tokens)
+    return Solution(answer, tuple(steps), " ".join(tokens))
+
+def solve_texts(expr: str):
+    # (answer, step texts) for a cleaned, safe expression; a plain module-level
+    # function, so mathmate/batch.py can run it in the solver pool
+    answer, steps = evaluate_tokens(tokenize(expr))
+    return answer, step_texts(steps)
+
+# ---------- Display ----------
+# Only the page asks for these, and only for what it actually shows.
+@lru_cache(maxsize=CACHE_SIZE)
+def question_pretty(question: str):
+    # for prettier display w ^ (best-effort; None if SymPy can't read it)
+    if route(question).path == "reject":
+        return None  # SymPy reads 9**9**9 as 9**(9**9) and would work it out just to show it
+    try:
+        return sp.pretty(sp.sympify(question.replace('**', '^')), use_unicode=True)
+    except Exception:
+        return None
+
+@lru_cache(maxsize=CACHE_SIZE)
+def answer_pretty(answer: str) -> str:
+    return sp.pretty(sp.sympify(answer), use_unicode=True)
+
+def solve_cached(tokens, cache: SolutionCache) -> Solution:
+    key = tuple(tokens)
+    with span("cache"):
+        solution = cache.get(key)
+    if solution is None:
+        solution = solve_tokens(tokens)
+        cache.put(key, solution)
+    return solution
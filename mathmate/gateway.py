@@ -0,0 +1,282 @@
+# mathmate/gateway.py
+# One gateway in front of the AI backend for the whole process. When a class
+# checks the same problem at once, mathmate_v5.py would otherwise send dozens
+# of identical requests together and trip the provider's rate limits.
+#
+#   backend = Gateway(OpenAIBackend(api_key))     # get_backend() does this
+#   async for text in backend.stream(prompt): ...
+#
+#   python -m mathmate.gateway --students 30      # a class against the local stub
+#
+# - identical prompts already in flight share one upstream request: the
+#   students who ask later get what has arrived so far, then the rest as it
+#   streams in (if they all give up, the request is cancelled)
+# - at most MATHMATE_AI_CONCURRENCY requests go upstream at once; the rest
+#   wait in a queue of up to MATHMATE_AI_MAX_QUEUE
+# - with MATHMATE_AI_TOKENS_PER_MINUTE set, requests also wait for budget
+#   (prompt plus max_tokens up front, the unused part handed back afterwards)
+# - a 429 or 5xx before the first token is retried up to MATHMATE_AI_RETRIES
+#   times with exponential backoff (or the server's Retry-After), and every
+#   request waits out that cool-down, not just the one that hit it
+#
+# Queue depth, requests in flight, budget left, wait times, coalesced requests
+# and retries are exported with the other metrics (mathmate/metrics.py).
+#
+# Everything runs on the one asyncio loop of mathmate/explain.py, so the state
+# here needs no locks.
+
+import argparse
+import asyncio
+import os
+import random
+import time
+
+from mathmate.metrics import count, observe, set_gauge
+
+ENABLED = os.getenv("MATHMATE_AI_GATEWAY", "1") != "0"
+CONCURRENCY = int(os.getenv("MATHMATE_AI_CONCURRENCY", "4"))
+MAX_QUEUE = int(os.getenv("MATHMATE_AI_MAX_QUEUE", "100"))
+TOKENS_PER_MINUTE = int(os.getenv("MATHMATE_AI_TOKENS_PER_MINUTE", "0"))  # 0: no budget
+RETRIES = int(os.getenv("MATHMATE_AI_RETRIES", "3"))
+BACKOFF = 0.5        # seconds before the first retry, doubled each time
+MAX_BACKOFF = 20.0
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+class GatewayBusy(Exception):
+    def __str__(self):
+        return "Lots of students are asking the AI tutor right now, try again in a moment."
+
+def estimate_tokens(text):
+    # about 4 characters per token for English
+    return len(text) // 4 + 1
+
+# ==========================
+# LIMITER
+# ==========================
+class Limiter:
+    # concurrency slots, a per-minute token budget and a shared cool-down
+    def __init__(self, concurrency=CONCURRENCY, tokens_per_minute=TOKENS_PER_MINUTE, max_queue=MAX_QUEUE):
+        self.concurrency = concurrency
+        self.capacity = tokens_per_minute
+        self.tokens = tokens_per_minute
+        self.max_queue = max_queue
+        self.waiting = 0
+        self.active = 0
+        self.cooldown_until = 0.0
+        self._updated = time.monotonic()
+        self._changed = None  # asyncio.Event, replaced every time something is released
+
+    def _refill(self, now):
+        if self.capacity:
+            self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.capacity / 60)
+        self._updated = now
+
+    def _wake(self):
+        if self._changed is not None:
+            self._changed.set()
+            self._changed = None
+
+    def _report(self):
+        set_gauge("mathmate_ai_queue_depth", self.waiting)
+        set_gauge("mathmate_ai_in_flight", self.active)
+        if self.capacity:
+            set_gauge("mathmate_ai_budget_tokens", int(self.tokens))
+
+    def _delay(self, cost, now):
+        # seconds until a request costing `cost` could start (None: when a slot frees up)
+        if self.cooldown_until > now:
+            return self.cooldown_until - now
+        if self.active >= self.concurrency:
+            return None
+        need = min(cost, self.capacity)  # a request bigger than the budget waits for a full one
+        if self.capacity and self.tokens < need:
+            return (need - self.tokens) * 60 / self.capacity
+        return 0
+
+    async def acquire(self, cost):
+        if self.waiting >= self.max_queue:
+            raise GatewayBusy()
+        start = time.monotonic()
+        self.waiting += 1
+        self._report()
+        try:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                delay = self._delay(cost, now)
+                if delay == 0:
+                    break
+                if self._changed is None:
+                    self._changed = asyncio.Event()
+                try:
+                    await asyncio.wait_for(self._changed.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+            self.active += 1
+            self.tokens -= cost
+        finally:
+            self.waiting -= 1
+            self._report()
+        observe("mathmate_ai_wait_seconds", (), time.monotonic() - start)
+
+    def release(self, refund=0):
+        self.active -= 1
+        self._refill(time.monotonic())
+        if self.capacity:
+            self.tokens = min(self.capacity, self.tokens + refund)
+        self._report()
+        self._wake()
+
+    def cool_down(self, seconds):
+        self.cooldown_until = max(self.cooldown_until, time.monotonic() + seconds)
+
+_limiter = None
+
+def get_limiter():
+    # shared by every backend in the process: the provider's limits are per account
+    global _limiter
+    if _limiter is None:
+        _limiter = Limiter()
+    return _limiter
+
+def retry_delay(error, attempt):
+    # seconds to wait before retrying `error`, or None if it is not worth retrying
+    if getattr(error, "status_code", None) not in RETRY_STATUS:
+        return None
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return min(float(headers.get("retry-after")), MAX_BACKOFF)
+    except (TypeError, ValueError):
+        return min(BACKOFF * 2 ** attempt, MAX_BACKOFF) * (0.5 + random.random())
+
+# ==========================
+# GATEWAY
+# ==========================
+class Flight:
+    # one upstream request and the students waiting on it
+    def __init__(self):
+        self.chunks = []
+        self.done = False
+        self.error = None
+        self.listeners = 0
+        self.task = None
+        self.changed = asyncio.Event()
+
+    def notify(self):
+        changed, self.changed = self.changed, asyncio.Event()
+        changed.set()
+
+class Gateway:
+    def __init__(self, backend, limiter=None, retries=RETRIES):
+        self.backend = backend
+        self.limiter = limiter or get_limiter()
+        self.retries = retries
+        self.max_tokens = getattr(backend, "max_tokens", 250)
+        self._flights = {}  # prompt -> Flight
+
+    async def stream(self, prompt):
+        flight = self._flights.get(prompt)
+        if flight is None:
+            flight = self._flights[prompt] = Flight()
+            flight.task = asyncio.ensure_future(self._run(prompt, flight))
+            count("mathmate_ai_requests_total", (("result", "upstream"),))
+        else:
+            count("mathmate_ai_requests_total", (("result", "coalesced"),))
+        flight.listeners += 1
+        try:
+            sent = 0
+            while True:
+                while sent < len(flight.chunks):
+                    sent += 1
+                    yield flight.chunks[sent - 1]
+                if flight.done:
+                    if flight.error is not None:
+                        raise flight.error
+                    return
+                await flight.changed.wait()
+        finally:
+            flight.listeners -= 1
+            if not flight.listeners and not flight.done:
+                # nobody is reading any more: stop paying for it
+                flight.task.cancel()
+                if self._flights.get(prompt) is flight:
+                    del self._flights[prompt]
+
+    async def _run(self, prompt, flight):
+        prompt_tokens = estimate_tokens(prompt)
+        try:
+            for attempt in range(self.retries + 1):
+                await self.limiter.acquire(prompt_tokens + self.max_tokens)
+                produced = 0
+                try:
+                    async for text in self.backend.stream(prompt):
+                        produced += 1  # a streamed chunk is about one token
+                        flight.chunks.append(text)
+                        flight.notify()
+                    return
+                except Exception as e:
+                    delay = retry_delay(e, attempt)
+                    if flight.chunks or delay is None or attempt == self.retries:
+                        raise
+                    count("mathmate_ai_retries_total")
+                    self.limiter.cool_down(delay)
+                finally:
+                    self.limiter.release(refund=max(self.max_tokens - produced, 0))
+        except Exception as e:
+            flight.error = e
+        finally:
+            flight.done = True
+            flight.notify()
+            if self._flights.get(prompt) is flight:
+                del self._flights[prompt]
+
+# ==========================
+# CLASSROOM CHECK
+# ==========================
+def main(argv=None):
+    # a class of students asking at once, against the local stub server
+    import threading
+    from mathmate.explain import OpenAIBackend, stream_explanation
+    from mathmate.metrics import render_prometheus
+    from mathmate.stub_llm import serve
+
+    parser = argparse.ArgumentParser(description="Send a class's worth of AI explanation requests through the gateway.")
+    parser.add_argument("--students", type=int, default=30)
+    parser.add_argument("--problems", type=int, default=3, help="different problems the class is working on")
+    parser.add_argument("--stub-limit", type=int, default=2, help="requests the stub serves at once before it answers 429")
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY)
+    parser.add_argument("--tokens-per-minute", type=int, default=TOKENS_PER_MINUTE)
+    parser.add_argument("--no-gateway", action="store_true", help="send every request straight to the stub")
+    args = parser.parse_args(argv)
+
+    server = serve(first_token_delay=0.3, delay=0.01, max_concurrent=args.stub_limit)
+    backend = OpenAIBackend("stub", base_url=f"http://127.0.0.1:{server.server_port}/v1")
+    if not args.no_gateway:
+        backend = Gateway(backend, Limiter(args.concurrency, args.tokens_per_minute))
+    results = []
+
+    def student(i):
+        start = time.perf_counter()
+        text = "".join(stream_explanation(f"Problem number {i % args.problems}", "7", backend, deadline=30))
+        results.append((time.perf_counter() - start, "Oops" in text or "⏰" in text))
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=student, args=(i,)) for i in range(args.students)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    took = time.perf_counter() - start
+    server.shutdown()
+    times = sorted(t for t, _ in results)
+    print(f"{args.students} students, {args.problems} problems, {took:.2f} s")
+    print(f"stub: {server.stats['requests']} requests, {server.stats['rejected']} answered 429, "
+          f"at most {server.stats['peak']} at once")
+    print(f"students: {sum(failed for _, failed in results)} failed, "
+          f"median {times[len(times) // 2]:.2f} s, slowest {times[-1]:.2f} s")
+    for line in render_prometheus().splitlines():
+        if line.startswith("mathmate_ai_") and "_bucket" not in line:
+            print(" ", line)
+
+if __name__ == "__main__":
+    main()
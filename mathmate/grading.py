@@ -0,0 +1,304 @@
+# mathmate/grading.py
+# Answer checking for mathmate_v5.py and bulk grading of whole-class answer
+# sheets.
+#
+#   check_answer("Perimeter: 26 cm, Area: 40 cm²", "perimeter 26cm area 40 cm2")   # Verdict(True, "correct")
+#   check_answer("7 each, 1 leftover", "7 r1")                                     # Verdict(True, "correct")
+#   check_answer("7", "seven"), check_answer("7", " 7.0 ")                         # both correct
+#
+#   python -m mathmate.grading submissions.csv --key key.csv --scores scores.csv --items items.csv
+#   python -m mathmate.grading submissions.csv --bank problems.bank --scores scores.csv
+#
+# A stored answer is parsed once into a Matcher: the numbers in it (whole,
+# decimal, fractions, mixed numbers or words like "twenty-one"), each with its
+# unit and a label such as "perimeter" or "remainder". A student's answer is
+# parsed the same way and the numbers are compared exactly (0.5 == 1/2):
+# labelled parts by label, the rest in order. Answers without any number are
+# compared as text. Matchers are cached per answer text.
+#
+# Submissions are CSV or JSONL records with student, answer and either id (a
+# bank id, see Bank.qid) or sheet and number (a worksheet from
+# mathmate/worksheet.py). A class usually types the same few answers to each
+# item, so every distinct (item, answer) pair is checked once and the totals
+# per student and per item are counted from that.
+
+import argparse
+import csv
+import json
+import re
+import sys
+from collections import Counter, namedtuple
+from fractions import Fraction
+from functools import lru_cache
+
+CACHE_SIZE = 4096  # matchers kept, one per distinct stored answer
+TOP_WRONG = 3      # most common wrong answers listed per item
+
+Verdict = namedtuple("Verdict", "correct reason")
+Part = namedtuple("Part", "value unit label")
+
+# ==========================
+# PARSING
+# ==========================
+SMALL = {w: n for n, w in enumerate(
+    "zero one two three four five six seven eight nine ten eleven twelve thirteen fourteen fifteen "
+    "sixteen seventeen eighteen nineteen".split())}
+TENS = {w: 10 * n for n, w in enumerate("twenty thirty forty fifty sixty seventy eighty ninety".split(), start=2)}
+# longest first, so "sixteen" is not read as "six" + "teen"
+_NUMBER_WORD = "|".join(sorted(list(SMALL) + list(TENS) + ["hundred", "thousand"], key=len, reverse=True))
+NUMBER_WORDS = re.compile(r"\b(?:%s)\b(?:[\s-]+(?:%s|and)\b)*" % (_NUMBER_WORD, _NUMBER_WORD))
+
+UNITS = {
+    "cm²": ["cm²", "cm2", "cm^2", "sq cm", "square cm", "square centimetres", "square centimeters"],
+    "m²": ["m²", "m2", "m^2", "sq m", "square metres", "square meters"],
+    "cm³": ["cm³", "cm3", "cm^3", "cubic cm"],
+    "mm": ["mm", "millimetres", "millimeters"],
+    "cm": ["cm", "centimetres", "centimeters", "centimetre", "centimeter"],
+    "km": ["km", "kilometres", "kilometers"],
+    "m": ["m", "metres", "meters", "metre", "meter"],
+    "kg": ["kg", "kilograms", "kilogram", "kilos"],
+    "g": ["g", "grams", "gram"],
+    "ml": ["ml", "millilitres", "milliliters"],
+    "l": ["l", "litres", "liters", "litre", "liter"],
+    "min": ["min", "mins", "minutes", "minute"],
+    "h": ["h", "hours", "hour", "hrs"],
+    "s": ["s", "sec", "seconds", "second"],
+    "°": ["°", "degrees"],
+    "%": ["%", "percent", "per cent"],
+}
+UNIT_NAMES = {alias: unit for unit, aliases in UNITS.items() for alias in aliases}
+UNIT = re.compile(r"\s*(%s)(?![a-z²³])" % "|".join(
+    re.escape(a) for a in sorted(UNIT_NAMES, key=len, reverse=True)))
+
+NUMBER = re.compile(r"(?<![\d.])(-?)(?:(\d+)\s+(\d+)/(\d+)|(\d+)/(\d+)|(\d{1,3}(?:,\d{3})+(?:\.\d+)?|\d*\.\d+|\d+))")
+WORD = re.compile(r"[a-z]+")
+NEXT_WORD = re.compile(r"\s*([a-z]+)")
+# words before a number ("Area: 40") and after it ("1 leftover") that name it
+LABELS_BEFORE = {"perimeter": "perimeter", "area": "area", "volume": "volume", "length": "length",
+                 "width": "width", "height": "height", "total": "total", "quotient": "each",
+                 "remainder": "remainder", "rem": "remainder", "r": "remainder"}
+LABELS_AFTER = {"each": "each", "leftover": "remainder", "left": "remainder", "remaining": "remainder"}
+
+def _words_value(words):
+    total = current = 0
+    for w in re.split(r"[\s-]+", words):
+        if w in SMALL:
+            current += SMALL[w]
+        elif w in TENS:
+            current += TENS[w]
+        elif w == "hundred":
+            current = (current or 1) * 100
+        elif w == "thousand":
+            total += (current or 1) * 1000
+            current = 0
+    return str(total + current)
+
+def normalize(text):
+    text = str(text).casefold().replace("−", "-").replace("–", "-").replace(" ", " ")
+    return NUMBER_WORDS.sub(lambda m: _words_value(m.group(0)), text)
+
+def _value(m):
+    sign, whole, num, den, num2, den2, plain = m.groups()
+    if plain is not None:
+        value = Fraction(plain.replace(",", ""))
+    elif num2 is not None:
+        if int(den2) == 0:
+            return None
+        value = Fraction(int(num2), int(den2))
+    else:
+        if int(den) == 0:
+            return None
+        value = int(whole) + Fraction(int(num), int(den))
+    return -value if sign else value
+
+def parse_parts(text):
+    # the numbers in a (normalized) answer, with their units and labels
+    parts = []
+    gap_start = 0
+    for m in NUMBER.finditer(text):
+        if m.start() < gap_start:
+            continue
+        value = _value(m)
+        end = m.end()
+        unit = UNIT.match(text, end)
+        if unit:
+            end = unit.end()
+        label = None
+        after = NEXT_WORD.match(text, end)
+        if after and after.group(1) in LABELS_AFTER:
+            label = LABELS_AFTER[after.group(1)]
+            end = after.end()
+        else:
+            before = [w for w in WORD.findall(text[gap_start:m.start()]) if w in LABELS_BEFORE]
+            if before:
+                label = LABELS_BEFORE[before[-1]]
+        gap_start = end
+        if value is not None:
+            parts.append(Part(value, UNIT_NAMES[unit.group(1)] if unit else None, label))
+    return parts
+
+def plain_text(text):
+    # for answers that have no numbers: case, spacing and end punctuation don't matter
+    return " ".join(re.sub(r"[.!?]+$", "", str(text).casefold().strip()).split())
+
+# ==========================
+# MATCHING
+# ==========================
+class Matcher:
+    __slots__ = ("answer", "parts", "text")
+
+    def __init__(self, answer):
+        self.answer = answer
+        self.parts = parse_parts(normalize(answer))
+        self.text = plain_text(answer)
+
+    def check(self, given):
+        given = str(given or "")
+        if not given.strip():
+            return Verdict(False, "blank")
+        if not self.parts:
+            same = plain_text(given) == self.text
+            return Verdict(same, "correct" if same else "wrong answer")
+        normalized = normalize(given)
+        parts = parse_parts(normalized)
+        if not parts:
+            return Verdict(False, "no number")
+        if len(parts) > len(self.parts):
+            if "=" not in normalized:
+                return Verdict(False, "too many numbers")
+            parts = parts[-len(self.parts):]  # working shown, e.g. "7 × 8 = 56"
+        # labelled parts pair up by label, the rest in order
+        unused = list(parts)
+        paired = []
+        for expected in self.parts:
+            found = next((p for p in unused if expected.label and p.label == expected.label), None)
+            paired.append([expected, found])
+            if found is not None:
+                unused.remove(found)
+        for pair in paired:
+            if pair[1] is None and unused:
+                pair[1] = unused.pop(0)
+        reason = "correct"
+        for expected, found in paired:
+            if found is None:
+                return Verdict(False, "missing part")
+            if found.value != expected.value:
+                return Verdict(False, "wrong number")
+            if found.unit and expected.unit and found.unit != expected.unit:
+                reason = "wrong unit"
+        return Verdict(reason == "correct", reason)
+
+@lru_cache(maxsize=CACHE_SIZE)
+def compile_answer(answer):
+    return Matcher(str(answer))
+
+def check_answer(answer, given):
+    return compile_answer(str(answer)).check(given)
+
+# ==========================
+# BULK GRADING
+# ==========================
+def item_id(record):
+    if record.get("id"):
+        return str(record["id"])
+    if record.get("sheet") and record.get("number"):
+        return f"{record['sheet']}-{record['number']}"
+    return None
+
+def grade(submissions, answer_of):
+    # submissions: records with student, answer and an item (see item_id);
+    # answer_of(item) -> stored answer or None. Returns (students, items):
+    #   students {student: {"answered", "correct"}}
+    #   items    {item: {"answer", "answered", "correct", "reasons": Counter, "wrong": Counter}}
+    verdicts = {}
+    students = {}
+    items = {}
+    for record in submissions:
+        item = item_id(record)
+        given = str(record.get("answer") or "").strip()
+        key = (item, given.casefold())
+        if key not in verdicts:
+            answer = answer_of(item) if item is not None else None
+            verdicts[key] = (answer, None if answer is None else check_answer(answer, given))
+        answer, verdict = verdicts[key]
+        if verdict is None:  # not in the key or the bank
+            continue
+        student = students.setdefault(str(record.get("student") or ""), {"answered": 0, "correct": 0})
+        stats = items.setdefault(item, {"answer": answer, "answered": 0, "correct": 0,
+                                        "reasons": Counter(), "wrong": Counter()})
+        student["answered"] += 1
+        stats["answered"] += 1
+        if verdict.correct:
+            student["correct"] += 1
+            stats["correct"] += 1
+        else:
+            stats["reasons"][verdict.reason] += 1
+            if given:
+                stats["wrong"][given] += 1
+    return students, items
+
+def score_rows(students):
+    return [{"student": s, "answered": v["answered"], "correct": v["correct"],
+             "score": f"{v['correct'] / v['answered']:.0%}"} for s, v in sorted(students.items())]
+
+def item_rows(items):
+    return [{"item": item, "answer": v["answer"], "answered": v["answered"], "correct": v["correct"],
+             "score": f"{v['correct'] / v['answered']:.0%}",
+             "errors": "; ".join(f"{r}: {n}" for r, n in v["reasons"].most_common()),
+             "common_wrong": "; ".join(f"{a} ({n})" for a, n in v["wrong"].most_common(TOP_WRONG))}
+            for item, v in sorted(items.items(), key=lambda kv: kv[1]["correct"] / kv[1]["answered"])]
+
+def read_records(path):
+    with open(path, encoding="utf-8", newline="") as f:
+        if path.lower().endswith(".csv"):
+            yield from csv.DictReader(f)
+        else:
+            yield from (json.loads(line) for line in f if line.strip())
+
+def write_rows(rows, path, fields):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        if path.lower().endswith(".csv"):
+            writer = csv.DictWriter(f, fieldnames=fields)
+            writer.writeheader()
+            writer.writerows(rows)
+        else:
+            f.writelines(json.dumps(r, ensure_ascii=False) + "\n" for r in rows)
+
+SCORE_FIELDS = ["student", "answered", "correct", "score"]
+ITEM_FIELDS = ["item", "answer", "answered", "correct", "score", "errors", "common_wrong"]
+
+# ==========================
+# CLI
+# ==========================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Grade a class's answers against an answer key or problem bank.")
+    parser.add_argument("submissions", help="CSV or JSONL with student, answer and id (or sheet and number)")
+    parser.add_argument("--key", help="answer key from mathmate.worksheet (default: the problem bank)")
+    parser.add_argument("--bank", help="problem bank file (default: MATHMATE_BANK or the built-in problems)")
+    parser.add_argument("--scores", help="per-student scores file (default: print them)")
+    parser.add_argument("--items", help="per-item results and common errors file")
+    args = parser.parse_args(argv)
+
+    if args.key:
+        key = {item_id(r): r["answer"] for r in read_records(args.key)}
+        answer_of = key.get
+    else:
+        from mathmate.bank import Bank, default_bank
+        bank = Bank.open(args.bank) if args.bank else default_bank()
+        def answer_of(item):
+            problem = bank.lookup(item)
+            return problem["answer"] if problem else None
+    students, items = grade(read_records(args.submissions), answer_of)
+    scores = score_rows(students)
+    if args.scores:
+        write_rows(scores, args.scores, SCORE_FIELDS)
+    else:
+        for row in scores:
+            print(f"{row['student']:<20} {row['correct']}/{row['answered']}  {row['score']}")
+    if args.items:
+        write_rows(item_rows(items), args.items, ITEM_FIELDS)
+    print(f"Graded {sum(s['answered'] for s in students.values())} answers from {len(students)} students "
+          f"on {len(items)} items.", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
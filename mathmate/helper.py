@@ -0,0 +1,79 @@
+# mathmate/helper.py
+# The step-by-step helpers, hints and Q&A answers of mathmate_v4_ultra.py,
+# without the page around them. Each returns plain data (step strings, an
+# answer or a hint), so it can run in a thread, a worker process or a batch
+# job as well as behind the Streamlit page.
+#
+#   steps, result = solve_typed_problem("25+37")
+
+from mathmate.classifier import V4_CLASSIFIER, V4_SYMBOL_CLASSIFIER
+
+def step_by_step_addition(a, b):
+    steps = [
+        f"We are adding {a} + {b}.",
+        f"Start with {a} and add {b}.",
+        f"Final Answer: {a + b}"
+    ]
+    return steps, a + b
+
+def step_by_step_subtraction(a, b):
+    steps = [
+        f"We are subtracting {b} from {a}.",
+        f"Start with {a} and take away {b}.",
+        f"Final Answer: {a - b}"
+    ]
+    return steps, a - b
+
+def step_by_step_multiplication(a, b):
+    steps = [
+        f"We are multiplying {a} × {b}.",
+        f"Multiplication is repeated addition: add {a} to itself {b} times.",
+        f"Final Answer: {a * b}"
+    ]
+    return steps, a * b
+
+def step_by_step_division(a, b):
+    if b == 0:
+        return ["Division by zero is undefined."], None
+    steps = [
+        f"We are dividing {a} ÷ {b}.",
+        f"Division means splitting {a} into {b} equal parts.",
+        f"Final Answer: {a / b}"
+    ]
+    return steps, a / b
+
+# checked in this order, like the page always did
+STEP_BY_STEP = [
+    ("+", step_by_step_addition),
+    ("-", step_by_step_subtraction),
+    ("*", step_by_step_multiplication),
+    ("/", step_by_step_division),
+]
+
+def solve_typed_problem(problem):
+    # "25+37" -> (steps, result); None if there is no +, -, * or /
+    # (int() errors on malformed input propagate, as they always have)
+    for symbol, step_by_step in STEP_BY_STEP:
+        if symbol in problem:
+            a, b = map(int, problem.split(symbol))
+            return step_by_step(a, b)
+    return None
+
+def generate_hint(problem):
+    return V4_SYMBOL_CLASSIFIER.classify(problem).hint
+
+def word_problem_solver(problem_text):
+    return V4_CLASSIFIER.classify(problem_text).hint
+
+def answer_student_question(question):
+    q = question.lower()
+    if "carry over" in q:
+        return "We carry over in addition when the sum in one column is 10 or more."
+    elif "fractions" in q:
+        return "Fractions show parts of a whole. To add them, make denominators the same first."
+    elif "division" in q:
+        return "Division means splitting into equal parts or groups."
+    elif "algebra" in q:
+        return "Algebra uses letters to stand for numbers. It helps solve unknowns."
+    else:
+        return "Good question! Let’s break it down step by step like a teacher would."
@@ -0,0 +1,165 @@
+# mathmate/history.py
+# A student's answers and progress for mathmate_v5.py, kept small enough for
+# kiosk sessions that run all day.
+#
+#   history = History.load("amina")      # or History() for a session-only one
+#   history.record(qid, "addition", "7", correct=True)
+#   history.points, history.streak, history.accuracy("addition")
+#   for attempt in history.last(5): ...
+#
+# Only the last SIZE answers are kept: each one is a small slotted record
+# pointing at its question by id (see Bank.qid in mathmate/bank.py), in a
+# fixed-size ring, so the oldest is overwritten instead of the list growing.
+# Points, streaks and per-skill accuracy are running totals, updated in O(1)
+# per answer; nothing ever rescans the history.
+#
+# With MATHMATE_HISTORY_DB set, every student's ring and totals are also
+# written to that SQLite file and come back after a reload. Like the
+# explanation cache, each call opens its own short-lived connection.
+
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+
+SIZE = int(os.getenv("MATHMATE_HISTORY_SIZE", "50"))
+DB_PATH = os.getenv("MATHMATE_HISTORY_DB") or None
+POINTS_PER_CORRECT = 10
+MAX_ANSWER_CHARS = 40  # what a student types is cut to this for the history
+
+class Attempt:
+    __slots__ = ("qid", "skill", "answer", "correct", "time")
+
+    def __init__(self, qid, skill, answer, correct, when):
+        self.qid = qid
+        self.skill = skill
+        self.answer = answer
+        self.correct = correct
+        self.time = when
+
+    def __repr__(self):
+        return f"Attempt({self.qid!r}, {self.skill!r}, {self.answer!r}, {self.correct})"
+
+class History:
+    def __init__(self, size=SIZE, student=None, store=None):
+        self.size = size
+        self.student = student
+        self.store = store
+        self._ring = [None] * size
+        self._next = 0         # slot the next attempt goes into
+        self.answered = 0      # totals over every answer, not just the ring
+        self.right = 0
+        self.points = 0
+        self.streak = 0        # correct answers in a row, right now
+        self.best_streak = 0
+        self.skills = {}       # skill -> [answered, right]
+
+    @classmethod
+    def load(cls, student, size=SIZE, path=DB_PATH):
+        # the student's saved history, or an empty one that will be saved
+        if not path:
+            return cls(size, student)
+        store = HistoryStore(path)
+        history = cls(size, student, store)
+        store.load(history)
+        return history
+
+    def _add(self, attempt):
+        self._ring[self._next] = attempt
+        self._next = (self._next + 1) % self.size
+
+    def record(self, qid, skill, answer, correct, when=None):
+        attempt = Attempt(qid, skill, str(answer or "")[:MAX_ANSWER_CHARS], bool(correct),
+                          time.time() if when is None else when)
+        self._add(attempt)
+        self.answered += 1
+        per_skill = self.skills.setdefault(skill, [0, 0])
+        per_skill[0] += 1
+        if attempt.correct:
+            self.right += 1
+            per_skill[1] += 1
+            self.points += POINTS_PER_CORRECT
+            self.streak += 1
+            self.best_streak = max(self.best_streak, self.streak)
+        else:
+            self.streak = 0
+        if self.store is not None:
+            self.store.save(self, attempt)
+        return attempt
+
+    def last(self, n):
+        # up to n most recent attempts, oldest first
+        n = min(n, self.size, self.answered)
+        recent = (self._ring[(self._next - n + i) % self.size] for i in range(n))
+        return [attempt for attempt in recent if attempt is not None]
+
+    def __len__(self):
+        return min(self.answered, self.size)
+
+    def accuracy(self, skill=None):
+        # share of correct answers (0..1), overall or for one skill; None before any
+        answered, right = self.skills.get(skill, (0, 0)) if skill else (self.answered, self.right)
+        return right / answered if answered else None
+
+# ==========================
+# SQLITE STORE
+# ==========================
+class HistoryStore:
+    def __init__(self, path=DB_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("""CREATE TABLE IF NOT EXISTS attempts (
+                student TEXT NOT NULL, seq INTEGER NOT NULL, qid TEXT NOT NULL, skill TEXT NOT NULL,
+                answer TEXT NOT NULL, correct INTEGER NOT NULL, time REAL NOT NULL,
+                PRIMARY KEY (student, seq))""")
+            db.execute("""CREATE TABLE IF NOT EXISTS progress (
+                student TEXT PRIMARY KEY, answered INTEGER NOT NULL, correct INTEGER NOT NULL,
+                points INTEGER NOT NULL, streak INTEGER NOT NULL, best_streak INTEGER NOT NULL)""")
+            db.execute("""CREATE TABLE IF NOT EXISTS skills (
+                student TEXT NOT NULL, skill TEXT NOT NULL, answered INTEGER NOT NULL,
+                correct INTEGER NOT NULL, PRIMARY KEY (student, skill))""")
+
+    @contextmanager
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            yield db
+        finally:
+            db.close()
+
+    def load(self, history):
+        with self._connect() as db:
+            row = db.execute("SELECT answered, correct, points, streak, best_streak FROM progress "
+                             "WHERE student = ?", (history.student,)).fetchone()
+            if row is None:
+                return
+            (history.answered, history.right, history.points,
+             history.streak, history.best_streak) = row
+            for skill, answered, right in db.execute(
+                    "SELECT skill, answered, correct FROM skills WHERE student = ?", (history.student,)):
+                history.skills[skill] = [answered, right]
+            rows = db.execute("SELECT qid, skill, answer, correct, time FROM attempts "
+                              "WHERE student = ? ORDER BY seq DESC LIMIT ?",
+                              (history.student, history.size)).fetchall()
+        for qid, skill, answer, correct, when in reversed(rows):
+            history._add(Attempt(qid, skill, answer, bool(correct), when))
+
+    def save(self, history, attempt):
+        # attempts are numbered 1, 2, ...; only the last SIZE are kept per student
+        seq = history.answered
+        per_skill = history.skills[attempt.skill]
+        with self._connect() as db:
+            db.execute("BEGIN IMMEDIATE")
+            db.execute("INSERT OR REPLACE INTO attempts VALUES (?, ?, ?, ?, ?, ?, ?)",
+                       (history.student, seq, attempt.qid, attempt.skill, attempt.answer,
+                        int(attempt.correct), attempt.time))
+            db.execute("DELETE FROM attempts WHERE student = ? AND seq <= ?",
+                       (history.student, seq - history.size))
+            db.execute("INSERT OR REPLACE INTO progress VALUES (?, ?, ?, ?, ?, ?)",
+                       (history.student, history.answered, history.right, history.points,
+                        history.streak, history.best_streak))
+            db.execute("INSERT OR REPLACE INTO skills VALUES (?, ?, ?, ?)",
+                       (history.student, attempt.skill, per_skill[0], per_skill[1]))
+            db.execute("COMMIT")
@@ -0,0 +1,51 @@
+# mathmate/lazy.py
+# Load heavy libraries (sympy, openai) only when a solver really needs them.
+# Streamlit re-runs a page on every click, and a cold worker would otherwise
+# spend about a second importing SymPy before the first widget shows up, even
+# in modes (hints, Q&A) that never touch it.
+#
+#   sp = lazy_import("sympy")
+#   sp.Eq(...)        # sympy is imported here, on first use
+
+import importlib
+import sys
+import time
+
+LOAD_TIMES = {}  # module name -> seconds it took to import on first use
+_facades = {}
+
+class LazyModule:
+    def __init__(self, name):
+        object.__setattr__(self, "_name", name)
+        object.__setattr__(self, "_module", None)
+
+    def _load(self):
+        module = self._module
+        if module is None:
+            already = self._name in sys.modules
+            start = time.perf_counter()
+            module = importlib.import_module(self._name)
+            if not already:
+                LOAD_TIMES.setdefault(self._name, time.perf_counter() - start)
+            object.__setattr__(self, "_module", module)
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._load(), attr, value)
+
+    def __repr__(self):
+        state = "loaded" if self._module is not None else "not loaded yet"
+        return f"<lazy module {self._name!r} ({state})>"
+
+def lazy_import(name):
+    # one facade per module, so Streamlit reruns reuse it
+    facade = _facades.get(name)
+    if facade is None:
+        facade = _facades[name] = LazyModule(name)
+    return facade
+
+def is_loaded(name):
+    return name in sys.modules
@@ -0,0 +1,254 @@
+# mathmate/live.py
+# Solving while the student types (mathmate_v3.5_ultra.py). Most of what the
+# text box holds on the way to "x^2 - 5x + 6 = 0" is half-typed ("x^2 -",
+# "x^2 - 5x + 6 =") and can only fail, so only complete, changed input is sent
+# to the solver pool; everything else gets a one-line nudge straight away.
+#
+#   live = LiveSolver(pool)
+#   state = live.update(text)          # fast: check, then start solving if needed
+#   if state.status == "solving":
+#       solution, steps = live.result()
+#
+#   python -m mathmate.live "x^2 - 5x + 6 = 0"    # replay typing it, key by key
+#
+# - the text is tokenized again only from the first character that changed;
+#   the tokens before it are kept from the last call
+# - a cheap syntax check (brackets, dangling signs, both sides of "=") decides
+#   whether the input is complete, without SymPy
+# - complete input is routed by its estimated cost (mathmate/cost.py): too
+#   big is turned away, the fast path is solved right here, the rest goes to
+#   the pool
+# - inputs that only differ in spacing are the same problem, and the last
+#   RECENT solutions are kept, so deleting a character and typing it again
+#   does not solve anything
+# - a newer input cancels the solve for an older one if it is still waiting
+#   for a worker, or has been running for over KILL_AFTER seconds; a quick
+#   one already running finishes and its answer is dropped
+#
+# Solves are counted by outcome (solved, failed, cancelled, dropped, fast) and
+# skipped inputs by reason (incomplete, unchanged, rejected), so the wasted
+# solver calls show up with the other metrics.
+
+import argparse
+import time
+from collections import OrderedDict, namedtuple
+
+from mathmate.cost import TOKEN, record_route, route, routed
+from mathmate.equations import quick_solver, step_by_step_solver
+from mathmate.metrics import count, observe
+from mathmate.sandbox import Cancelled, TooBig
+
+RECENT = 32      # solutions kept per student
+KILL_AFTER = 1.0  # seconds: a superseded solve running longer is stopped, not left to finish
+
+OPERATORS = {"+", "-", "*", "/", "^", "**", "%"}
+SIGNS = {"+", "-"}  # may also start a term: "-3", "2 * -x"
+
+Live = namedtuple("Live", "status reason")  # status: empty, incomplete, rejected, solving or done
+
+# ==========================
+# TOKENS
+# ==========================
+class PrefixTokenizer:
+    # remembers the last text's tokens (text, start, end) and re-reads only
+    # from the first token the edit could have touched
+    def __init__(self):
+        self.text = ""
+        self.tokens = []
+
+    def tokenize(self, text):
+        same = 0
+        limit = min(len(text), len(self.text))
+        while same < limit and text[same] == self.text[same]:
+            same += 1
+        # a token ending right at the edit may grow ("12" -> "123"): read it again
+        kept = 0
+        while kept < len(self.tokens) and self.tokens[kept][2] < same:
+            kept += 1
+        tokens = self.tokens[:kept]
+        pos = tokens[-1][2] if tokens else 0
+        text_end = len(text.rstrip())
+        while pos < text_end:
+            m = TOKEN.match(text, pos)
+            tokens.append((m.group(m.lastindex), m.start(m.lastindex), m.end()))
+            pos = m.end()
+        self.text, self.tokens = text, tokens
+        return [t for t, _, _ in tokens]
+
+def incomplete_reason(tokens):
+    # why `tokens` can't be solved yet, or None when they look complete
+    depth = 0
+    equals = 0
+    previous = None  # None: at the start of a side
+    for t in tokens:
+        if TOKEN.fullmatch(t).lastindex == 4:
+            return f"I don't know the symbol {t!r} yet."
+        if t == "=":
+            if previous is None:
+                return "Put something before the = sign."
+            if depth:
+                return "Close the bracket before the = sign."
+            equals += 1
+            if equals > 1:
+                return "An equation has just one = sign."
+        elif t in OPERATORS or t == ",":
+            if t not in SIGNS and (previous is None or previous in OPERATORS or previous in ("(", ",", "=")):
+                return f"Something is missing before {t!r}."
+        elif t == "(":
+            depth += 1
+        elif t == ")":
+            if previous in OPERATORS or previous in ("(", ","):
+                return "Something is missing inside the brackets."
+            depth -= 1
+            if depth < 0:
+                return "There is a ) without a ( before it."
+        previous = None if t == "=" else t
+    if previous is None and tokens:
+        return "Finish the other side of the = sign."
+    if previous in OPERATORS or previous in ("(", ","):
+        return "Keep going…"
+    if depth:
+        return "Close the ( bracket." if depth == 1 else f"Close the {depth} open brackets."
+    return None
+
+# ==========================
+# LIVE SOLVER
+# ==========================
+class LiveSolver:
+    # one per student: update() on every change of the text box
+    def __init__(self, pool, solver=step_by_step_solver, quick=quick_solver, page="v3.5", recent=RECENT):
+        self.pool = pool
+        self.solver = solver
+        self.quick = quick
+        self.page = page
+        self.recent = recent
+        self.tokenizer = PrefixTokenizer()
+        self.solutions = OrderedDict()  # problem key -> (solution, steps)
+        self.key = None                 # the latest complete input
+        self.job = None                 # (key, Job, started) of the solve running now
+        self.stats = {"solved": 0, "failed": 0, "cancelled": 0, "dropped": 0, "fast": 0,
+                      "incomplete": 0, "unchanged": 0, "rejected": 0}
+
+    def _note(self, outcome, metric="mathmate_live_solves_total"):
+        self.stats[outcome] += 1
+        count(metric, (("result", outcome),))
+
+    def update(self, text):
+        start = time.perf_counter()
+        tokens = self.tokenizer.tokenize(text)
+        reason = incomplete_reason(tokens)
+        if not tokens:
+            state = Live("empty", None)
+        elif reason:
+            self._note("incomplete", "mathmate_live_skipped_total")
+            state = Live("incomplete", reason)
+        else:
+            self.key = " ".join(tokens)
+            if self.key in self.solutions:
+                self.solutions.move_to_end(self.key)
+                self._note("unchanged", "mathmate_live_skipped_total")
+                state = Live("done", None)
+            elif self.job is not None and self.job[0] == self.key:
+                state = Live("solving", None)
+            else:
+                state = self._start(text.strip())
+        if state.status != "solving":
+            self._cancel()  # nobody is waiting for it any more
+        observe("mathmate_live_feedback_seconds", (), time.perf_counter() - start)
+        return state
+
+    def _start(self, text):
+        r = route(text)
+        if r.path == "reject":
+            record_route(self.page, r, 0)
+            self._note("rejected", "mathmate_live_skipped_total")
+            return Live("rejected", r.reason)
+        if r.path == "fast":
+            with routed(self.page, r):
+                quick = self.quick(text)
+            if quick is not None:
+                self._note("fast")
+                self._keep(self.key, quick)
+                return Live("done", None)
+        self._cancel()
+        self.job = (self.key, self.pool.submit(self.solver, text), time.perf_counter(), r)
+        return Live("solving", None)
+
+    def _keep(self, key, solved):
+        self.solutions[key] = solved
+        while len(self.solutions) > self.recent:
+            self.solutions.popitem(last=False)
+
+    def _cancel(self):
+        if self.job is not None:
+            if self.job[1].done():
+                self._finish()  # finished anyway: keep it in case they come back to it
+            else:
+                # a short solve already running is left to finish (killing it
+                # would cost a worker restart); only a long one is stopped
+                kill = time.perf_counter() - self.job[2] > KILL_AFTER
+                self.job[1].cancel(kill=kill)
+                self._note("dropped" if self.job[1].running() and not kill else "cancelled")
+            self.job = None
+
+    def _finish(self, timeout=None):
+        key, job, started, r = self.job
+        try:
+            solution, steps = job.result(timeout)
+        except TooBig as e:
+            solution, steps = None, [f"❌ {e}"]
+        except (Cancelled, RuntimeError) as e:
+            solution, steps = None, [f"❌ Error: {e}"]
+        self.job = None
+        took = time.perf_counter() - started
+        observe("mathmate_live_solve_seconds", (), took)
+        record_route(self.page, r, took)
+        self._note("failed" if solution is None else "solved")
+        self._keep(key, (solution, steps))
+
+    def ready(self):
+        # True when result() will not wait
+        return self.job is None or self.job[1].done()
+
+    def result(self, timeout=None):
+        # (solution, steps) for the latest complete input
+        if self.job is not None:
+            self._finish(timeout)
+        return self.solutions[self.key]
+
+# ==========================
+# TYPING REPLAY
+# ==========================
+def main(argv=None):
+    # type each problem one key at a time and show what the student would see
+    from mathmate.sandbox import SolverPool
+
+    parser = argparse.ArgumentParser(description="Replay typing a problem into the live solver.")
+    parser.add_argument("problems", nargs="+")
+    parser.add_argument("--wait", action="store_true",
+                        help="let every solve finish (default: keep typing, like a student)")
+    parser.add_argument("--delay", type=float, default=0.15, help="seconds between keystrokes")
+    args = parser.parse_args(argv)
+
+    pool = SolverPool(workers=1)
+    live = LiveSolver(pool)
+    keystrokes = 0
+    for problem in args.problems:
+        for end in range(1, len(problem) + 1):
+            keystrokes += 1
+            text = problem[:end]
+            started = time.perf_counter()
+            state = live.update(text)
+            took = (time.perf_counter() - started) * 1000
+            if state.status in ("solving", "done") and (args.wait or end == len(problem)):
+                answer = f"= {live.result()[0]}"
+            else:
+                answer = state.reason or state.status
+            print(f"{text:<{len(problem)}}  {took:6.2f} ms  {answer}")
+            time.sleep(args.delay)
+    pool.close()
+    print(f"solver workers restarted: {pool.stats['recycled']}")
+    print(f"{keystrokes} keystrokes: " + ", ".join(f"{n} {outcome}" for outcome, n in live.stats.items()))
+
+if __name__ == "__main__":
+    main()
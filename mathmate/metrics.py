@@ -0,0 +1,266 @@
+# mathmate/metrics.py
+# Lightweight request tracing: how long each stage of a solve took, summed up
+# into in-process histograms that Prometheus (or a person with curl) can read.
+#
+#   with trace("app.solve", raw_input) as t:
+#       with t.span("tokenize"):
+#           tokens = tokenize(cleaned)
+#       solution = solve_cached(tokens, cache)   # records its own stages via span()
+#
+# Library code calls the module-level span()/record(); they attach to the
+# request being traced in the current thread and cost almost nothing otherwise.
+# Process-wide state (queue depth, request counts) uses set_gauge()/count().
+#
+# Export (all optional, set by environment variable):
+#   MATHMATE_METRICS_PORT=9464          serve http://localhost:9464/metrics
+#   MATHMATE_METRICS_FILE=metrics.prom  rewrite this file every MATHMATE_METRICS_INTERVAL s
+#   MATHMATE_SLOW_LOG=slow.jsonl        log input + stage breakdown of requests slower
+#                                       than MATHMATE_SLOW_SECONDS (default 1)
+
+import atexit
+import contextvars
+import json
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+METRICS_PORT = int(os.getenv("MATHMATE_METRICS_PORT", "0"))
+METRICS_FILE = os.getenv("MATHMATE_METRICS_FILE") or None
+METRICS_INTERVAL = float(os.getenv("MATHMATE_METRICS_INTERVAL", "15"))
+SLOW_LOG = os.getenv("MATHMATE_SLOW_LOG") or None
+SLOW_SECONDS = float(os.getenv("MATHMATE_SLOW_SECONDS", "1"))
+
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+HELP = {
+    "mathmate_request_seconds": "Time from the start to the end of a traced request.",
+    "mathmate_stage_seconds": "Time spent in one stage of a traced request.",
+    "mathmate_ai_wait_seconds": "Time an AI request waited in the gateway queue.",
+    "mathmate_ai_queue_depth": "AI requests waiting in the gateway queue.",
+    "mathmate_ai_in_flight": "AI requests being answered upstream right now.",
+    "mathmate_ai_budget_tokens": "Tokens left in the gateway's per-minute budget.",
+    "mathmate_ai_requests_total": "AI explanation requests, by whether they went upstream or joined one in flight.",
+    "mathmate_ai_retries_total": "Upstream AI requests retried after a rate limit or server error.",
+    "mathmate_live_feedback_seconds": "Time to check a typed problem and start solving it, if complete.",
+    "mathmate_live_solve_seconds": "Time from a live solve starting until its answer was picked up.",
+    "mathmate_live_solves_total": "Live solver calls by outcome; cancelled, dropped and failed ones were wasted.",
+    "mathmate_live_skipped_total": "Typed problems not sent to the solver: half-typed, unchanged or too big.",
+    "mathmate_route_total": "Problems by the path mathmate/cost.py sent them down (fast, sympy, reject).",
+    "mathmate_route_seconds": "Time to solve a problem, by the path it was sent down.",
+}
+
+# ==========================
+# HISTOGRAMS
+# ==========================
+class Histogram:
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last one: above every bucket
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        self.counts[bisect_left(self.buckets, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+
+_histograms = {}  # (metric, ((label, value), ...)) -> Histogram
+_lock = threading.Lock()
+
+def observe(metric, labels, seconds):
+    key = (metric, labels)
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = Histogram()
+        histogram.observe(seconds)
+
+def reset():
+    with _lock:
+        _histograms.clear()
+        _gauges.clear()
+        _counters.clear()
+
+# ==========================
+# GAUGES & COUNTERS
+# ==========================
+_gauges = {}    # (metric, labels) -> current value
+_counters = {}  # (metric, labels) -> total so far
+
+def set_gauge(metric, value, labels=()):
+    with _lock:
+        _gauges[(metric, labels)] = value
+
+def count(metric, labels=(), n=1):
+    with _lock:
+        _counters[(metric, labels)] = _counters.get((metric, labels), 0) + n
+
+def _label_text(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    escape = lambda v: str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{k}="{escape(v)}"' for k, v in pairs) + "}"
+
+def render_prometheus():
+    # Prometheus text exposition format (version 0.0.4)
+    with _lock:
+        items = sorted((key, h.counts[:], h.sum, h.count) for key, h in _histograms.items())
+        gauges = sorted(_gauges.items())
+        counters = sorted(_counters.items())
+    lines = []
+    current = None
+    for (metric, labels), counts, total, count in items:
+        if metric != current:
+            current = metric
+            lines.append(f"# HELP {metric} {HELP.get(metric, metric)}")
+            lines.append(f"# TYPE {metric} histogram")
+        running = 0
+        for bound, n in zip(BUCKETS, counts):
+            running += n
+            lines.append(f"{metric}_bucket{_label_text(labels, [('le', repr(bound))])} {running}")
+        lines.append(f"{metric}_bucket{_label_text(labels, [('le', '+Inf')])} {count}")
+        lines.append(f"{metric}_sum{_label_text(labels)} {total}")
+        lines.append(f"{metric}_count{_label_text(labels)} {count}")
+    for kind, values in (("gauge", gauges), ("counter", counters)):
+        current = None
+        for (metric, labels), value in values:
+            if metric != current:
+                current = metric
+                lines.append(f"# HELP {metric} {HELP.get(metric, metric)}")
+                lines.append(f"# TYPE {metric} {kind}")
+            lines.append(f"{metric}{_label_text(labels) if labels else ''} {value}")
+    return "\n".join(lines) + "\n"
+
+# ==========================
+# TRACING
+# ==========================
+_current = contextvars.ContextVar("mathmate_trace", default=None)
+
+class Trace:
+    def __init__(self, pipeline, detail=None):
+        self.pipeline = pipeline
+        self.detail = detail
+        self.stages = []  # (stage, seconds), in the order they finished
+
+    def record(self, stage, seconds):
+        self.stages.append((stage, seconds))
+        observe("mathmate_stage_seconds", (("pipeline", self.pipeline), ("stage", stage)), seconds)
+
+    @contextmanager
+    def span(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start)
+
+@contextmanager
+def trace(pipeline, detail=None):
+    # one traced request; `detail` (e.g. the input) only goes to the slow log
+    _start_exporters()
+    current = Trace(pipeline, detail)
+    token = _current.set(current)
+    start = time.perf_counter()
+    status = "error"
+    try:
+        yield current
+        status = "ok"
+    finally:
+        _current.reset(token)
+        total = time.perf_counter() - start
+        observe("mathmate_request_seconds", (("pipeline", pipeline), ("status", status)), total)
+        if SLOW_LOG and total >= SLOW_SECONDS:
+            log_slow(current, total, status)
+
+@contextmanager
+def span(stage):
+    # a stage of whatever request is being traced in this thread (if any)
+    current = _current.get()
+    if current is None:
+        yield
+        return
+    with current.span(stage):
+        yield
+
+def record(stage, seconds):
+    current = _current.get()
+    if current is not None:
+        current.record(stage, seconds)
+
+_slow_lock = threading.Lock()
+
+def log_slow(current, total, status="ok"):
+    entry = {
+        "time": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "pipeline": current.pipeline,
+        "status": status,
+        "input": None if current.detail is None else str(current.detail)[:500],
+        "total_ms": round(total * 1000, 2),
+        "stages": [{"stage": s, "ms": round(sec * 1000, 2)} for s, sec in current.stages],
+    }
+    with _slow_lock:
+        with open(SLOW_LOG, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+# ==========================
+# EXPORT
+# ==========================
+def write_metrics(path):
+    # atomic, so a scraper never reads half a file
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(render_prometheus())
+    os.replace(tmp, path)
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        body = render_prometheus().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+def serve_metrics(port=METRICS_PORT, host="127.0.0.1"):
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="mathmate-metrics", daemon=True).start()
+    return server
+
+def _file_writer(path, interval):
+    while True:
+        time.sleep(interval)
+        try:
+            write_metrics(path)
+        except OSError as e:
+            print(f"mathmate.metrics: cannot write {path}: {e}", file=sys.stderr)
+
+_exporters_started = False
+
+def _start_exporters():
+    # once per process, on the first traced request
+    global _exporters_started
+    if _exporters_started:
+        return
+    with _lock:
+        if _exporters_started:
+            return
+        _exporters_started = True
+    if METRICS_PORT:
+        try:
+            serve_metrics(METRICS_PORT)
+        except OSError as e:  # e.g. another server process already has the port
+            print(f"mathmate.metrics: cannot serve on port {METRICS_PORT}: {e}", file=sys.stderr)
+    if METRICS_FILE:
+        threading.Thread(target=_file_writer, args=(METRICS_FILE, METRICS_INTERVAL),
+                         name="mathmate-metrics-file", daemon=True).start()
+        atexit.register(write_metrics, METRICS_FILE)
@@ -0,0 +1,74 @@
+# mathmate/multistep.py
+# The multi-step methods of mathmate_v2.py. They return their working as data
+# instead of drawing it, so the page (or a batch job, a benchmark, a worker
+# process) decides what to do with it.
+#
+#   worked = multi_step_addition(47, 38)
+#   for step in worked.steps:   # "Step 1: Line up the numbers by place value", ...
+#       print(step.title, step.lines)
+#   worked.answer               # 85
+#
+# worked.steps may be a generator (the column methods make their steps as
+# they are read), so read it once.
+
+import random
+
+from mathmate.classifier import V2_CLASSIFIER
+from mathmate.columns import Step, Worked, column_addition, column_division, column_multiplication, column_subtraction
+from mathmate.lazy import lazy_import
+
+sp = lazy_import("sympy")  # only the word-problem fallback needs it
+
+# column arithmetic for any number of digits, see mathmate/columns.py
+multi_step_addition = column_addition
+multi_step_subtraction = column_subtraction
+multi_step_multiplication = column_multiplication
+multi_step_division = column_division
+
+MULTI_STEP = {
+    "Addition": multi_step_addition,
+    "Subtraction": multi_step_subtraction,
+    "Multiplication": multi_step_multiplication,
+    "Division": multi_step_division,
+}
+
+def solve_word_problem(problem_text):
+    found = V2_CLASSIFIER.classify(problem_text)
+    numbers = list(found.operands)
+
+    # Try to identify operation intelligently
+    if found.operation == "addition":
+        operation = "Addition"
+        result = sum(numbers)
+    elif found.operation == "subtraction":
+        operation = "Subtraction"
+        result = numbers[0] - sum(numbers[1:])
+    elif found.operation == "multiplication":
+        operation = "Multiplication"
+        result = 1
+        for n in numbers:
+            result *= n
+    elif found.operation == "division":
+        operation = "Division"
+        result = numbers[0] // numbers[1] if len(numbers) > 1 else numbers[0]
+    else:
+        # Advanced AI: Try symbolic solution if complex
+        x = sp.symbols('x')
+        try:
+            eq = sp.Eq(x, sum(numbers))  # Simplified symbolic equation
+            result = sp.solve(eq)[0]
+        except Exception:
+            result = sum(numbers)
+        operation = "Smart Guess"
+
+    return Worked((
+        Step("Step 1: Analyze problem",
+             (f"Problem: {problem_text}", f"Numbers found: {numbers}", f"Operation detected: {operation}")),
+        Step("Step 2: Compute answer", ()),
+    ), result, f"{result}")
+
+def generate_random_problem(rng=random):
+    ops = ["Addition", "Subtraction", "Multiplication", "Division"]
+    op = rng.choice(ops)
+    a, b = rng.randint(1, 50), rng.randint(1, 50)
+    return a, b, op
@@ -0,0 +1,160 @@
+# mathmate/pagebench.py
+# What one click or keystroke costs the server on each MathMate page, run
+# without a browser on Streamlit's AppTest.
+#
+#   python -m mathmate.pagebench                   # every page, 20 of each interaction
+#   python -m mathmate.pagebench --pages app,v5 --repeat 50
+#
+# Each interaction is replayed two ways:
+#   full      the whole script reruns, which is what every interaction did
+#             before the pages used fragments
+#   fragment  only the fragment holding the widget reruns, which is what the
+#             browser asks for now
+# and timed for wall time (server-side round trip for the rerun), process CPU
+# time and the number of messages sent back to the browser.
+#
+# AppTest itself always reruns the whole script, so the fragment runs go
+# through a small script runner that puts the widget's fragment id on the
+# rerun request, the way a browser does. That hooks into Streamlit internals
+# and may need updating with newer Streamlit versions.
+
+import argparse
+import dataclasses
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# page -> (file, setup steps, interaction steps); a step is ("click", label),
+# ("type", label, value) or ("type", label, [values to take turns with])
+SCENARIOS = {
+    "app": ("mathmate_app.py",
+            [("type", "Try an example or type your own:", "(5+3)^2*7-12/4+2^5")],
+            [("click", "Solve")]),
+    "v2": ("mathmate_v2.py",
+           [("radio", "Choose Problem Type:", "Random Problem")],
+           [("click", "Generate & Solve Random Problem")]),
+    "v3": ("mathmate_v3_ultra.py",
+           [("radio", "Choose Mode:", "🙋 Student Helper Mode")],
+           [("click", "Show Teacher Help")]),
+    "v3.5": ("mathmate_v3.5_ultra.py",
+             [],
+             [("type", "✏️ Enter your math problem (e.g., 2x + 3 = 7):", ["2x + 3 = 7", "x^2 - 5x + 6 = 0"])]),
+    "v4": ("mathmate_v4_ultra.py",
+           [("radio", "Choose a Mode", "Student Helper Mode"),
+            ("type", "Type a simple math problem (e.g., 25+37, 50-12, 6*7, 20/4)", "25+37")],
+           [("click", "Show Step by Step")]),
+    "v5": ("mathmate_v5.py",
+           [("type", "Your Answer:", "7")],
+           [("click", "Check Answer ✅"), ("click", "Next Problem ➡️")]),
+}
+
+def _runner_class():
+    from streamlit.testing.v1 import app_test, local_script_runner
+
+    class FragmentRunner(local_script_runner.LocalScriptRunner):
+        # reruns only `fragment` (when set), like a browser click inside a fragment
+        fragment = None
+        messages = []
+
+        def request_rerun(self, rerun_data):
+            if FragmentRunner.fragment:
+                scoped = dict(fragment_id_queue=[FragmentRunner.fragment], is_fragment_scoped_rerun=True)
+                # the runner starts with a full rerun queued; a full rerun would absorb ours
+                self._requests._rerun_data = dataclasses.replace(self._requests._rerun_data, **scoped)
+                rerun_data = dataclasses.replace(rerun_data, **scoped)
+            return super().request_rerun(rerun_data)
+
+        def forward_msgs(self):
+            FragmentRunner.messages = super().forward_msgs()
+            return FragmentRunner.messages
+
+    app_test.LocalScriptRunner = FragmentRunner
+    return FragmentRunner
+
+def _widget(at, kind, label):
+    widgets = {"click": at.button, "type": at.text_input, "radio": at.radio}[kind]
+    found = [w for w in widgets if w.label == label]
+    if not found and kind == "radio":
+        found = [w for w in at.selectbox if w.label == label]
+    if not found:
+        raise LookupError(f"No {kind} widget {label!r} on the page")
+    return found[0]
+
+def _fragment_of(runner, widget_id):
+    for msg in runner.messages:
+        if msg.WhichOneof("type") != "delta" or msg.delta.WhichOneof("type") != "new_element":
+            continue
+        element = msg.delta.new_element
+        if getattr(getattr(element, element.WhichOneof("type")), "id", None) == widget_id:
+            return msg.delta.fragment_id or None
+    return None
+
+def _act(at, step, turn=0):
+    kind, label, *value = step
+    widget = _widget(at, kind, label)
+    if kind == "click":
+        return widget.click()
+    value = value[0]
+    if isinstance(value, list):
+        value = value[turn % len(value)]
+    return widget.set_value(value)
+
+def measure(page, repeat=20, timeout=60):
+    # {(interaction, mode): [(wall s, cpu s, messages), ...]}
+    from streamlit.testing.v1 import AppTest
+
+    runner = _runner_class()
+    path, setup, interactions = SCENARIOS[page]
+    results = {}
+    for step in interactions:
+        for mode in ("full", "fragment"):
+            runner.fragment = None
+            at = AppTest.from_file(os.path.join(ROOT, path), default_timeout=timeout)
+            at.secrets["OPENAI_API_KEY"] = "pagebench"
+            at.run()
+            for s in setup:
+                _act(at, s).run()
+            fragment = _fragment_of(runner, _widget(at, *step[:2]).id) if mode == "fragment" else None
+            if mode == "fragment" and fragment is None:
+                continue  # not in a fragment
+            runner.fragment = fragment
+            runs = []
+            for turn in range(repeat):
+                _act(at, step, turn)
+                wall, cpu = time.perf_counter(), time.process_time()
+                at.run()
+                runs.append((time.perf_counter() - wall, time.process_time() - cpu, len(runner.messages)))
+                if at.exception:
+                    raise RuntimeError(f"{page}: {at.exception[0].message}")
+            results[(step[1], mode)] = runs
+    runner.fragment = None
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Server cost per interaction on each MathMate page.")
+    parser.add_argument("--pages", default=",".join(SCENARIOS), help=f"comma-separated, from {','.join(SCENARIOS)}")
+    parser.add_argument("--repeat", type=int, default=20, help="times each interaction is replayed")
+    args = parser.parse_args(argv)
+
+    # keep v5 offline and quiet: no warm-up, no AI server, a throwaway cache
+    os.environ.setdefault("MATHMATE_EXPLAIN_WARM", "0")
+    os.environ.setdefault("MATHMATE_AI_BASE_URL", "http://127.0.0.1:9/v1")
+    os.environ.setdefault("MATHMATE_AI_DEADLINE", "1")
+    os.environ.setdefault("MATHMATE_EXPLAIN_CACHE", os.path.join(tempfile.mkdtemp(), "explanations.sqlite3"))
+    sys.path.insert(0, ROOT)
+
+    print(f"{'page':<6} {'interaction':<32} {'mode':<9} {'wall ms':>8} {'cpu ms':>8} {'msgs':>5}")
+    for page in args.pages.split(","):
+        results = measure(page.strip(), args.repeat)
+        for (label, mode), runs in results.items():
+            wall = statistics.median(r[0] for r in runs) * 1000
+            cpu = statistics.median(r[1] for r in runs) * 1000
+            msgs = statistics.median(r[2] for r in runs)
+            print(f"{page:<6} {label[:32]:<32} {mode:<9} {wall:8.1f} {cpu:8.1f} {msgs:5.0f}")
+
+if __name__ == "__main__":
+    main()
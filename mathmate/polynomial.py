@@ -0,0 +1,273 @@
+# mathmate/polynomial.py
+# Closed-form solver for equations in x of degree 0, 1 or 2, like "2x + 3 = 7"
+# or "x^2 - 5x + 6 = 0". Each side is read once and its coefficients are
+# collected as exact fractions while parsing, then the equation is solved with
+# the usual formulas and explained step by step.
+#
+# solve_polynomial_equation() returns None for anything else (other letters,
+# x in a denominator, x^3, ...) so the caller can fall back to SymPy.
+
+import re
+from fractions import Fraction
+from math import isqrt
+
+from mathmate.lazy import lazy_import
+
+sp = lazy_import("sympy")  # only to build the final surd/complex answers
+
+TOKEN = re.compile(r"\s*(?:(\d+\.?\d*|\.\d+)|(\*\*|[-+*/^()x]))")
+
+class NotPolynomial(Exception):
+    # the input is outside what this engine solves; use SymPy instead
+    pass
+
+# ==========================
+# COEFFICIENT LISTS
+# ==========================
+# A polynomial is a list of Fractions, lowest power first: 3x^2 - 1 -> [-1, 0, 3]
+MAX_DEGREE = 2
+
+def trim(p):
+    while len(p) > 1 and p[-1] == 0:
+        p.pop()
+    return p
+
+def poly_add(p, q, sign=1):
+    out = [Fraction(0)] * max(len(p), len(q))
+    for i, c in enumerate(p):
+        out[i] += c
+    for i, c in enumerate(q):
+        out[i] += sign * c
+    return trim(out)
+
+def poly_mul(p, q):
+    if len(p) + len(q) - 2 > MAX_DEGREE:
+        raise NotPolynomial("degree too high")
+    out = [Fraction(0)] * (len(p) + len(q) - 1)
+    for i, a in enumerate(p):
+        if a:
+            for j, b in enumerate(q):
+                out[i + j] += a * b
+    return trim(out)
+
+def poly_div(p, q):
+    if len(q) > 1 or q[0] == 0:
+        raise NotPolynomial("can only divide by a non-zero number")
+    return [c / q[0] for c in p]
+
+def poly_pow(p, q):
+    if len(q) > 1 or q[0].denominator != 1:
+        raise NotPolynomial("exponent must be a whole number")
+    n = q[0].numerator
+    if len(p) == 1:
+        if n < 0 and p[0] == 0:
+            raise NotPolynomial("division by zero")
+        return [p[0] ** n]
+    if n < 0 or (len(p) - 1) * n > MAX_DEGREE:
+        raise NotPolynomial("degree too high")
+    out = [Fraction(1)]
+    for _ in range(n):
+        out = poly_mul(out, p)
+    return out
+
+# ==========================
+# PARSER (one pass, precedence climbing)
+# ==========================
+def tokenize(text):
+    tokens = []
+    pos = 0
+    text = text.rstrip()
+    while pos < len(text):
+        m = TOKEN.match(text, pos)
+        if not m:
+            raise NotPolynomial(f"unexpected {text[pos:].strip()[:1]!r}")
+        if m.group(1):
+            tokens.append(Fraction(m.group(1)))
+        else:
+            tokens.append('**' if m.group(2) == '^' else m.group(2))
+        pos = m.end()
+    return tokens
+
+class _Parser:
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.i = 0
+
+    def peek(self):
+        return self.tokens[self.i] if self.i < len(self.tokens) else None
+
+    def take(self):
+        t = self.peek()
+        self.i += 1
+        return t
+
+    def parse(self):
+        p = self.sum()
+        if self.peek() is not None:
+            raise NotPolynomial(f"unexpected {self.peek()!r}")
+        return p
+
+    def sum(self):
+        p = self.product()
+        while self.peek() in ('+', '-'):
+            sign = 1 if self.take() == '+' else -1
+            p = poly_add(p, self.product(), sign)
+        return p
+
+    def product(self):
+        p = self.unary()
+        while True:
+            t = self.peek()
+            if t in ('*', '/'):
+                self.take()
+                q = self.unary()
+                p = poly_mul(p, q) if t == '*' else poly_div(p, q)
+            elif t == 'x' or t == '(':
+                # implicit multiplication: 2x, 3(x+1), x(x-2), (x+1)(x-1)
+                p = poly_mul(p, self.power())
+            else:
+                return p
+
+    def unary(self):
+        if self.peek() in ('+', '-'):
+            sign = 1 if self.take() == '+' else -1
+            return [sign * c for c in self.unary()]
+        return self.power()
+
+    def power(self):
+        base = self.atom()
+        if self.peek() == '**':
+            self.take()
+            return poly_pow(base, self.unary())  # right-associative, like SymPy
+        return base
+
+    def atom(self):
+        t = self.take()
+        if isinstance(t, Fraction):
+            return [t]
+        if t == 'x':
+            return [Fraction(0), Fraction(1)]
+        if t == '(':
+            p = self.sum()
+            if self.take() != ')':
+                raise NotPolynomial("missing ')'")
+            return p
+        raise NotPolynomial(f"unexpected {t!r}")
+
+def parse_polynomial(text):
+    tokens = tokenize(text)
+    if not tokens:
+        raise NotPolynomial("empty side")
+    return _Parser(tokens).parse()
+
+# ==========================
+# FORMATTING
+# ==========================
+def num_text(c):
+    c = Fraction(c)
+    return str(c.numerator) if c.denominator == 1 else f"{c.numerator}/{c.denominator}"
+
+def poly_text(p):
+    terms = []
+    for power in range(len(p) - 1, -1, -1):
+        c = p[power]
+        if c == 0 and (terms or power):
+            continue
+        mag = abs(c)
+        if power == 0:
+            body = num_text(mag)
+        else:
+            var = "x" if power == 1 else "x²"
+            if mag == 1:
+                body = var
+            elif mag.denominator == 1:
+                body = f"{mag.numerator}{var}"
+            else:
+                body = f"({num_text(mag)}){var}"
+        if not terms:
+            terms.append(f"-{body}" if c < 0 else body)
+        else:
+            terms.append(f"- {body}" if c < 0 else f"+ {body}")
+    return " ".join(terms) if terms else "0"
+
+def exact_sqrt(c):
+    # square root of a non-negative Fraction, or None if it is not rational
+    n, d = isqrt(c.numerator), isqrt(c.denominator)
+    if n * n == c.numerator and d * d == c.denominator:
+        return Fraction(n, d)
+    return None
+
+def to_sympy(c):
+    return sp.Rational(c.numerator, c.denominator)
+
+# ==========================
+# SOLVER
+# ==========================
+def solve_polynomial_equation(equation_str):
+    # returns (solutions, steps) like sympy.solve(..., x), or None if the
+    # equation is not a polynomial of degree <= 2 in x
+    if equation_str.count("=") != 1:
+        return None
+    left_text, right_text = equation_str.split("=")
+    try:
+        left = parse_polynomial(left_text)
+        right = parse_polynomial(right_text)
+    except (NotPolynomial, ZeroDivisionError, ValueError):
+        return None
+
+    steps = [f"Equation detected: {left_text.strip()} = {right_text.strip()}"]
+    current = f"{poly_text(left)} = {poly_text(right)}"
+    if current != f"{left_text.strip()} = {right_text.strip()}":
+        steps.append(f"Collect like terms on each side: {current}")
+    p = poly_add(left, right, -1) + [Fraction(0)] * 2
+    c, b, a = p[0], p[1], p[2]
+
+    if a == 0 and b == 0:
+        if c == 0:
+            steps.append("Both sides are always equal, so every number works for x.")
+        else:
+            steps.append(f"The two sides always differ by {num_text(abs(c))}, so there is no solution.")
+        return [], steps
+
+    if a == 0:
+        moved = f"{poly_text([0, b])} = {num_text(-c)}"
+        if moved != current:
+            steps.append(f"Move the x terms to the left and the numbers to the right: {moved}")
+        root = -c / b
+        if b != 1:
+            steps.append(f"Divide both sides by {num_text(b)}: x = {num_text(root)}")
+        steps.append(f"Solution: x = {num_text(root)}")
+        return [to_sympy(root)], steps
+
+    moved = f"{poly_text([c, b, a])} = 0"
+    if moved != current:
+        steps.append(f"Move everything to the left: {moved}")
+    steps.append(f"This is a quadratic with a = {num_text(a)}, b = {num_text(b)}, c = {num_text(c)}.")
+    disc = b * b - 4 * a * c
+    steps.append(f"Discriminant: b² - 4ac = {num_text(disc)}")
+    if disc == 0:
+        root = -b / (2 * a)
+        steps.append(f"The discriminant is 0, so there is one solution: x = -b / (2a) = {num_text(root)}")
+        return [to_sympy(root)], steps
+
+    radicand = num_text(disc) if disc > 0 else f"({num_text(disc)})"
+    steps.append(f"Use the formula x = (-b ± √(b² - 4ac)) / (2a) = "
+                 f"({num_text(-b)} ± √{radicand}) / {num_text(2 * a)}")
+    root = exact_sqrt(disc) if disc > 0 else None
+    if root is not None:
+        roots = sorted({(-b - root) / (2 * a), (-b + root) / (2 * a)})
+        steps.append(f"√{num_text(disc)} = {num_text(root)}, so x = {num_text(roots[0])} or x = {num_text(roots[1])}")
+        return [to_sympy(r) for r in roots], steps
+
+    # irrational or complex: same answers (in the same order) as sympy.solve
+    mid = to_sympy(-b / (2 * a))
+    half = sp.sqrt(to_sympy(abs(disc))) / to_sympy(abs(2 * a))
+    if disc < 0:
+        half = half * sp.I
+    solutions = sorted([mid - half, mid + half], key=sp.default_sort_key)
+    if disc < 0:
+        steps.append("The discriminant is negative, so no real number works. "
+                     f"The complex solutions are x = {solutions[0]} or x = {solutions[1]}")
+    else:
+        steps.append(f"√{num_text(disc)} does not come out exact, so x = {solutions[0]} or x = {solutions[1]}")
+    return solutions, steps
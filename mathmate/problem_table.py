@@ -0,0 +1,137 @@
+# mathmate/problem_table.py
+# Every arithmetic problem mathmate_v3_ultra.py can ask (4 operations, operands
+# 2..20) with its teacher steps, worked out once per process, plus a shuffled
+# deck so a student sees each problem once before any repeats.
+#
+#   deck = Deck(ARITHMETIC_ITEMS)
+#   problem = STEP_TABLE.problem(deck.draw())      # {"category": "arithmetic", ...}
+#   steps, answer = arithmetic_steps(problem["type"], problem["a"], problem["b"])
+#
+# Items are numbered kind * 361 + (a - 2) * 19 + (b - 2), so an item number and
+# its operands convert both ways with plain arithmetic. Steps for all items sit
+# in one flat tuple with an offsets array next to it.
+
+import random
+from array import array
+
+OPS = ["addition", "subtraction", "multiplication", "division"]
+LOW, HIGH = 2, 20
+SPAN = HIGH - LOW + 1
+PER_KIND = SPAN * SPAN
+ARITHMETIC_ITEMS = len(OPS) * PER_KIND
+
+def item_operands(item):
+    # item number -> (kind, a, b)
+    kind, rest = divmod(item, PER_KIND)
+    a, b = divmod(rest, SPAN)
+    return kind, a + LOW, b + LOW
+
+def item_number(kind, a, b):
+    return kind * PER_KIND + (a - LOW) * SPAN + (b - LOW)
+
+# ======================
+# TEACHER STEPS
+# ======================
+def explain_arithmetic(op, a, b):
+    # (steps, answer) for one problem; for division `a` is already a * b
+    if op == "addition":
+        steps = [
+            f"We need to add {a} + {b}.",
+            f"Step 1: Line up the numbers.",
+            f"Step 2: Add the ones → {a%10} + {b%10}.",
+            f"Step 3: Add the tens → {a//10*10} + {b//10*10}.",
+            f"Final Step: Combine to get {a+b}."
+        ]
+        return steps, a+b
+    elif op == "subtraction":
+        steps = [
+            f"We need to subtract {b} from {a}.",
+            f"Step 1: Line up the numbers.",
+            f"Step 2: Subtract ones → {a%10} - {b%10}.",
+            f"Step 3: Subtract tens → {a//10*10} - {b//10*10}.",
+            f"Final Step: Combine to get {a-b}."
+        ]
+        return steps, a-b
+    elif op == "multiplication":
+        steps = [
+            f"We need to multiply {a} × {b}.",
+            f"Step 1: Break into tens and ones.",
+            f"{a} = {a//10*10} + {a%10}, {b} = {b//10*10} + {b%10}.",
+            f"Step 2: Multiply each part and add together.",
+            f"Final Step: {a} × {b} = {a*b}."
+        ]
+        return steps, a*b
+    elif op == "division":
+        steps = [
+            f"We need to divide {a} ÷ {b}.",
+            f"Step 1: Estimate → {b} goes into {a}.",
+            f"Step 2: Exact division gives {a//b} remainder {a%b}.",
+            f"Final Step: {a} ÷ {b} = {a//b}."
+        ]
+        return steps, a//b
+    return ["I don’t know this yet."], None
+
+class StepTable:
+    def __init__(self):
+        text = []
+        offsets = array("I", [0])
+        answers = array("i")
+        for item in range(ARITHMETIC_ITEMS):
+            kind, a, b = item_operands(item)
+            if OPS[kind] == "division":
+                a = a * b
+            steps, answer = explain_arithmetic(OPS[kind], a, b)
+            text.extend(steps)
+            offsets.append(len(text))
+            answers.append(answer)
+        self.text = tuple(text)
+        self.offsets = offsets
+        self.answers = answers
+
+    def problem(self, item):
+        kind, a, b = item_operands(item)
+        if OPS[kind] == "division":
+            a = a * b
+        return {"category": "arithmetic", "type": OPS[kind], "a": a, "b": b}
+
+    def steps(self, item):
+        return list(self.text[self.offsets[item]:self.offsets[item + 1]]), self.answers[item]
+
+STEP_TABLE = StepTable()
+
+def arithmetic_steps(op, a, b):
+    # table lookup for the generator's problems, worked out on the spot otherwise
+    if op in OPS and LOW <= b <= HIGH:
+        if op == "division":
+            a_item = a // b if a % b == 0 else None
+        else:
+            a_item = a
+        if a_item is not None and LOW <= a_item <= HIGH:
+            return STEP_TABLE.steps(item_number(OPS.index(op), a_item, b))
+    return explain_arithmetic(op, a, b)
+
+# ======================
+# DECK
+# ======================
+class Deck:
+    # item numbers 0..size-1 in shuffled order; draws without replacement and
+    # reshuffles once every item has been seen
+    def __init__(self, size, rng=None):
+        self.rng = rng or random.Random()
+        self.order = array("H" if size <= 0xFFFF else "I", range(size))
+        self.pos = len(self.order)
+
+    def draw(self):
+        if self.pos >= len(self.order):
+            last = self.order[-1] if self.order else None
+            self.rng.shuffle(self.order)
+            if len(self.order) > 1 and self.order[0] == last:
+                # no back-to-back repeat across the reshuffle
+                self.order[0], self.order[-1] = self.order[-1], self.order[0]
+            self.pos = 0
+        item = self.order[self.pos]
+        self.pos += 1
+        return item
+
+    def remaining(self):
+        return len(self.order) - self.pos
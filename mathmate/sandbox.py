@@ -0,0 +1,283 @@
+# mathmate/sandbox.py
+# A small pool of solver processes, so one huge input (9**9**9, a thousand
+# nested brackets, ...) cannot pin a CPU or eat the memory of the Streamlit
+# server that every other student is using.
+#
+#   pool = SolverPool()                       # workers start and warm up now
+#   solution, steps = pool.run(step_by_step_solver, "2x + 3 = 7")
+#   job = pool.submit(step_by_step_solver, "x^2 = 4"); job.cancel()
+#   job.cancel(kill=False)                    # only if it has not started yet
+#
+# Each request gets a wall-clock limit; each worker gets a memory limit
+# (RLIMIT_AS, where the OS supports it). A worker that runs out of time or
+# memory is killed and replaced, and the caller gets a TooBig error with a
+# friendly message. Workers are also replaced after a number of tasks so
+# SymPy's caches cannot grow forever. The calling thread only waits on a pipe,
+# it never runs SymPy itself.
+
+import atexit
+import contextvars
+import os
+import pickle
+import queue
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from mathmate.metrics import record
+
+try:
+    import resource
+except ImportError:  # Windows: no memory limit, the time limit still works
+    resource = None
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+WORKERS = int(os.getenv("MATHMATE_SOLVER_WORKERS", "2"))
+TIMEOUT = float(os.getenv("MATHMATE_SOLVER_TIMEOUT", "5"))
+MEMORY_MB = int(os.getenv("MATHMATE_SOLVER_MEMORY_MB", "512"))
+MAX_TASKS = int(os.getenv("MATHMATE_SOLVER_MAX_TASKS", "500"))
+
+TOO_BIG_MESSAGE = "That problem is too big for me to work out. Try smaller numbers! 😊"
+
+class TooBig(Exception):
+    # the solver ran out of time or memory; str(e) is safe to show to a student
+    def __init__(self, reason="time"):
+        super().__init__(TOO_BIG_MESSAGE)
+        self.reason = reason
+
+class Cancelled(Exception):
+    pass
+
+# ==========================
+# WORKER PROCESS
+# ==========================
+# Workers are plain "python -m mathmate.sandbox --worker" processes that read
+# pickled (func, args) tasks on stdin and write pickled replies on stdout.
+# (multiprocessing's spawn would re-run the Streamlit page inside every worker,
+# because Streamlit runs each page as the __main__ module.)
+def warm_up():
+    # pay for the SymPy import and first-call caches before the first student does
+    from mathmate.equations import step_by_step_solver
+    step_by_step_solver("x**3 = 8")
+
+def _worker_main(memory_mb):
+    # keep the real stdout for replies; anything the solver prints goes to stderr
+    replies = os.fdopen(os.dup(1), "wb")
+    os.dup2(2, 1)
+    sys.stdout = sys.stderr
+    tasks = sys.stdin.buffer
+
+    def send(reply):
+        pickle.dump(reply, replies)
+        replies.flush()
+
+    if resource is not None and memory_mb:
+        limit = memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    warm = pickle.load(tasks)
+    if warm is not None:
+        warm()
+    send(("ready", None))
+    while True:
+        try:
+            task = pickle.load(tasks)
+        except EOFError:
+            return
+        if task is None:
+            return
+        func, args = task
+        try:
+            reply = ("ok", func(*args))
+        except MemoryError:
+            send(("memory", None))
+            return  # the parent starts a fresh worker
+        except Exception as e:
+            reply = ("error", f"{type(e).__name__}: {e}")
+        try:
+            send(reply)
+        except Exception as e:  # e.g. a result that cannot be pickled
+            send(("error", f"{type(e).__name__}: {e}"))
+
+class _Worker:
+    def __init__(self, memory_mb, warm):
+        env = dict(os.environ)
+        env["PYTHONPATH"] = os.pathsep.join(p for p in [ROOT, env.get("PYTHONPATH")] if p)
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "mathmate.sandbox", "--worker", str(memory_mb or 0)],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, env=env)
+        self.replies = queue.Queue()
+        threading.Thread(target=self._read_replies, daemon=True).start()
+        self.ready = False
+        self.tasks = 0
+        self.send(warm)
+
+    def _read_replies(self):
+        try:
+            while True:
+                self.replies.put(pickle.load(self.process.stdout))
+        except Exception:  # EOF: the worker exited or was killed
+            self.replies.put(("died", None))
+
+    def send(self, message):
+        try:
+            pickle.dump(message, self.process.stdin)
+            self.process.stdin.flush()
+        except (BrokenPipeError, OSError):
+            pass  # the reader thread reports the dead worker
+
+    def wait_ready(self, timeout=60):
+        if not self.ready:
+            try:
+                status, _ = self.replies.get(timeout=timeout)
+            except queue.Empty:
+                status = "timeout"
+            if status != "ready":
+                raise RuntimeError("solver worker did not start")
+            self.ready = True
+
+    def stop(self, kill=False):
+        if not kill:
+            self.send(None)
+            try:
+                self.process.wait(1)
+            except subprocess.TimeoutExpired:
+                pass
+        if self.process.poll() is None:
+            self.process.kill()
+            self.process.wait()
+        for f in (self.process.stdin, self.process.stdout):
+            try:
+                f.close()
+            except OSError:
+                pass
+
+# ==========================
+# POOL
+# ==========================
+class Job:
+    # handle for a request running in the pool
+    def __init__(self):
+        self._cancel = threading.Event()
+        self._started = threading.Event()
+        self.future = None
+
+    def cancel(self, kill=True):
+        # kill=False only stops a job still waiting for a worker; one already
+        # running is left to finish, which is cheaper than starting a new worker
+        if kill or not self._started.is_set():
+            self._cancel.set()
+        self.future.cancel()
+
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def running(self):
+        return self._started.is_set() and not self.done()
+
+    def done(self):
+        return self.future.done()
+
+    def result(self, timeout=None):
+        return self.future.result(timeout)
+
+class SolverPool:
+    def __init__(self, workers=WORKERS, timeout=TIMEOUT, memory_mb=MEMORY_MB,
+                 max_tasks=MAX_TASKS, warm=warm_up):
+        self.timeout = timeout
+        self.memory_mb = memory_mb
+        self.max_tasks = max_tasks
+        self.warm = warm
+        self._idle = queue.Queue()
+        self._threads = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="mathmate-solver")
+        self._closed = False
+        self.stats = {"tasks": 0, "timeouts": 0, "out_of_memory": 0, "cancelled": 0, "recycled": 0}
+        self._stats_lock = threading.Lock()  # counted from every request thread
+        for _ in range(workers):
+            self._idle.put(self._start())
+        atexit.register(self.close)
+
+    def _start(self):
+        return _Worker(self.memory_mb, self.warm)
+
+    def _count(self, name):
+        with self._stats_lock:
+            self.stats[name] += 1
+
+    def _replace(self, worker, kill):
+        worker.stop(kill=kill)
+        self._count("recycled")
+        return self._start()
+
+    def run(self, func, *args, timeout=None, cancel=None, started=None):
+        # func must be importable (module-level) so it can be sent to the worker
+        if self._closed:
+            raise RuntimeError("solver pool is closed")
+        timeout = self.timeout if timeout is None else timeout
+        waited = time.perf_counter()
+        worker = self._idle.get()
+        try:
+            worker.wait_ready()
+        except Exception:
+            self._idle.put(self._replace(worker, kill=True))
+            raise
+        if started is not None:
+            started.set()
+        if cancel is not None and cancel.is_set():
+            self._idle.put(worker)
+            raise Cancelled()
+        record("pool_wait", time.perf_counter() - waited)
+        self._count("tasks")
+        worker.tasks += 1
+        started = time.perf_counter()
+        worker.send((func, args))
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                status, value = worker.replies.get(timeout=0.05)
+                break
+            except queue.Empty:
+                pass
+            if cancel is not None and cancel.is_set():
+                self._count("cancelled")
+                self._idle.put(self._replace(worker, kill=True))
+                raise Cancelled()
+            if time.monotonic() > deadline:
+                self._count("timeouts")
+                self._idle.put(self._replace(worker, kill=True))
+                raise TooBig("time")
+        record("worker", time.perf_counter() - started)
+        if status in ("memory", "died"):  # died: e.g. killed by the memory limit
+            self._count("out_of_memory")
+            self._idle.put(self._replace(worker, kill=True))
+            raise TooBig("memory")
+        if worker.tasks >= self.max_tasks:
+            worker = self._replace(worker, kill=False)
+        self._idle.put(worker)
+        if status == "error":
+            raise RuntimeError(value)
+        return value
+
+    def submit(self, func, *args, timeout=None):
+        job = Job()
+        # run in a copy of the caller's context, so the pool_wait and worker
+        # stages are recorded on the request being traced (mathmate/metrics.py)
+        job.future = self._threads.submit(contextvars.copy_context().run, self.run, func, *args, timeout=timeout,
+                                        cancel=job._cancel, started=job._started)
+        return job
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._threads.shutdown(wait=False, cancel_futures=True)
+        while True:
+            try:
+                self._idle.get_nowait().stop()
+            except queue.Empty:
+                break
+
+if __name__ == "__main__" and sys.argv[1:2] == ["--worker"]:
+    _worker_main(int(sys.argv[2]))
@@ -0,0 +1,105 @@
+# mathmate/startup.py
+# Startup-time report: how long each page takes to paint in a fresh process,
+# and whether SymPy / OpenAI had to be imported for it.
+#
+#   python -m mathmate.startup            # table
+#   python -m mathmate.startup --json     # one JSON object per scenario
+#
+# Every scenario runs in its own Python process (so imports are cold) through
+# Streamlit's headless AppTest runner. Importing Streamlit itself is not
+# counted; "first run" is the first script run (first paint), "last run" is
+# the run after the scenario's clicks/typing.
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY = ["sympy", "openai"]
+
+# name -> (page, [(widget kind, label, value)])
+SCENARIOS = {
+    "app: first paint": ("mathmate_app.py", []),
+    "app: solve 3+4*2": ("mathmate_app.py", [("button", "Try 3+4*2", None), ("button", "Solve", None)]),
+    "v2: first paint": ("mathmate_v2.py", []),
+    "v3 ultra: first paint": ("mathmate_v3_ultra.py", []),
+    "v3.5 ultra: first paint": ("mathmate_v3.5_ultra.py", []),
+    "v4 ultra: first paint": ("mathmate_v4_ultra.py", []),
+    "v4 ultra: hint": ("mathmate_v4_ultra.py", [("radio", "Choose a Mode", "Student Helper Mode"),
+                                                ("text_input", None, "25+37")]),
+    "v4 ultra: Q&A": ("mathmate_v4_ultra.py", [("radio", "Choose a Mode", "Student Q&A Mode"),
+                                               ("text_input", None, "what is division?")]),
+    "v4 ultra: solve equation": ("mathmate_v4_ultra.py", [("radio", "Choose a Mode", "Problem Solver"),
+                                                          ("text_input", None, "2*x + 3 = 7")]),
+    "v5: first paint": ("mathmate_v5.py", []),
+}
+
+def _widget(at, kind, label):
+    widgets = list(getattr(at, kind))
+    if label is not None:
+        widgets = [w for w in widgets if w.label == label]
+    if not widgets:
+        raise LookupError(f"no {kind} labelled {label!r}")
+    return widgets[0]
+
+def run_scenario(name):
+    # runs inside the child process
+    from streamlit.testing.v1 import AppTest
+    page, actions = SCENARIOS[name]
+    at = AppTest.from_file(os.path.join(ROOT, page), default_timeout=120)
+    at.secrets["OPENAI_API_KEY"] = "startup-report"  # v5 refuses to start without one
+    os.environ["MATHMATE_EXPLAIN_WARM"] = "0"  # no background AI calls while timing
+    start = time.perf_counter()
+    at.run()
+    first = last = time.perf_counter() - start
+    for kind, label, value in actions:
+        widget = _widget(at, kind, label)
+        if kind == "button":
+            widget.click()
+        elif kind == "text_input":
+            widget.input(value)
+        else:
+            widget.set_value(value)
+        start = time.perf_counter()
+        at.run()
+        last = time.perf_counter() - start
+    error = at.exception[0].message if len(at.exception) else None
+    return {"scenario": name, "page": page, "first_run_ms": round(first * 1000, 1),
+            "last_run_ms": round(last * 1000, 1), "loaded": {m: m in sys.modules for m in HEAVY},
+            "error": error}
+
+def measure(name):
+    # fresh interpreter per scenario so nothing is imported yet
+    proc = subprocess.run([sys.executable, "-m", "mathmate.startup", "--run", name],
+                          cwd=ROOT, capture_output=True, text=True)
+    lines = proc.stdout.strip().splitlines()
+    if proc.returncode != 0 or not lines:
+        return {"scenario": name, "error": proc.stderr.strip().splitlines()[-1:]}
+    return json.loads(lines[-1])
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure cold page start-up and which heavy imports it needs.")
+    parser.add_argument("--json", action="store_true", help="print JSON lines instead of a table")
+    parser.add_argument("--run", metavar="SCENARIO", help=argparse.SUPPRESS)
+    parser.add_argument("scenarios", nargs="*", help="default: all of " + ", ".join(SCENARIOS))
+    args = parser.parse_args(argv)
+
+    if args.run:
+        print(json.dumps(run_scenario(args.run)))
+        return
+    for name in args.scenarios or SCENARIOS:
+        result = measure(name)
+        if args.json:
+            print(json.dumps(result))
+        elif result.get("error"):
+            print(f"{name:<28} ERROR {result['error']}")
+        else:
+            loaded = ", ".join(m for m, on in result["loaded"].items() if on) or "-"
+            print(f"{name:<28} first run {result['first_run_ms']:>8.1f} ms   "
+                  f"last run {result['last_run_ms']:>8.1f} ms   imported: {loaded}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+# mathmate/stub_llm.py
+# A tiny stand-in for the OpenAI completions API, so AI explanations can be
+# tried offline and with whatever latency you like.
+#
+#   python -m mathmate.stub_llm --port 8765 --first-token-delay 2 --delay 0.05
+#   python -m mathmate.stub_llm --max-concurrent 2     # like a rate-limited account
+#   MATHMATE_AI_BASE_URL=http://127.0.0.1:8765/v1 streamlit run mathmate_v5.py
+#
+# It answers POST .../completions (streaming or not) with a canned, cheerful
+# explanation of the "Problem:" line in the prompt, one word per chunk. With
+# --max-concurrent, requests beyond that many at once get a 429 with a
+# Retry-After header. GET /stats shows how many requests it has seen.
+
+import argparse
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+def reply_text(prompt):
+    m = re.search(r"Problem:\s*(.*)", prompt)
+    problem = m.group(1).strip() if m else "this problem"
+    return (f" Let's solve it together! 🎉 The problem says: {problem} "
+            "First we find the numbers 🔢, then we pick the right operation ➕➖✖️➗, "
+            "and finally we check our answer. You're doing great! 🌟")
+
+def make_handler(first_token_delay=0.0, delay=0.0, max_concurrent=0, stats=None):
+    stats = {"requests": 0, "rejected": 0, "active": 0, "peak": 0} if stats is None else stats
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            if self.path.rstrip("/") != "/stats":
+                self.send_error(404)
+                return
+            with lock:
+                self._send_json(dict(stats))
+
+        def do_POST(self):
+            if not self.path.rstrip("/").endswith("/completions"):
+                self.send_error(404)
+                return
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            with lock:
+                stats["requests"] += 1
+                busy = max_concurrent and stats["active"] >= max_concurrent
+                if busy:
+                    stats["rejected"] += 1
+                else:
+                    stats["active"] += 1
+                    stats["peak"] = max(stats["peak"], stats["active"])
+            if busy:
+                self._send_json({"error": {"message": "Rate limit reached", "type": "rate_limit_error"}},
+                                status=429, headers={"Retry-After": "1"})
+                return
+            try:
+                self._complete(body)
+            finally:
+                with lock:
+                    stats["active"] -= 1
+
+        def _complete(self, body):
+            words = re.findall(r"\s*\S+", reply_text(body.get("prompt", "")))
+            base = {"id": "cmpl-stub", "object": "text_completion",
+                    "created": int(time.time()), "model": body.get("model", "stub")}
+            time.sleep(first_token_delay)
+            if not body.get("stream"):
+                time.sleep(delay * len(words))
+                self._send_json(dict(base, choices=[{"text": "".join(words), "index": 0,
+                                                     "logprobs": None, "finish_reason": "stop"}]))
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            try:
+                for i, word in enumerate(words):
+                    if i:
+                        time.sleep(delay)
+                    finish = "stop" if i == len(words) - 1 else None
+                    chunk = dict(base, choices=[{"text": word, "index": 0,
+                                                 "logprobs": None, "finish_reason": finish}])
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                    self.wfile.flush()
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.wfile.flush()
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # the client hit its deadline and hung up
+            self.close_connection = True
+
+        def _send_json(self, data, status=200, headers=None):
+            payload = json.dumps(data).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(payload)
+
+    return Handler
+
+def serve(host="127.0.0.1", port=0, first_token_delay=0.0, delay=0.0, max_concurrent=0):
+    # starts the stub in a background thread; base URL: f"http://{host}:{server.server_port}/v1",
+    # request counts in server.stats
+    stats = {"requests": 0, "rejected": 0, "active": 0, "peak": 0}
+    server = ThreadingHTTPServer((host, port), make_handler(first_token_delay, delay, max_concurrent, stats))
+    server.stats = stats
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve fake OpenAI completions for offline testing.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--first-token-delay", type=float, default=0.5, help="seconds before the first word")
+    parser.add_argument("--delay", type=float, default=0.05, help="seconds between words")
+    parser.add_argument("--max-concurrent", type=int, default=0, help="answer 429 beyond this many requests at once")
+    args = parser.parse_args(argv)
+    server = ThreadingHTTPServer((args.host, args.port),
+                                 make_handler(args.first_token_delay, args.delay, args.max_concurrent))
+    server.daemon_threads = True
+    print(f"Stub completions API on http://{args.host}:{server.server_port}/v1 (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+# mathmate/teacher.py
+# The problem generator, hints and worked answers of mathmate_v3_ultra.py,
+# without the page around them. Everything returns plain data (a problem
+# dict, a list of step strings and an answer), so it can run in a thread or a
+# worker process as well as behind the Streamlit page.
+#
+#   problem = generate_problem(arithmetic_deck, word_deck)
+#   steps, answer = teacher_explain(problem)
+
+import random
+
+from mathmate.classifier import V3_CLASSIFIER
+from mathmate.lazy import lazy_import
+from mathmate.problem_table import PER_KIND, STEP_TABLE, arithmetic_steps, item_operands
+
+sp = lazy_import("sympy")  # only the word-problem fallback needs it
+
+# ======================
+# PROBLEM GENERATOR
+# ======================
+WORD_TEMPLATES = [
+    "Ali has {a} bags with {b} apples each. How many apples are there in total?",
+    "Sara had {a} candies and gave {b} to her friend. How many are left?",
+    "A box has {a} pencils. Another box has {b} pencils. How many pencils altogether?",
+    "There are {a} cookies shared equally among {b} kids. How many cookies does each get?",
+    "John read {a} pages on Monday and {b} pages on Tuesday. How many pages did he read in total?",
+    "A farmer has {a} cows. He buys {b} more. How many cows does he have now?"
+]
+WORD_OPS = ["multiplication", "subtraction", "addition", "division", "addition", "addition"]  # per template
+WORD_ITEMS = len(WORD_TEMPLATES) * PER_KIND  # size of a word-problem Deck
+
+SYMBOLS = {"addition": "+", "subtraction": "-", "multiplication": "×", "division": "÷"}
+
+def word_problem(item):
+    template, a, b = item_operands(item)
+    return {"category": "word", "question": WORD_TEMPLATES[template].format(a=a, b=b)}
+
+def generate_problem(arithmetic_deck, word_deck, rng=random):
+    # Arithmetic OR Word Problem
+    if rng.choice([True, False]):
+        return STEP_TABLE.problem(arithmetic_deck.draw())
+    else:
+        return word_problem(word_deck.draw())
+
+def problem_text(problem):
+    if problem["category"] == "arithmetic":
+        return f"{problem['a']} {SYMBOLS[problem['type']]} {problem['b']}"
+    return problem["question"]
+
+# ======================
+# HINT SYSTEM
+# ======================
+def give_hint(question):
+    return V3_CLASSIFIER.classify(question).hint
+
+# ======================
+# TEACHER EXPLAINER
+# ======================
+def teacher_explain(problem):
+    if problem["category"] == "arithmetic":
+        # precomputed in mathmate/problem_table.py
+        return arithmetic_steps(problem["type"], problem["a"], problem["b"])
+
+    elif problem["category"] == "word":
+        return word_problem_solver(problem["question"])
+
+    return ["I don’t know this yet."], None
+
+# ======================
+# WORD PROBLEM SOLVER (AI + Sympy)
+# ======================
+def word_problem_solver(question):
+    found = V3_CLASSIFIER.classify(question)
+    numbers = list(found.operands)
+
+    if len(numbers) >= 2:
+        a, b = numbers[0], numbers[1]
+
+        if found.operation == "multiplication":
+            steps = [f"We see {found.label}, so it's multiplication.",
+                     f"{a} × {b} = {a*b}."]
+            return steps, a*b
+        elif found.operation == "subtraction":
+            steps = [f"We see {found.label}, so it's subtraction.",
+                     f"{a} - {b} = {a-b}."]
+            return steps, a-b
+        elif found.operation == "addition":
+            steps = [f"We see {found.label}, so it's addition.",
+                     f"{a} + {b} = {a+b}."]
+            return steps, a+b
+        elif found.operation == "division":
+            steps = [f"We see {found.label}, so it's division.",
+                     f"{a} ÷ {b} = {a//b}."]
+            return steps, a//b
+
+    # fallback with sympy equation (advanced AI)
+    x = sp.symbols('x')
+    eq = sp.Eq(x, sum(numbers))
+    result = sp.solve(eq)[0] if numbers else None
+    return [f"I analyzed it as an equation: {eq}", f"Answer: {result}"], result
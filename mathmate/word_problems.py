@@ -0,0 +1,16 @@
+# mathmate/word_problems.py
+# The word-problem bank used by mathmate_v5.py (Grades 1–5). It lives here so
+# headless jobs, like the explanation warm-up, can read it without Streamlit.
+# Each problem is tagged like the big banks in mathmate/bank.py: grade, skill
+# (also used for the progress stats, see mathmate/history.py) and difficulty.
+
+WORD_PROBLEMS = [
+    {"question": "Ali has 4 pencils ✏️, and his friend gives him 3 more. How many pencils does he have now?", "answer": "7", "skill": "addition", "grade": 1, "difficulty": 1},
+    {"question": "Sara had 18 pencils. She gave 6 to her friend and then bought 4 more. How many pencils does she have now?", "answer": "16", "skill": "subtraction", "grade": 2, "difficulty": 2},
+    {"question": "If a pizza is cut into 4 slices and you eat 1 slice, how many slices are left?", "answer": "3", "skill": "subtraction", "grade": 1, "difficulty": 1},
+    {"question": "Multiply 7 × 8. Be careful! Some students forget the 7s table.", "answer": "56", "skill": "multiplication", "grade": 3, "difficulty": 2},
+    {"question": "Divide 29 pencils among 4 students. How many pencils does each get and how many are left?", "answer": "7 each, 1 leftover", "skill": "division", "grade": 3, "difficulty": 3},
+    {"question": "Shade half of 12 circles. How many should be shaded?", "answer": "6", "skill": "fractions", "grade": 2, "difficulty": 1},
+    {"question": "Which is bigger: 102 or 99?", "answer": "102", "skill": "comparison", "grade": 1, "difficulty": 1},
+    {"question": "A rectangle is 8 cm long and 5 cm wide. What is its perimeter and its area?", "answer": "Perimeter: 26 cm, Area: 40 cm²", "skill": "geometry", "grade": 4, "difficulty": 3},
+]
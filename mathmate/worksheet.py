@@ -0,0 +1,223 @@
+# mathmate/worksheet.py
+# Printable worksheets with answer keys in bulk (thousands to millions of
+# problems for a whole school), drawn all at once with NumPy instead of one
+# random.randint at a time.
+#
+#   python -m mathmate.worksheet -n 5000 --seed 7 -o sheets.csv --answers key.csv
+#   python -m mathmate.worksheet -n 1000000 --kinds addition,word --max 999 -o sheets.jsonl --answers key.jsonl
+#
+#   problems = generate(1000, seed=7)     # NumPy arrays: code, a, b, answer
+#   write_worksheets(problems, sheet_file, key_file, "csv")
+#
+# The kinds are the four operations of generate_random_problem (mathmate/multistep.py)
+# and the word templates of generate_problem (mathmate/teacher.py), with numbers
+# from --min to --max (default 1-50, like mathmate_v2.py). Every answer is a
+# whole number and never negative: subtraction puts the bigger number first and
+# division is set up as (a × b) ÷ b. Each problem is one integer,
+# (code * span + a) * span + b, so repeats are dropped with np.unique and more
+# are drawn until there are enough; no problem appears twice in one run. The
+# same --seed always gives the same problems in the same order.
+#
+# Only the integer arrays are kept in memory; the text is formatted and written
+# CHUNK rows at a time.
+
+import argparse
+import csv
+import io
+import json
+import sys
+from collections import namedtuple
+
+from mathmate.lazy import lazy_import
+from mathmate.problem_table import OPS
+from mathmate.teacher import SYMBOLS, WORD_OPS, WORD_TEMPLATES
+
+np = lazy_import("numpy")
+
+LOW, HIGH = 1, 50
+MAX_NUMBER = 10**6  # keeps every key and answer inside int64
+PER_SHEET = 20
+CHUNK = 65536
+
+KINDS = OPS + ["word"]
+# problem codes: 0-3 the operations (in OPS order), then one per word template
+FORMATS = [f"{{a}} {SYMBOLS[op]} {{b}} =" for op in OPS] + WORD_TEMPLATES
+CODE_OPS = list(range(len(OPS))) + [OPS.index(op) for op in WORD_OPS]
+CODE_KINDS = OPS + ["word"] * len(WORD_TEMPLATES)
+SKILLS = [OPS[op] for op in CODE_OPS]
+ADD, SUB, MUL, DIV = range(4)
+
+Problems = namedtuple("Problems", "code a b answer")
+
+# ==========================
+# DRAWING
+# ==========================
+def kind_codes(kinds):
+    codes = []
+    for kind in kinds:
+        if kind == "word":
+            codes += range(len(OPS), len(FORMATS))
+        elif kind in OPS:
+            codes.append(OPS.index(kind))
+        else:
+            raise ValueError(f"Unknown kind {kind!r} (choose from {', '.join(KINDS)})")
+    return sorted(set(codes))
+
+def code_weights(codes):
+    # each kind is as likely as the others; the word templates share one kind's turn
+    per_kind = {}
+    for c in codes:
+        per_kind[CODE_KINDS[c]] = per_kind.get(CODE_KINDS[c], 0) + 1
+    return [1 / (len(per_kind) * per_kind[CODE_KINDS[c]]) for c in codes]
+
+def capacity(codes, low, high):
+    # how many different problems there are to draw from
+    span = high - low + 1
+    return sum(span * (span + 1) // 2 if CODE_OPS[c] == SUB else span * span for c in codes)
+
+def _draw(rng, m, codes, low, high):
+    # m random keys, repeats and all
+    code = rng.choice(np.asarray(codes, dtype=np.int64), size=m, p=code_weights(codes))
+    x = rng.integers(low, high + 1, size=m)
+    y = rng.integers(low, high + 1, size=m)
+    sub = np.asarray(CODE_OPS)[code] == SUB
+    x, y = np.where(sub, np.maximum(x, y), x), np.where(sub, np.minimum(x, y), y)
+    span = high - low + 1
+    return (code * span + (x - low)) * span + (y - low)
+
+def _every_key(codes, low, high):
+    span = high - low + 1
+    x, y = np.divmod(np.arange(span * span, dtype=np.int64), span)
+    keys = []
+    for c in codes:
+        grid = c * span * span + x * span + y
+        keys.append(grid[x >= y] if CODE_OPS[c] == SUB else grid)
+    return np.concatenate(keys)
+
+def unique_keys(rng, n, codes, low, high):
+    total = capacity(codes, low, high)
+    if n > total:
+        raise ValueError(f"There are only {total} different problems with these kinds and numbers; "
+                         f"ask for fewer or raise --max")
+    if 2 * n >= total:
+        # most of them: cheaper to shuffle them all than to draw and drop repeats
+        return rng.permutation(_every_key(codes, low, high))[:n]
+    keys = np.empty(0, dtype=np.int64)
+    while len(keys) < n:
+        # draw a little more than is missing, since some will be repeats
+        need = n - len(keys)
+        keys = np.concatenate([keys, _draw(rng, need * total // (total - len(keys)) + 16, codes, low, high)])
+        _, first = np.unique(keys, return_index=True)
+        keys = keys[np.sort(first)]  # first time each one came up, in draw order
+    return keys[:n]
+
+def generate(n, seed=None, kinds=KINDS, low=LOW, high=HIGH):
+    codes = kind_codes(kinds)
+    if not codes:
+        raise ValueError("No kinds of problem to draw from")
+    if not 0 <= low <= high <= MAX_NUMBER:
+        raise ValueError(f"Numbers must be 0 <= min <= max <= {MAX_NUMBER}")
+    if low == 0 and any(CODE_OPS[c] == DIV for c in codes):
+        raise ValueError("Division needs --min 1 or more (nothing can be divided by 0)")
+    rng = np.random.default_rng(seed)
+    keys = unique_keys(rng, n, codes, low, high)
+    span = high - low + 1
+    rest, y = np.divmod(keys, span)
+    code, x = np.divmod(rest, span)
+    x += low
+    y += low
+    op = np.asarray(CODE_OPS)[code]
+    answer = np.select([op == ADD, op == SUB, op == MUL], [x + y, x - y, x * y], x)
+    a = np.where(op == DIV, x * y, x)
+    return Problems(code, a, y, answer)
+
+# ==========================
+# WRITING
+# ==========================
+def line_formats(fmt, with_answer):
+    # one str.format pattern per problem code for a whole worksheet line, with
+    # {0} sheet, {1} number, {2} a, {3} b, {4} answer; CSV quoting and JSON
+    # escaping are worked out once here, since filling in digits never changes them
+    lines = []
+    for code, text in enumerate(FORMATS):
+        text = text.replace("{a}", "{2}").replace("{b}", "{3}")
+        if fmt == "csv":
+            quoted = io.StringIO()
+            csv.writer(quoted, lineterminator="").writerow([SKILLS[code], text])
+            lines.append("{0},{1}," + quoted.getvalue() + (",{4}" if with_answer else "") + "\r\n")
+        else:
+            lines.append('{{"sheet": {0}, "number": {1}, "skill": %s, "question": %s%s}}\n'
+                         % (json.dumps(SKILLS[code]), json.dumps(text, ensure_ascii=False),
+                            ', "answer": {4}' if with_answer else ""))
+    return lines
+
+def write_worksheets(problems, sheet_stream, key_stream=None, fmt="csv", per_sheet=PER_SHEET):
+    # the worksheet gets sheet, number, skill and question; the answer key sheet,
+    # number and answer (or, with no key stream, the answer goes on the worksheet)
+    if per_sheet < 1:
+        raise ValueError("per_sheet must be at least 1")
+    count = len(problems.code)
+    lines = line_formats(fmt, with_answer=key_stream is None)
+    if fmt == "csv":
+        key_line = "{0},{1},{2}\r\n"
+        sheet_stream.write("sheet,number,skill,question" + ("" if key_stream else ",answer") + "\r\n")
+        if key_stream:
+            key_stream.write("sheet,number,answer\r\n")
+    else:
+        key_line = '{{"sheet": {0}, "number": {1}, "answer": {2}}}\n'
+    for start in range(0, count, CHUNK):
+        end = min(start + CHUNK, count)
+        index = np.arange(start, end)
+        sheets = (index // per_sheet + 1).tolist()
+        numbers = (index % per_sheet + 1).tolist()
+        answers = problems.answer[start:end].tolist()
+        sheet_stream.write("".join(lines[code].format(sheet, number, a, b, answer)
+                                   for sheet, number, code, a, b, answer in
+                                   zip(sheets, numbers, problems.code[start:end].tolist(),
+                                       problems.a[start:end].tolist(), problems.b[start:end].tolist(),
+                                       answers)))
+        if key_stream:
+            key_stream.write("".join(map(key_line.format, sheets, numbers, answers)))
+    return count
+
+def guess_format(path):
+    return "csv" if path and path.lower().endswith(".csv") else "jsonl"
+
+# ==========================
+# CLI
+# ==========================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate MathMate worksheets and answer keys.")
+    parser.add_argument("-n", type=int, default=PER_SHEET, help="how many problems")
+    parser.add_argument("--seed", type=int, default=None, help="same seed, same problems")
+    parser.add_argument("--kinds", default=",".join(KINDS), help=f"comma-separated, from {','.join(KINDS)}")
+    parser.add_argument("--min", type=int, default=LOW, help="smallest number in a problem")
+    parser.add_argument("--max", type=int, default=HIGH, help="biggest number in a problem (before a × b for division)")
+    parser.add_argument("--per-sheet", type=int, default=PER_SHEET, help="problems on one printed sheet")
+    parser.add_argument("-o", "--output", default="-", help="worksheet file (default: stdout)")
+    parser.add_argument("--answers", help="answer key file (default: answers go on the worksheet)")
+    parser.add_argument("--format", choices=["jsonl", "csv"], help="default: from the file extension")
+    args = parser.parse_args(argv)
+    if args.per_sheet < 1:
+        parser.error("--per-sheet must be at least 1")
+
+    try:
+        problems = generate(args.n, args.seed, [k.strip() for k in args.kinds.split(",") if k.strip()],
+                            args.min, args.max)
+    except ValueError as e:
+        parser.error(str(e))
+    fmt = args.format or guess_format(args.output if args.output != "-" else args.answers)
+    sheet = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8", newline="")
+    key = open(args.answers, "w", encoding="utf-8", newline="") if args.answers else None
+    try:
+        count = write_worksheets(problems, sheet, key, fmt, args.per_sheet)
+    finally:
+        if sheet is not sys.stdout:
+            sheet.close()
+        if key:
+            key.close()
+    sheets = -(-count // args.per_sheet)
+    print(f"Wrote {count} problems on {sheets} sheet{'' if sheets == 1 else 's'}.", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
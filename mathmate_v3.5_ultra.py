@@ -2,9 +2,13 @@
 # MathMate V3 Ultra - AI Teacher + Solver + Student Helper
 # Streamlit + Sympy
 
+import time
+
 import streamlit as st
-from sympy import symbols, Eq, solve, simplify
-import re
+from mathmate.equations import give_hint
+from mathmate.live import LiveSolver
+from mathmate.metrics import trace
+from mathmate.sandbox import SolverPool
 
 # ==========================
 # PAGE SETTINGS
@@ -21,69 +25,77 @@ st.markdown("### Your AI Teacher, Solver & Study Buddy")
 # ==========================
 # HELPER FUNCTIONS
 # ==========================
-def step_by_step_solver(expr_str):
-    x = symbols('x')
-    steps = []
-
-    try:
-        # Try to detect equations like "2x + 3 = 7"
-        if "=" in expr_str:
-            left, right = expr_str.split("=")
-            equation = Eq(simplify(left), simplify(right))
-            steps.append(f"Equation detected: {equation}")
-
-            solution = solve(equation, x)
-
-            steps.append("Step 1: Rearrange terms to isolate variable.")
-            steps.append("Step 2: Simplify both sides.")
-            steps.append("Step 3: Solve for the unknown.")
-
-            return solution, steps
-        else:
-            # Just a normal expression
-            simplified = simplify(expr_str)
-            steps.append(f"Simplifying expression: {expr_str}")
-            steps.append(f"Result: {simplified}")
-            return simplified, steps
-    except Exception as e:
-        return None, [f"❌ Error: {e}"]
-
-def give_hint(expr_str):
-    if "=" in expr_str:
-        return "👉 Try moving terms with 'x' to one side and numbers to the other."
-    elif "+" in expr_str:
-        return "👉 Add similar terms together."
-    elif "*" in expr_str:
-        return "👉 Multiply step by step."
-    else:
-        return "👉 Break it into smaller steps."
+@st.cache_resource
+def get_solver_pool():
+    # one warm pool of solver processes per server, so a huge input can't
+    # freeze the page for everyone (see mathmate/sandbox.py)
+    return SolverPool()
+
+def live_solver():
+    # one per student: skips half-typed input, turns away problems too big to
+    # solve and cancels superseded solves (see mathmate/live.py)
+    if "live" not in st.session_state:
+        st.session_state.live = LiveSolver(get_solver_pool())
+    return st.session_state.live
+
+def solve(problem):
+    # None while the input is empty or half-typed, else (solution, steps)
+    live = live_solver()
+    if not problem.strip():
+        live.update(problem)  # stops whatever was being solved; nothing to trace
+        return None
+    with trace("v3.5.solve", problem):  # pool_wait + worker stages, see mathmate/metrics.py
+        state = live.update(problem)
+        if state.status == "incomplete":
+            st.caption(f"✍️ {state.reason}")
+        elif state.status == "rejected":  # too big to solve (see mathmate/cost.py)
+            st.warning(state.reason)
+        if state.status in ("incomplete", "rejected"):
+            return None
+        if state.status == "solving":
+            note = st.empty()
+            while not live.ready():
+                # writing here is also where a newer input stops this run; its
+                # update() then cancels this solve
+                note.caption("🤔 Working it out...")
+                time.sleep(0.05)
+            note.empty()
+        return live.result()
 
 # ==========================
 # APP LAYOUT
 # ==========================
 mode = st.sidebar.selectbox("Choose Mode:", ["AI Solver", "AI Teacher", "Student Helper"])
 
-problem = st.text_input("✏️ Enter your math problem (e.g., 2x + 3 = 7):")
-
-if problem:
-    solution, steps = step_by_step_solver(problem)
+get_solver_pool()  # starts warming up on the first page load
 
-    if mode == "AI Solver":
-        st.subheader("🔹 Solution")
-        st.write(solution)
+# a fragment: typing a problem reruns only this part of the page
+@st.fragment
+def workspace(mode):
+    problem = st.text_input("✏️ Enter your math problem (e.g., 2x + 3 = 7):")
 
-    elif mode == "AI Teacher":
-        st.subheader("📘 Step-by-Step Explanation")
-        for i, step in enumerate(steps, 1):
-            st.markdown(f"**Step {i}:** {step}")
-        st.success(f"✅ Final Answer: {solution}")
+    solved = solve(problem)
+    if solved:
+        solution, steps = solved
 
-    elif mode == "Student Helper":
-        st.subheader("🤝 Student Helper")
-        st.markdown("Here’s a hint to get you started:")
-        st.info(give_hint(problem))
+        if mode == "AI Solver":
+            st.subheader("🔹 Solution")
+            st.write(solution)
 
-        with st.expander("Show Step-by-Step Solution"):
+        elif mode == "AI Teacher":
+            st.subheader("📘 Step-by-Step Explanation")
             for i, step in enumerate(steps, 1):
                 st.markdown(f"**Step {i}:** {step}")
             st.success(f"✅ Final Answer: {solution}")
+
+        elif mode == "Student Helper":
+            st.subheader("🤝 Student Helper")
+            st.markdown("Here’s a hint to get you started:")
+            st.info(give_hint(problem))
+
+            with st.expander("Show Step-by-Step Solution"):
+                for i, step in enumerate(steps, 1):
+                    st.markdown(f"**Step {i}:** {step}")
+                st.success(f"✅ Final Answer: {solution}")
+
+workspace(mode)
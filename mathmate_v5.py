@@ -1,38 +1,24 @@
 # mathmate_v5.py
 import streamlit as st
 import random
-import openai
 import os
+import csv
+import io
+from mathmate.explain import get_backend
+from mathmate.bank import default_bank, weak_area_weights
+from mathmate.explain_cache import cached_explanation, start_warm_up
+from mathmate.grading import ITEM_FIELDS, SCORE_FIELDS, check_answer, grade, item_rows, score_rows
+from mathmate.history import History
+from mathmate.metrics import trace
 
 # =======================
 # OpenAI API Configuration
 # =======================
-openai.api_key = st.secrets.get("OPENAI_API_KEY") or os.getenv("OPENAI_API_KEY")
-if not openai.api_key:
+# (the openai package is only imported on the first "Check Answer")
+OPENAI_API_KEY = st.secrets.get("OPENAI_API_KEY") or os.getenv("OPENAI_API_KEY")
+if not OPENAI_API_KEY:
     st.error("OpenAI API key not found! Please set it in Streamlit secrets or environment variable.")
 
-def get_ai_explanation(question, user_answer=None):
-    """
-    Ask OpenAI to explain the answer in a fun, step-by-step way for kids
-    """
-    try:
-        prompt = f"""
-You are a super fun, friendly math tutor for kids. 
-Explain the answer to this problem step by step in a funny, happy, emoji-filled way.
-Problem: {question}
-User answer: {user_answer if user_answer is not None else "None"}
-Make it clear and educational like a story, and guide the kid to understand.
-"""
-        response = openai.Completion.create(
-            model="text-davinci-003",
-            prompt=prompt,
-            temperature=0.9,
-            max_tokens=250
-        )
-        return response.choices[0].text.strip()
-    except Exception as e:
-        return f"Oops! AI explanation failed 😢. Error: {e}"
-
 # =======================
 # App Configuration
 # =======================
@@ -54,81 +40,149 @@ st.markdown("""
 # =======================
 # User Info & Points
 # =======================
-if "points" not in st.session_state:
-    st.session_state.points = 0
+# a bounded ring of answers plus running totals (mathmate/history.py); with
+# ?student=<name> in the URL and MATHMATE_HISTORY_DB set, it survives reloads
 if "history" not in st.session_state:
-    st.session_state.history = []
+    student = st.query_params.get("student")
+    st.session_state.history = History.load(student) if student else History()
+history = st.session_state.history
 
 st.title("MathMate V5 🧮")
-st.write(f"Points: {st.session_state.points} 🎯")
-
-# =======================
-# Sample Word Problems (Grades 1–5)
-# =======================
-word_problems = [
-    {"question": "Ali has 4 pencils ✏️, and his friend gives him 3 more. How many pencils does he have now?", "answer": "7"},
-    {"question": "Sara had 18 pencils. She gave 6 to her friend and then bought 4 more. How many pencils does she have now?", "answer": "16"},
-    {"question": "If a pizza is cut into 4 slices and you eat 1 slice, how many slices are left?", "answer": "3"},
-    {"question": "Multiply 7 × 8. Be careful! Some students forget the 7s table.", "answer": "56"},
-    {"question": "Divide 29 pencils among 4 students. How many pencils does each get and how many are left?", "answer": "7 each, 1 leftover"},
-    {"question": "Shade half of 12 circles. How many should be shaded?", "answer": "6"},
-    {"question": "Which is bigger: 102 or 99?", "answer": "102"},
-    {"question": "A rectangle is 8 cm long and 5 cm wide. What is its perimeter and its area?", "answer": "Perimeter: 26 cm, Area: 40 cm²"},
-]
-
-# =======================
-# Select a problem (only once per round)
-# =======================
-if "current_problem" not in st.session_state:
-    st.session_state.current_problem = random.choice(word_problems)
-
-problem = st.session_state.current_problem
-st.subheader("Try this problem:")
-st.write(problem["question"])
-
-# =======================
-# User Input
-# =======================
-user_answer = st.text_input("Your Answer:")
-
-if st.button("Check Answer ✅"):
-    # Normalize answers to strings
-    user_answer_str = str(user_answer).strip()
-    correct_answer_str = str(problem["answer"]).strip()
-
-    # Check correctness
-    correct = user_answer_str.lower() == correct_answer_str.lower()
-
-    # Get AI explanation
-    ai_explanation = get_ai_explanation(problem["question"], user_answer)
-
-    if correct:
-        st.success(f"🎉 Correct! {ai_explanation}")
-        st.session_state.points += 10
-    else:
-        st.error(f"❌ Oops! The correct answer is {problem['answer']}. {ai_explanation}")
 
-    # Save to history
-    st.session_state.history.append({
-        "question": problem["question"],
-        "your_answer": user_answer,
-        "correct_answer": problem["answer"]
-    })
-
-# =======================
-# When the user clicks "Next Problem", we can refresh
-# =======================
-if st.button("Next Problem ➡️"):
-    st.session_state.current_problem = random.choice(word_problems)
-    st.experimental_rerun()  # Rerun app to show new problem
-
-# =======================
-# Memory / History
 # =======================
-st.write("### Your Previous Problems:")
-for h in st.session_state.history[-5:]:
-    st.write(f"Q: {h['question']}")
-    st.write(f"Your Answer: {h['your_answer']} | Correct: {h['correct_answer']} ✅")
+# Word Problems (Grades 1–5)
+# =======================
+# the built-in problems, or the memory-mapped bank in MATHMATE_BANK (mathmate/bank.py)
+@st.cache_resource
+def get_bank():
+    return default_bank()
+
+bank = get_bank()
+RECENT = 20  # problems a student has just seen are skipped
+
+@st.cache_resource
+def warm_explanations():
+    # once per server: prefill the explanation cache for a small bank
+    # (a big one gets its explanations on demand)
+    if OPENAI_API_KEY and len(bank) <= 1000:
+        start_warm_up([bank.problem(i) for i in range(len(bank))], get_backend(OPENAI_API_KEY))
+    return True
+
+warm_explanations()
+
+grade_filter = st.sidebar.selectbox("Grade", ["All grades"] + bank.grades)
+skills = st.sidebar.multiselect("Skills", bank.skills)
+
+def pick_problem():
+    # more of what the student gets wrong, nothing they have just seen
+    found = bank.pick(random, grades=None if grade_filter == "All grades" else {grade_filter}, skills=set(skills),
+                      weights=weak_area_weights(history, bank.skills),
+                      exclude={h.qid for h in history.last(RECENT)})
+    return found or bank.pick(random)
+
+def next_problem():
+    st.session_state.current_problem = pick_problem()
+
+# =======================
+# Practice
+# =======================
+# a fragment: checking an answer or moving to the next problem reruns only
+# this part of the page, not the setup, the bank and the sidebar above
+@st.fragment
+def practice():
+    points_box = st.empty()  # rewritten as soon as an answer is checked
+    points_box.write(f"Points: {history.points} 🎯")
+
+    # Select a problem (only once per round)
+    if "current_problem" not in st.session_state:
+        st.session_state.current_problem = pick_problem()
+
+    problem = st.session_state.current_problem
+    st.subheader("Try this problem:")
+    st.write(problem["question"])
+
+    # User Input
+    user_answer = st.text_input("Your Answer:")
+
+    if st.button("Check Answer ✅"):
+        with trace("v5.check_answer", f"{problem['question']} | answer: {user_answer}") as t:
+            with t.span("verdict"):
+                # Check correctness: "7.0", "seven" and "7 r1" count, see mathmate/grading.py
+                verdict = check_answer(problem["answer"], user_answer)
+                correct = verdict.correct
+
+                # Save to history (points and streaks are updated with it)
+                history.record(problem["id"], problem["skill"], user_answer, correct)
+
+                # Verdict and points first; the explanation streams in underneath
+                if correct:
+                    st.success("🎉 Correct!")
+                    points_box.write(f"Points: {history.points} 🎯")
+                elif verdict.reason == "wrong unit":
+                    st.warning(f"📏 Right number, wrong unit! The correct answer is {problem['answer']}.")
+                else:
+                    st.error(f"❌ Oops! The correct answer is {problem['answer']}.")
+
+            # AI explanation: from the shared cache, or word by word from the AI
+            # (which gives up after MATHMATE_AI_DEADLINE seconds)
+            with t.span("explanation"):
+                st.write_stream(cached_explanation(problem["question"], user_answer, correct,
+                                                   problem["answer"], get_backend(OPENAI_API_KEY)))
+
+    # When the user clicks "Next Problem", show a new one (picked before the
+    # fragment reruns, so no second rerun is needed)
+    st.button("Next Problem ➡️", on_click=next_problem)
+
+    # Memory / History
+    st.write("### Your Previous Problems:")
+    for h in history.last(5):
+        past = bank.lookup(h.qid)
+        if past is None:  # no longer in the bank
+            continue
+        st.write(f"Q: {past['question']}")
+        st.write(f"Your Answer: {h.answer} | Correct: {past['answer']} ✅")
+
+    if history.answered:
+        st.write(f"Accuracy: {history.accuracy():.0%} | Streak: {history.streak} 🔥 | Best streak: {history.best_streak}")
+        with st.expander("📈 Progress by skill"):
+            for skill, (answered, right) in sorted(history.skills.items()):
+                st.write(f"{skill.capitalize()}: {right}/{answered} correct ({right / answered:.0%})")
+
+practice()
+
+# =======================
+# Grade a whole class (teachers)
+# =======================
+# a CSV with student, id (as in the bank) and answer columns, graded in one go
+# (a fragment of its own, so uploading doesn't rerun the practice part)
+def to_csv(rows, fields):
+    out = io.StringIO()
+    writer = csv.DictWriter(out, fieldnames=fields)
+    writer.writeheader()
+    writer.writerows(rows)
+    return out.getvalue()
+
+@st.fragment
+def grade_class():
+    with st.expander("👩‍🏫 Grade a class"):
+        uploaded = st.file_uploader("Answer sheet (CSV: student, id, answer)", type="csv")
+        if uploaded is not None:
+            def answer_of(item):
+                found = bank.lookup(item)
+                return found["answer"] if found else None
+            students, items = grade(csv.DictReader(io.StringIO(uploaded.getvalue().decode("utf-8-sig"))), answer_of)
+            if not students:
+                st.warning("No answers matched a problem in the bank (check the id column).")
+            else:
+                scores, item_stats = score_rows(students), item_rows(items)
+                st.write(f"Graded {sum(s['answered'] for s in students.values())} answers from {len(students)} students.")
+                st.dataframe(scores)
+                st.write("Hardest problems first, with the most common mistakes:")
+                st.dataframe(item_stats)
+                st.download_button("Download scores", to_csv(scores, SCORE_FIELDS), "scores.csv", "text/csv")
+                st.download_button("Download problem report", to_csv(item_stats, ITEM_FIELDS), "items.csv", "text/csv")
+
+grade_class()
 
 # =======================
 # Bonus Next Steps:
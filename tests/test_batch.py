@@ -0,0 +1,30 @@
+# tests/test_batch.py
+# Batch rows are routed and limited like the pages' problems: one bad row
+# gets an error, the rest are solved.
+
+import pytest
+
+from mathmate import batch
+from mathmate.sandbox import TOO_BIG_MESSAGE, SolverPool
+
+@pytest.fixture(autouse=True)
+def quick_pool(monkeypatch):
+    pool = SolverPool(workers=1, timeout=2)
+    monkeypatch.setattr(batch, "_pool", pool)
+    yield pool
+    pool.close()
+
+def test_rows_are_solved():
+    results = batch.solve_chunk([{"id": 1, "problem": "3+4*2"}, {"equation": "2x + 3 = 7"},
+                                 {"expression": "2^(1/2)*3"}, {"problem": "x^3 = 8"}])
+    assert [r["answer"] for r in results] == ["11", "[2]", "3*sqrt(2)", "[2, -1 - sqrt(3)*I, -1 + sqrt(3)*I]"]
+    assert [r["error"] for r in results] == [None] * 4
+
+def test_too_big_rows_get_an_error():
+    results = batch.solve_chunk([{"problem": "99^99^99"}, {"problem": "x^99999999 = 2"}, {"problem": "1+1"}])
+    assert [r["error"] for r in results] == [TOO_BIG_MESSAGE, TOO_BIG_MESSAGE, None]
+    assert results[2]["answer"] == "2"
+
+def test_fast_rows_do_not_use_the_pool(quick_pool):
+    batch.solve_chunk([{"problem": "(5+3)^2*7"}, {"problem": "x^2 - 5x + 6 = 0"}])
+    assert quick_pool.stats["tasks"] == 0
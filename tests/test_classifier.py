@@ -0,0 +1,144 @@
+# tests/test_classifier.py
+# The shared classifier must answer exactly like the substring chains each page
+# had before it (copied below from the pages as they were).
+
+import random
+import re
+
+import pytest
+
+from mathmate import helper, multistep, teacher
+from mathmate.classifier import V2_CLASSIFIER, V3_CLASSIFIER, V4_CLASSIFIER, V4_SYMBOL_CLASSIFIER
+
+# ==========================
+# THE OLD CHAINS
+# ==========================
+def v2_operation(problem_text):
+    # mathmate_v2.py solve_word_problem
+    if "add" in problem_text or "sum" in problem_text:
+        return "addition"
+    elif "subtract" in problem_text or "left" in problem_text:
+        return "subtraction"
+    elif "multiply" in problem_text or "times" in problem_text:
+        return "multiplication"
+    elif "divide" in problem_text or "each" in problem_text:
+        return "division"
+    return None
+
+def v3_hint(question):
+    # mathmate_v3_ultra.py give_hint
+    if "each" in question or "every" in question:
+        return "Hint: 'each' usually means multiplication."
+    if "left" in question:
+        return "Hint: 'left' usually means subtraction."
+    if "total" in question or "altogether" in question:
+        return "Hint: 'total/altogether' usually means addition."
+    if "share" in question or "equally" in question:
+        return "Hint: 'share/equally' usually means division."
+    return "Hint: Look for keywords like total, each, left, share."
+
+def v3_word_problem(question):
+    # mathmate_v3_ultra.py word_problem_solver, without the SymPy fallback
+    numbers = list(map(int, re.findall(r'\d+', question)))
+    if len(numbers) >= 2:
+        a, b = numbers[0], numbers[1]
+        if "each" in question or "every" in question:
+            return [f"We see 'each', so it's multiplication.", f"{a} × {b} = {a*b}."], a*b
+        elif "left" in question:
+            return [f"We see 'left', so it's subtraction.", f"{a} - {b} = {a-b}."], a-b
+        elif "total" in question or "altogether" in question:
+            return [f"We see 'total/altogether', so it's addition.", f"{a} + {b} = {a+b}."], a+b
+        elif "share" in question or "equally" in question:
+            return [f"We see 'share/equally', so it's division.", f"{a} ÷ {b} = {a//b}."], a//b
+    return None
+
+def v4_word_hint(problem_text):
+    # mathmate_v4_ultra.py word_problem_solver
+    problem_text = problem_text.lower()
+    if "total" in problem_text or "sum" in problem_text:
+        return "This looks like an addition problem."
+    elif "left" in problem_text or "remain" in problem_text:
+        return "This looks like a subtraction problem."
+    elif "each" in problem_text and "groups" in problem_text:
+        return "This looks like a multiplication problem."
+    elif "share" in problem_text or "divide" in problem_text:
+        return "This looks like a division problem."
+    else:
+        return "Let's carefully read and translate it into math first."
+
+def v4_symbol_hint(problem):
+    # mathmate_v4_ultra.py generate_hint
+    if "+" in problem:
+        return "Think about combining two numbers together."
+    elif "-" in problem:
+        return "Think about taking away from a number."
+    elif "*" in problem:
+        return "Multiplication is repeated addition."
+    elif "/" in problem:
+        return "Division is splitting into equal groups."
+    return "Break the problem into smaller steps."
+
+# ==========================
+# INPUTS
+# ==========================
+CUES = ["add", "sum", "subtract", "left", "multiply", "times", "divide", "each", "every", "total",
+        "altogether", "share", "equally", "remain", "groups", "Each", "LEFT", "Total", "Share"]
+FILLER = ["Ali", "has", "apples", "and", "gave", "some", "away", "how", "many", "are", "there",
+          "sums", "leftover", "dividends", "teacher", "reached", "summer", "remaining", "?", "."]
+
+def texts():
+    found = [template.format(a=a, b=b) for template in teacher.WORD_TEMPLATES for a, b in [(12, 4), (7, 30)]]
+    found += [
+        "", "no numbers here", "12 and 5", "What is the sum of 3 and 4?", "Add 3 and 4",
+        "She has 20 sweets left after eating 5 of each.", "Every 3 kids share 9 apples equally.",
+        "There are 4 groups with 6 in each.", "Each of the 4 Groups has 6.", "8 remain from 10",
+        "The teacher reached 30 summers.", "divide 12 by 3 times", "LEFT: 9, 2", "Total of 5 and 6",
+        "25+37", "25-7", "6*7", "42/6", "-5 + 3", "3*4-2", "no symbols",
+    ]
+    rng = random.Random(11)
+    words = CUES + FILLER
+    for _ in range(3000):
+        found.append(" ".join(rng.choice(words) if rng.random() < 0.7 else str(rng.randint(1, 99))
+                              for _ in range(rng.randint(1, 12))))
+    return found
+
+TEXTS = texts()
+
+# ==========================
+# PARITY
+# ==========================
+def test_v2_chain():
+    for text in TEXTS:
+        found = V2_CLASSIFIER.classify(text)
+        assert found.operation == v2_operation(text), text
+        assert list(found.operands) == list(map(int, re.findall(r'\d+', text))), text
+
+def test_v2_page_numbers_and_operation():
+    for text in TEXTS:
+        numbers = list(map(int, re.findall(r'\d+', text)))
+        operation = v2_operation(text)
+        if numbers:
+            lines = multistep.solve_word_problem(text).steps[0].lines
+            assert lines[1] == f"Numbers found: {numbers}", text
+            assert lines[2] == f"Operation detected: {operation.title() if operation else 'Smart Guess'}", text
+
+def test_v3_hints():
+    for text in TEXTS:
+        assert V3_CLASSIFIER.classify(text).hint == v3_hint(text), text
+        assert teacher.give_hint(text) == v3_hint(text), text
+
+def test_v3_word_problem_solver():
+    for text in TEXTS:
+        expected = v3_word_problem(text)
+        if expected is not None:
+            steps, answer = teacher.word_problem_solver(text)
+            assert (steps, answer) == expected, text
+
+def test_v4_hints():
+    for text in TEXTS:
+        assert helper.word_problem_solver(text) == v4_word_hint(text), text
+        assert helper.generate_hint(text) == v4_symbol_hint(text), text
+
+@pytest.mark.parametrize("classifier", [V2_CLASSIFIER, V3_CLASSIFIER, V4_CLASSIFIER, V4_SYMBOL_CLASSIFIER])
+def test_classify_many(classifier):
+    assert classifier.classify_many(TEXTS[:200]) == [classifier.classify(t) for t in TEXTS[:200]]
@@ -0,0 +1,153 @@
+# tests/test_columns.py
+# The column methods give the answers the old v2 tens-and-ones methods gave,
+# and the digits they write, column by column, make up that answer. Long
+# division also gives exact decimals and does not crash on 0.
+
+import random
+import re
+from fractions import Fraction
+
+import pytest
+
+from mathmate.columns import DECIMAL_PLACES, column_addition, column_division, column_multiplication, column_subtraction
+from mathmate.multistep import MULTI_STEP
+
+SMALL = range(0, 121)  # v2 asks for 1-50; past 100 the old methods were still right
+rng = random.Random(16)
+BIG = [(rng.randrange(10**rng.randint(1, 60)), rng.randrange(10**rng.randint(1, 60))) for _ in range(300)]
+
+def written(steps, title):
+    # the digits the "Write ..." lines put down, most significant first
+    out = []
+    for step in steps:
+        if title in step.title:
+            write = [re.match(r"Write (\d+)", line) for line in step.lines]
+            out.append(next((m.group(1) for m in write if m), ""))
+    return "".join(reversed(out)).lstrip("0") or "0"
+
+def test_v2_uses_the_column_methods():
+    assert MULTI_STEP["Addition"] is column_addition
+    assert MULTI_STEP["Subtraction"] is column_subtraction
+    assert MULTI_STEP["Multiplication"] is column_multiplication
+
+def test_addition():
+    for a in SMALL:
+        for b in SMALL:
+            worked = column_addition(a, b)
+            assert worked.answer == a + b
+            assert written(worked.steps, "Add the") == str(a + b)
+    for a, b in BIG:
+        worked = column_addition(str(a), str(b))
+        assert worked.answer_text == str(a + b)
+        assert written(worked.steps, "Add the") == str(a + b)
+
+def test_carries():
+    steps = list(column_addition(999, 1).steps)
+    assert steps[1].lines == ("9 + 1 = 10", "Write 0, carry 1 to the tens")
+    assert steps[2].lines == ("9 + 0 + 1 (carried) = 10", "Write 0, carry 1 to the hundreds")
+    assert steps[3].lines == ("9 + 0 + 1 (carried) = 10", "Write 10")
+
+def test_subtraction():
+    for a in SMALL:
+        for b in SMALL:
+            worked = column_subtraction(a, b)
+            assert worked.answer == a - b
+            sign = "-" if a < b else ""
+            assert sign + written(worked.steps, "Subtract the") == str(a - b)
+    for a, b in BIG:
+        worked = column_subtraction(str(a), str(b))
+        assert worked.answer_text == str(a - b)
+        sign = "-" if a < b else ""
+        assert sign + written(worked.steps, "Subtract the") == str(a - b)
+
+def test_borrows():
+    steps = list(column_subtraction(1000, 1).steps)
+    assert steps[1].lines[0] == "0 < 1: borrow 1 from the tens, so 0 becomes 10"
+    assert steps[2].lines[0].startswith("0 lent 1 to the ones and is too small")
+    assert steps[4].lines == ("1 lent 1 to the hundreds, so it is now 0", "0 - 0 = 0",
+                              "Nothing left here, so no digit to write")
+    assert column_subtraction(3, 8).answer_text == "-5"
+
+def partial_products(steps):
+    found = []
+    for step in steps:
+        if "Multiply by" in step.title:
+            found.append(int(re.search(r"(\d+)$", step.lines[-1]).group(1)))
+    return found
+
+def test_multiplication():
+    for a in SMALL:
+        for b in SMALL:
+            worked = column_multiplication(a, b)
+            assert worked.answer == a * b
+            assert sum(partial_products(worked.steps)) == a * b
+    for a, b in BIG:
+        worked = column_multiplication(str(a), str(b))
+        assert worked.answer_text == str(a * b)
+        assert sum(partial_products(worked.steps)) == a * b
+
+@pytest.mark.parametrize("method", [column_addition, column_subtraction, column_multiplication])
+def test_not_a_whole_number(method):
+    with pytest.raises(ValueError):
+        method("12a", 3)
+
+# ==========================
+# DIVISION
+# ==========================
+def decimal_value(text):
+    # "3.(142857)" -> Fraction(22, 7); "0.1(6)" -> Fraction(1, 6)
+    whole, _, after = text.partition(".")
+    fixed, _, repeat = after.rstrip(")").partition("(")
+    value = Fraction(int(whole + fixed), 10 ** len(fixed))
+    if repeat:
+        value += Fraction(int(repeat), (10 ** len(repeat) - 1) * 10 ** len(fixed))
+    return value
+
+def test_v2_uses_long_division():
+    assert MULTI_STEP["Division"] is column_division
+
+def test_division():
+    for a in SMALL:
+        for b in range(1, 121):
+            worked = column_division(a, b)
+            assert worked.answer == (a // b, a % b)  # what v2 showed: quotient remainder
+            steps = list(worked.steps)
+            quotient = "".join(re.search(r"Write (\d+) in the answer", line).group(1)
+                               for step in steps for line in step.lines if line.endswith("in the answer"))
+            assert int(quotient) == a // b
+            whole, _, rest = worked.answer_text.partition(" = ")
+            assert whole == f"{a // b} remainder {a % b}"
+            if a % b:
+                if rest.endswith("…"):
+                    cut = 10 ** DECIMAL_PLACES
+                    assert decimal_value(rest[:-1]) == Fraction(a * cut // b, cut)
+                else:
+                    assert decimal_value(rest) == Fraction(a, b)
+                    assert rest in steps[-1].lines
+
+@pytest.mark.parametrize("a,b,text", [
+    (1, 3, "0 remainder 1 = 0.(3)"),
+    (1, 6, "0 remainder 1 = 0.1(6)"),
+    (22, 7, "3 remainder 1 = 3.(142857)"),
+    (10, 4, "2 remainder 2 = 2.5"),
+    (12, 4, "3 remainder 0"),
+    (0, 5, "0 remainder 0"),
+    (1, 97, "0 remainder 1 = 0.01030927835051546391…"),  # 96 repeating digits, cut off
+])
+def test_decimals(a, b, text):
+    assert column_division(a, b).answer_text == text
+
+def test_big_division():
+    for a, b in BIG:
+        b = b or 7
+        worked = column_division(str(a), str(b))
+        assert worked.answer == (str(a // b), str(a % b))
+        assert worked.answer_text.startswith(f"{a // b} remainder {a % b}")
+        assert sum(1 for _ in worked.steps) >= 3
+
+@pytest.mark.parametrize("a", [0, 5, "12345678901234567890"])
+def test_divide_by_zero(a):
+    worked = column_division(a, 0)
+    assert worked.answer is None
+    assert "can't divide by 0" in worked.answer_text
+    assert [step.title for step in worked.steps] == ["Step 1: Dividing by 0"]
@@ -0,0 +1,84 @@
+# tests/test_cost.py
+# The router's decisions, and the fast path's answers against SymPy's.
+
+import pytest
+
+from mathmate.cost import MAX_DEPTH, MAX_OPERATORS, route
+from mathmate.equations import FAST_PATH_CHECKS, check_fast_path, quick_solver, step_by_step_solver
+from mathmate.sandbox import TOO_BIG_MESSAGE
+
+@pytest.mark.parametrize("text,path", [
+    ("2+2", "fast"),
+    ("(5+3)^2*7-12/4+2^5", "fast"),
+    ("2^3^2", "fast"),
+    ("-2^2", "fast"),
+    ("2^-3", "fast"),
+    ("2x + 3 = 7", "fast"),
+    ("x^2 - 5x + 6 = 0", "fast"),
+    ("x^2 + 1 = 0", "fast"),
+    ("x**2 - 4 = 0", "fast"),
+    ("x^3 = 8", "sympy"),          # degree 3
+    ("x^99999999 = 2", "sympy"),   # small to write down; the pool's time limit stops it
+    ("sin(x) = 0", "sympy"),
+    ("x = y", "sympy"),
+    ("2^(1/2)", "sympy"),          # not a whole number or fraction
+    ("2.5 + 1", "sympy"),
+    ("1/0", "sympy"),              # SymPy says what is wrong with it
+    ("2 +", "sympy"),
+    ("10^5000", "sympy"),          # too long an answer for the fast path, not too big
+    ("10^20000", "reject"),
+    ("9^9^9", "reject"),
+    ("99^99^99", "reject"),
+])
+def test_route(text, path):
+    assert route(text).path == path
+
+def test_calculator_reads_powers_left_to_right():
+    assert route("9^9^9", left_powers=True).path == "fast"  # (9^9)^9
+    assert route("99^99^99", left_powers=True).path == "reject"
+
+def test_reject_reasons():
+    assert route("9^9^9").reason == TOO_BIG_MESSAGE
+    assert "brackets" in route("(" * (MAX_DEPTH + 1) + "1" + ")" * (MAX_DEPTH + 1)).reason
+    assert "steps" in route("1+" * (MAX_OPERATORS + 1) + "1").reason
+    assert route("1+" * MAX_OPERATORS + "1").path == "fast"
+
+@pytest.mark.parametrize("text,answer", [
+    ("2^3^2", "512"),
+    ("2**3**2", "512"),
+    ("-2^2", "-4"),
+    ("-3^2+1", "-8"),
+    ("-(2+3)^2", "-25"),
+    ("2^-3", "1/8"),
+    ("2^-1^2", "1/2"),
+    ("7/2*2", "7"),
+])
+def test_fast_expressions_parse_like_sympy(text, answer):
+    assert str(quick_solver(text)[0]) == answer
+    assert str(step_by_step_solver(text)[0]) == answer
+
+@pytest.mark.parametrize("equation", [
+    "2x + 3 = 7",
+    "-x = 4",
+    "x/2 = 3",
+    "x^2 - 5x + 6 = 0",
+    "3x^2 + 2x - 1 = 0",
+    "-x^2 = -4",
+    "x^2 = 2",
+    "x^2 = 0",
+    "x^2 + 1 = 0",                  # negative discriminants: complex roots
+    "x^2 + x + 1 = 0",
+    "2x^2 - 4x + 5 = 0",
+    "-x^2 - 2x - 5 = 0",
+    "(x + 1)^2 = -3",
+    "x^2 + 2x = x^2 + 4",           # x^2 cancels: linear
+])
+def test_fast_equations_match_sympy(equation):
+    assert route(equation).path == "fast"
+    quick = quick_solver(equation)
+    assert quick is not None
+    assert quick[0] == step_by_step_solver(equation)[0]
+
+def test_fast_path_checks():
+    assert all(route(p).path == "fast" for p in FAST_PATH_CHECKS)
+    assert check_fast_path() == []
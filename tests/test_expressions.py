@@ -0,0 +1,160 @@
+# tests/test_expressions.py
+# The single-pass evaluator against the page's old one, the int/Fraction fast
+# path against SymPy, and the shared solution cache.
+
+import random
+import threading
+
+import pytest
+
+from mathmate.expressions import (SolutionCache, clean_input, evaluate_tokens, solve_cached, solve_tokens,
+                                  step_texts, tokenize)
+from mathmate.lazy import lazy_import
+
+sp = lazy_import("sympy")
+
+# ==========================
+# THE OLD EVALUATOR
+# ==========================
+# mathmate_app.py before the single-pass parser: every operation in SymPy,
+# innermost brackets first, rewriting the token list as it goes
+def old_evaluate_no_paren(tokens):
+    steps = []
+    for ops in [['**'], ['*', '/'], ['+', '-']]:
+        i = 0
+        while i < len(tokens):
+            if tokens[i] in ops:
+                left, op, right = tokens[i-1], tokens[i], tokens[i+1]
+                result = sp.simplify(sp.sympify(f"({left}){op}({right})"))
+                op_word = {'+': 'add', '-': 'subtract', '*': 'multiply', '/': 'divide', '**': 'power'}[op]
+                steps.append(f"Compute {left} {op} {right} → {sp.pretty(result)}  ({op_word})")
+                tokens = tokens[:i-1] + [str(result)] + tokens[i+2:]
+                i = max(i-1, 0)
+            else:
+                i += 1
+    return tokens, steps
+
+def old_evaluate_tokens(tokens):
+    steps = []
+    while '(' in tokens:
+        start = max(i for i, t in enumerate(tokens) if t == '(')
+        end = start + 1
+        while end < len(tokens) and tokens[end] != ')':
+            end += 1
+        if end >= len(tokens) or tokens[end] != ')':
+            raise ValueError("Mismatched parentheses")
+        inner = tokens[start+1:end]
+        if not inner:
+            raise ValueError("Empty parentheses")
+        inner_tokens, inner_steps = old_evaluate_no_paren(inner)
+        steps.extend(inner_steps)
+        inner_result = inner_tokens[0]
+        steps.append(f"Simplify ({' '.join(inner)}) → {sp.pretty(sp.sympify(inner_result))}")
+        tokens = tokens[:start] + [str(inner_result)] + tokens[end+1:]
+    tokens, final_steps = old_evaluate_no_paren(tokens)
+    steps.extend(final_steps)
+    return tokens[0], steps
+
+# ==========================
+# INPUTS
+# ==========================
+EXAMPLES = ["3+4*2", "(5+3)^2", "(5+3)^2*7-12/4+2^5", "7/2", "7/2*2", "2^10", "2^-1", "2^3^2", "10-2-3",
+            "100/10/5", "1/3+1/6", "(1/3)^2", "2^(1/2)", "4^(1/2)", "2.5*4", "0.1+0.2", "1.5^2", "-3+5",
+            "-(2+3)*4", "((1+2)*(3+4))/7", "2*(3+(4-1))", "6 x 7", "8 ÷ 2", "1/0", "0^-1", "1/(2-2)",
+            "12345678901234567890*98765432109876543210"]
+
+def random_expression(rng, depth=0):
+    if depth > 2 or rng.random() < 0.35:
+        number = str(rng.randint(0, 20))
+        if rng.random() < 0.1:
+            number = f"{rng.randint(0, 9)}.{rng.randint(1, 99)}"
+        if rng.random() < 0.1:
+            number = "-" + number
+        return number
+    op = rng.choice(["+", "-", "*", "/", "^"])
+    right = str(rng.randint(0, 3)) if op == "^" else random_expression(rng, depth + 1)
+    text = f"{random_expression(rng, depth + 1)} {op} {right}"
+    return f"({text})" if rng.random() < 0.4 else text
+
+rng = random.Random(1)
+INPUTS = EXAMPLES + [random_expression(rng) for _ in range(1500)]
+
+def outcome(evaluate, text, **kwargs):
+    try:
+        answer, steps = evaluate(tokenize(clean_input(text)), **kwargs)
+    except Exception as e:
+        return type(e).__name__
+    return str(answer), [str(s) for s in steps]
+
+# ==========================
+# PARITY
+# ==========================
+def test_same_answers_and_steps_as_the_old_evaluator():
+    for text in INPUTS:
+        assert outcome(evaluate_tokens, text) == outcome(old_evaluate_tokens, text), text
+
+def test_fast_path_matches_sympy():
+    for text in INPUTS:
+        assert outcome(evaluate_tokens, text) == outcome(evaluate_tokens, text, fast=False), text
+
+@pytest.mark.parametrize("text,answer", [
+    ("3+4*2", "11"), ("7/2", "7/2"), ("2^-1", "1/2"), ("(1/3)^2", "1/9"), ("2^3^2", "64"),
+    ("-(2+3)*4", "-20"), ("2^(1/2)", "sqrt(2)"), ("2.5*4", "10.0000000000000"),
+])
+def test_answers(text, answer):
+    assert outcome(evaluate_tokens, text)[0] == answer
+
+# ==========================
+# SOLUTION CACHE
+# ==========================
+def test_solve_cached_matches_solve_tokens():
+    cache = SolutionCache(capacity=8)
+    for text in EXAMPLES[:10]:
+        tokens = tokenize(clean_input(text))
+        first = solve_cached(tokens, cache)
+        again = solve_cached(tokenize(clean_input(text)), cache)
+        assert again is first
+        fresh = solve_tokens(tokens)
+        assert (first.answer, step_texts(first.steps), first.question) == \
+               (fresh.answer, step_texts(fresh.steps), fresh.question)
+    assert cache.stats() == {"size": 8, "capacity": 8, "hits": 10, "misses": 10}
+
+def test_same_tokens_share_an_entry():
+    cache = SolutionCache()
+    a = solve_cached(tokenize(clean_input("3 x 4")), cache)
+    b = solve_cached(tokenize(clean_input("3*4")), cache)
+    assert a is b and a.answer == "12"
+
+def test_least_recently_used_goes_first():
+    cache = SolutionCache(capacity=2)
+    cache.put(("1",), "one")
+    cache.put(("2",), "two")
+    assert cache.get(("1",)) == "one"     # now "2" is the oldest
+    cache.put(("3",), "three")
+    assert cache.get(("2",)) is None
+    assert cache.get(("1",)) == "one" and cache.get(("3",)) == "three"
+
+def test_capacity_zero_keeps_nothing():
+    cache = SolutionCache(capacity=0)
+    cache.put(("1",), "one")
+    assert cache.get(("1",)) is None
+    assert cache.stats()["size"] == 0
+
+def test_cache_shared_by_threads():
+    cache = SolutionCache(capacity=16)
+    keys = [(str(i),) for i in range(32)]
+
+    def work():
+        for _ in range(200):
+            for key in keys:
+                if cache.get(key) is None:
+                    cache.put(key, key[0])
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    stats = cache.stats()
+    assert stats["size"] == 16
+    assert stats["hits"] + stats["misses"] == 8 * 200 * 32
@@ -0,0 +1,40 @@
+# tests/test_grading.py
+# Answers written as number words, e.g. "sixteen" must not be read as "6teen".
+
+import pytest
+
+from mathmate.grading import SMALL, TENS, check_answer, normalize
+
+@pytest.mark.parametrize("word,value", sorted(SMALL.items(), key=lambda item: item[1]))
+def test_small_words(word, value):
+    assert normalize(word) == str(value)
+    assert check_answer(str(value), word).correct
+
+@pytest.mark.parametrize("word,value", sorted(TENS.items(), key=lambda item: item[1]))
+def test_tens_words(word, value):
+    assert normalize(word) == str(value)
+    assert check_answer(str(value), word).correct
+    assert not check_answer(str(value // 10), word).correct
+
+@pytest.mark.parametrize("teen", [w for w, n in SMALL.items() if 13 <= n <= 19])
+def test_teen_is_not_its_unit(teen):
+    assert not check_answer(str(SMALL[teen] - 10), teen).correct
+
+@pytest.mark.parametrize("words,value", [
+    ("twenty-one", 21),
+    ("twenty one", 21),
+    ("forty-four", 44),
+    ("ninety-nine", 99),
+    ("one hundred", 100),
+    ("one hundred and five", 105),
+    ("one hundred and fifteen", 115),
+    ("three hundred and sixty-six", 366),
+    ("two thousand and seventeen", 2017),
+])
+def test_compound_words(words, value):
+    assert normalize(words) == str(value)
+    assert check_answer(str(value), words).correct
+
+def test_words_inside_an_answer():
+    assert check_answer("16 each, 1 leftover", "sixteen r1").correct
+    assert not check_answer("16 each, 1 leftover", "six r1").correct
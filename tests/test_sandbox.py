@@ -0,0 +1,39 @@
+# tests/test_sandbox.py
+# The solver pool: stages recorded in its threads belong to the caller's request.
+
+import math
+
+import pytest
+
+from mathmate.metrics import trace
+from mathmate.sandbox import SolverPool
+
+@pytest.fixture(scope="module")
+def pool():
+    pool = SolverPool(workers=2, warm=None)
+    yield pool
+    pool.close()
+
+def test_submit_records_stages_on_the_callers_trace(pool):
+    with trace("test.pool", "10!") as t:
+        assert pool.submit(math.factorial, 10).result() == 3628800
+    assert [stage for stage, _ in t.stages] == ["pool_wait", "worker"]
+
+def test_each_request_gets_only_its_own_stages(pool):
+    with trace("test.pool", "a") as a:
+        job_a = pool.submit(math.factorial, 5)
+        with trace("test.pool", "b") as b:
+            job_b = pool.submit(math.factorial, 6)
+            assert job_b.result() == 720
+        assert job_a.result() == 120
+    assert [stage for stage, _ in a.stages] == ["pool_wait", "worker"]
+    assert [stage for stage, _ in b.stages] == ["pool_wait", "worker"]
+
+def test_submit_outside_a_trace(pool):
+    assert pool.submit(math.factorial, 4).result() == 24
+
+def test_stats_count_every_concurrent_task(pool):
+    before = pool.stats["tasks"]
+    jobs = [pool.submit(math.factorial, n) for n in range(200)]
+    assert [job.result() for job in jobs] == [math.factorial(n) for n in range(200)]
+    assert pool.stats["tasks"] - before == 200